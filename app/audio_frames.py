@@ -0,0 +1,134 @@
+"""
+Wire format for PCM audio on main.py's /ws websocket.
+
+By default audio travels base64-encoded inside JSON text frames, like every
+other message. A client that connects with `?audio_format=binary` can instead
+send and receive audio as binary websocket frames: an 8-byte little-endian
+header followed by the raw 16-bit PCM samples.
+
+    offset  size  field
+    0       1     version (1)
+    1       1     kind (1 = audio/pcm)
+    2       2     sample rate in Hz (16000 from the mic, 24000 from the agent)
+    4       4     sequence number, per direction
+
+The server confirms with `{"audio_format": "binary"}` (or `"base64"` when
+`AUDIO_BINARY_FRAMES=false`) as its first message. Text and control messages
+stay JSON in both modes.
+"""
+import base64
+import json
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional
+
+HEADER = struct.Struct("<BBHI")
+VERSION = 1
+KIND_PCM = 1
+MIC_SAMPLE_RATE = 16000
+SPEAKER_SAMPLE_RATE = 24000
+
+BINARY_FRAMES_ENABLED = os.getenv("AUDIO_BINARY_FRAMES", "true").lower() == "true"
+
+
+def encode_frame(pcm: bytes, sample_rate: int, seq: int) -> bytes:
+    return HEADER.pack(VERSION, KIND_PCM, sample_rate, seq & 0xFFFFFFFF) + pcm
+
+
+def decode_frame(frame: bytes):
+    """(sample_rate, seq, payload) for a binary audio frame; payload is a memoryview into `frame`."""
+    if len(frame) < HEADER.size:
+        raise ValueError(f"audio frame too short: {len(frame)} bytes")
+    version, kind, sample_rate, seq = HEADER.unpack_from(frame)
+    if version != VERSION or kind != KIND_PCM:
+        raise ValueError(f"unsupported audio frame: version {version}, kind {kind}")
+    return sample_rate, seq, memoryview(frame)[HEADER.size:]
+
+
+def negotiate(requested: Optional[str]) -> bool:
+    """Whether this connection uses binary audio frames."""
+    return BINARY_FRAMES_ENABLED and requested == "binary"
+
+
+class AudioChannel:
+    """Encodes and decodes one connection's audio in its negotiated format and counts the traffic."""
+
+    def __init__(self, binary: bool):
+        self.binary = binary
+        self._seq_out = 0
+        self.stats: Dict[str, int] = {
+            "frames_in": 0, "pcm_bytes_in": 0, "wire_bytes_in": 0,
+            "frames_out": 0, "pcm_bytes_out": 0, "wire_bytes_out": 0,
+        }
+
+    def decode_binary(self, frame: bytes) -> memoryview:
+        _, _, payload = decode_frame(frame)
+        self._count_in(len(payload), len(frame))
+        return payload
+
+    def decode_base64(self, data: str) -> bytes:
+        pcm = base64.b64decode(data)
+        self._count_in(len(pcm), len(data))
+        return pcm
+
+    def _count_in(self, pcm_bytes: int, wire_bytes: int):
+        self.stats["frames_in"] += 1
+        self.stats["pcm_bytes_in"] += pcm_bytes
+        self.stats["wire_bytes_in"] += wire_bytes
+
+    def encode(self, pcm: bytes) -> Dict[str, Any]:
+        """ASGI send message for one chunk of agent audio."""
+        if self.binary:
+            frame = encode_frame(pcm, SPEAKER_SAMPLE_RATE, self._seq_out)
+            self._seq_out += 1
+            message = {"type": "websocket.send", "bytes": frame}
+            wire_bytes = len(frame)
+        else:
+            text = json.dumps({
+                "mime_type": "audio/pcm",
+                "data": base64.b64encode(pcm).decode("ascii"),
+                "role": "model",
+            })
+            message = {"type": "websocket.send", "text": text}
+            wire_bytes = len(text)
+        self.stats["frames_out"] += 1
+        self.stats["pcm_bytes_out"] += len(pcm)
+        self.stats["wire_bytes_out"] += wire_bytes
+        return message
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"audio format={'binary' if self.binary else 'base64'} "
+            f"in={s['frames_in']} frames/{s['wire_bytes_in']} bytes "
+            f"out={s['frames_out']} frames/{s['wire_bytes_out']} bytes"
+        )
+
+
+class AudioTrafficStats:
+    """Process-wide totals of audio traffic per format, for comparing the two."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, channel: AudioChannel):
+        key = "binary" if channel.binary else "base64"
+        with self._lock:
+            totals = self._totals.setdefault(key, {"sessions": 0})
+            totals["sessions"] += 1
+            for name, value in channel.stats.items():
+                totals[name] = totals.get(name, 0) + value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {key: dict(totals) for key, totals in self._totals.items()}
+        for totals in report.values():
+            pcm = totals.get("pcm_bytes_in", 0) + totals.get("pcm_bytes_out", 0)
+            wire = totals.get("wire_bytes_in", 0) + totals.get("wire_bytes_out", 0)
+            totals["wire_overhead"] = round(wire / pcm - 1, 4) if pcm else None
+        return report
+
+
+audio_traffic = AudioTrafficStats()
@@ -0,0 +1,137 @@
+"""
+Per-session server CPU and bandwidth of the /ws audio path: base64-in-JSON
+text frames vs binary PCM frames (audio_frames.py), at 50 concurrent streams.
+
+The benchmark starts its own uvicorn process serving an echo endpoint that
+runs the same receive/decode/encode code as main.py. No agent or model is
+involved, so the numbers isolate the wire format. Each stream sends 16 kHz
+mic audio in real time, in 128-sample worklet chunks, and gets 24 kHz audio
+back. Run from app/:
+
+    python -m benchmarks.audio_frame_benchmark
+    python -m benchmarks.audio_frame_benchmark --streams 50 --seconds 20 --chunk-samples 128
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import psutil
+import websockets
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from audio_frames import MIC_SAMPLE_RATE, AudioChannel, encode_frame
+
+app = FastAPI()
+
+
+@app.websocket("/ws")
+async def echo(websocket: WebSocket, audio_format: str = "base64"):
+    """Decode mic audio the way main.py does and answer each chunk with 1.5x as much 24 kHz audio."""
+    await websocket.accept()
+    channel = AudioChannel(binary=audio_format == "binary")
+    try:
+        while True:
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            if received.get("bytes") is not None:
+                pcm = bytes(channel.decode_binary(received["bytes"]))
+            else:
+                pcm = channel.decode_base64(json.loads(received["text"])["data"])
+            await websocket.send(channel.encode(pcm + pcm[: len(pcm) // 2]))
+    except WebSocketDisconnect:
+        pass
+
+
+async def stream(url, audio_format, chunk_samples, seconds, totals):
+    pcm = os.urandom(chunk_samples * 2)
+    interval = chunk_samples / MIC_SAMPLE_RATE
+    async with websockets.connect(f"{url}?audio_format={audio_format}", max_size=None) as ws:
+
+        async def drain():
+            async for message in ws:
+                totals["wire_bytes_in"] += len(message)
+
+        receiver = asyncio.create_task(drain())
+        started = time.perf_counter()
+        seq = 0
+        while time.perf_counter() - started < seconds:
+            # Encode the way app.js does for each format
+            if audio_format == "binary":
+                message = encode_frame(pcm, MIC_SAMPLE_RATE, seq)
+            else:
+                message = json.dumps({"mime_type": "audio/pcm", "data": base64.b64encode(pcm).decode("ascii")})
+            await ws.send(message)
+            totals["wire_bytes_out"] += len(message)
+            totals["chunks"] += 1
+            seq += 1
+            # Real-time pacing, correcting for drift
+            await asyncio.sleep(max(0.0, started + seq * interval - time.perf_counter()))
+        await asyncio.sleep(0.2)
+        receiver.cancel()
+
+
+async def run_format(url, server, audio_format, args):
+    totals = {"chunks": 0, "wire_bytes_out": 0, "wire_bytes_in": 0}
+    before = server.cpu_times()
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(
+        stream(url, audio_format, args.chunk_samples, args.seconds, totals) for _ in range(args.streams)
+    ))
+    wall = time.perf_counter() - wall_started
+    after = server.cpu_times()
+    cpu = (after.user - before.user) + (after.system - before.system)
+    session_seconds = args.streams * wall
+    print(
+        f"{audio_format:>7}: server cpu {cpu / wall * 100:6.1f}% total, "
+        f"{cpu / session_seconds * 1000:6.2f} ms/session-second; "
+        f"upstream {totals['wire_bytes_out'] / session_seconds / 1024:6.1f} KB/s/session, "
+        f"downstream {totals['wire_bytes_in'] / session_seconds / 1024:6.1f} KB/s/session, "
+        f"{totals['chunks'] / session_seconds:5.0f} chunks/s/session"
+    )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--chunk-samples", type=int, default=128, help="samples per mic chunk (worklet quantum)")
+    parser.add_argument("--formats", default="base64,binary")
+    args = parser.parse_args()
+
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.audio_frame_benchmark:app",
+        "--port", str(port), "--log-level", "warning",
+    ])
+    try:
+        # Wait for the server to accept connections
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        server = psutil.Process(process.pid)
+        print(f"{args.streams} streams x {args.seconds:.0f}s, {args.chunk_samples}-sample chunks")
+        for audio_format in args.formats.split(","):
+            asyncio.run(run_format(f"ws://127.0.0.1:{port}/ws", server, audio_format, args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Websocket load test for the /chat endpoint: p50/p99 turn latency under many
+concurrent customer sessions.
+
+Start the server (from app/: uvicorn chat_server:app --port 8000), then:
+
+    python -m benchmarks.chat_load_test --sessions 200 --turns 3 \
+        --customers 101,102,103
+
+Run it once against the previous commit and once against this one to compare.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import websockets
+
+from utils import percentile
+
+DEFAULT_MESSAGES = [
+    "What is my wallet balance?",
+    "Show me my last transactions",
+    "Which plans are available?",
+]
+
+
+async def run_session(url, customer_id, messages, turns, latencies, errors):
+    try:
+        async with websockets.connect(f"{url}/chat/{customer_id}", max_size=None) as ws:
+            # Wait for the session to be initialised
+            while json.loads(await ws.recv()).get("type") != "session_info":
+                pass
+            for turn in range(turns):
+                message = messages[turn % len(messages)]
+                started = time.perf_counter()
+                await ws.send(json.dumps({"type": "user_message", "message": message}))
+                while True:
+                    reply = json.loads(await ws.recv())
+                    if reply.get("type") in ("agent_response", "error"):
+                        break
+                if reply["type"] == "error":
+                    errors.append(reply.get("message"))
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+    except Exception as e:
+        errors.append(str(e))
+
+
+async def main_async(args):
+    customers = args.customers.split(",")
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(
+            args.url, customers[i % len(customers)], DEFAULT_MESSAGES, args.turns, latencies, errors
+        )
+        for i in range(args.sessions)
+    ))
+    elapsed = time.perf_counter() - started
+
+    print(f"sessions={args.sessions} turns/session={args.turns} elapsed={elapsed:.1f}s")
+    if latencies:
+        print(
+            f"turn latency: p50={percentile(latencies, 50):.0f}ms "
+            f"p99={percentile(latencies, 99):.0f}ms "
+            f"mean={statistics.mean(latencies):.0f}ms "
+            f"turns/s={len(latencies) / elapsed:.1f}"
+        )
+    print(f"completed turns={len(latencies)} errors={len(errors)}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    return {
+        "elapsed": elapsed,
+        "turns": len(latencies),
+        "errors": len(errors),
+        "p50_ms": percentile(latencies, 50) if latencies else None,
+        "p99_ms": percentile(latencies, 99) if latencies else None,
+    }
+
+
+def add_load_arguments(parser):
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--customers", default="101")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8000")
+    add_load_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+The labelled FAQ question set shared by the retrieval benchmarks.
+
+The set is derived from NexTel_FAQ.txt with the FAQ parser, so
+"1. ...", "2) ..." and "Q16. ..." questions are all included. Each entry's
+expected answer is identified by a probe, the start of its answer; a
+retrieved document or chunk is relevant when it contains the probe.
+"""
+from manager.sub_agents.faq_agent.faq_parser import parse_faq
+from manager.sub_agents.faq_agent.hybrid import STOPWORDS
+
+
+def labelled_faq(text, keywords=False):
+    """
+    (query, answer probe, entry label) for each FAQ question.
+
+    With keywords=True every question is also asked as bare keywords, so exact
+    wording alone does not decide the score.
+    """
+    labelled = []
+    for entry in parse_faq(text):
+        probe = entry["answer"].splitlines()[0][:80]
+        label = f"{entry['section']} #{entry['number']}"
+        labelled.append((entry["question"], probe, label))
+        if keywords:
+            query = " ".join(w for w in entry["question"].lower().rstrip("?").split() if w not in STOPWORDS)
+            labelled.append((query, probe, label))
+    return labelled
+
+
+def labelled_chunks(text, chunks):
+    """(question, relevant chunk IDs) for each FAQ question whose answer start is in some chunk."""
+    labelled = []
+    for question, probe, _ in labelled_faq(text):
+        relevant = {pid for pid, chunk in chunks.items() if probe and probe in chunk["text"]}
+        if relevant:
+            labelled.append((question, relevant))
+    return labelled
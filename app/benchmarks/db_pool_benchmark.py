@@ -0,0 +1,91 @@
+"""
+Per-call latency of connect-per-query vs the pooled DatabaseConfig.
+
+Point the DB_* environment variables at a local Postgres, then run from app/:
+
+    python -m benchmarks.db_pool_benchmark --iterations 500 --threads 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from config.database_config import DatabaseConfig
+from utils import percentile
+
+QUERY = "SELECT 1 AS ok"
+
+
+def report(label, samples, elapsed):
+    print(
+        f"{label:<22} calls={len(samples):<6} "
+        f"p50={percentile(samples, 50):7.2f}ms "
+        f"p99={percentile(samples, 99):7.2f}ms "
+        f"mean={statistics.mean(samples):7.2f}ms "
+        f"throughput={len(samples) / elapsed:8.1f}/s"
+    )
+
+
+def connect_per_call(db: DatabaseConfig):
+    """The pre-pool behaviour: open, query, close."""
+    conn = psycopg2.connect(**db.connection_params)
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(QUERY)
+            cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def pooled_call(db: DatabaseConfig):
+    db.execute_query(QUERY)
+
+
+def run_sync(label, fn, db, iterations, threads):
+    def timed(_):
+        started = time.perf_counter()
+        fn(db)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = list(executor.map(timed, range(iterations)))
+    report(label, samples, time.perf_counter() - started)
+
+
+async def run_async(db, iterations, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def timed():
+        async with semaphore:
+            started = time.perf_counter()
+            await db.execute_query_async(QUERY)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(iterations)))
+    report("async pool", samples, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--skip-async", action="store_true")
+    args = parser.parse_args()
+
+    db = DatabaseConfig()
+    run_sync("connect-per-call", connect_per_call, db, args.iterations, args.threads)
+    run_sync("sync pool", pooled_call, db, args.iterations, args.threads)
+    if not args.skip_async:
+        asyncio.run(run_async(db, args.iterations, args.threads))
+    print("Pool stats:", db.to_json(db.pool_stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares embedding providers for FAQ retrieval: per-query latency (embed +
+search) and recall@4 on a labelled question set built from the numbered
+questions in NexTel_FAQ.txt (benchmarks/common.py). A question counts as answered when one of the
+top-k chunks contains the start of its answer.
+
+Run from app/ (the google provider needs GOOGLE_API_KEY, local needs fastembed):
+
+    python -m benchmarks.embedding_benchmark --providers google,local
+"""
+import argparse
+import statistics
+import time
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from benchmarks.common import labelled_chunks
+from benchmarks.fake_embeddings import FakeEmbeddings
+from manager.sub_agents.faq_agent.embeddings import create_embeddings
+from manager.sub_agents.faq_agent.indexer import split_chunks
+from manager.sub_agents.faq_agent.vector_store import faq_path
+from utils import percentile
+
+def evaluate(name, embeddings, chunks, questions, k):
+    client = QdrantClient(":memory:")
+    ids = list(chunks)
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents([chunks[pid]["text"] for pid in ids])
+    index_seconds = time.perf_counter() - started
+    client.create_collection("bench", vectors_config=VectorParams(size=len(vectors[0]), distance=Distance.COSINE))
+    client.upsert("bench", points=[PointStruct(id=pid, vector=v) for pid, v in zip(ids, vectors)])
+
+    # Warm-up query so model loading is not counted as query latency
+    embeddings.embed_query("warm up")
+
+    latencies, hits = [], 0
+    for question, relevant in questions:
+        started = time.perf_counter()
+        vector = embeddings.embed_query(question)
+        results = client.query_points("bench", query=vector, limit=k).points
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += any(str(point.id) in relevant for point in results)
+
+    print(
+        f"{name:>8}  dim={len(vectors[0]):<5} index={index_seconds:6.2f}s  "
+        f"p50={percentile(latencies, 50):7.1f}ms  p99={percentile(latencies, 99):7.1f}ms  "
+        f"mean={statistics.mean(latencies):7.1f}ms  recall@{k}={hits / len(questions):.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--providers", default="google,local", help="any of google, local, fake")
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(faq_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    chunks = split_chunks(text)
+    questions = labelled_chunks(text, chunks)
+    print(f"{len(chunks)} chunks, {len(questions)} labelled questions")
+
+    for provider in args.providers.split(","):
+        embeddings = FakeEmbeddings() if provider == "fake" else create_embeddings(provider)
+        evaluate(provider, embeddings, chunks, questions, args.k)
+
+
+if __name__ == "__main__":
+    main()
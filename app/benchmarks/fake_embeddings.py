@@ -0,0 +1,59 @@
+"""
+Deterministic local embedding model for benchmarks.
+
+Vectors are built from hashed word tokens, so texts that share words get
+similar vectors and retrieval results are meaningful without a network call.
+Optional per-call and per-text delays simulate a remote provider, and
+`rate_limit_every` raises a 429-style error on every Nth call to exercise
+retry paths.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int = 256, call_latency_ms: float = 0.0, per_text_ms: float = 0.0,
+                 rate_limit_every: int = 0):
+        self.dim = dim
+        self.call_latency_ms = call_latency_ms
+        self.per_text_ms = per_text_ms
+        self.rate_limit_every = rate_limit_every
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _simulate_call(self, count: int):
+        with self._lock:
+            self._calls += 1
+            calls = self._calls
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise RateLimitError("429 rate limit exceeded (simulated)")
+        delay = self.call_latency_ms + self.per_text_ms * count
+        if delay:
+            time.sleep(delay / 1000)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._simulate_call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._simulate_call(1)
+        return self._vector(text)
@@ -0,0 +1,81 @@
+"""
+Microbenchmark: interaction-history append cost over a 1k-turn session, for the
+old copy-and-recreate approach vs the ring-buffer store.
+
+Run from app/:
+
+    python -m benchmarks.history_benchmark --turns 1000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+
+from google.adk.sessions import InMemorySessionService
+
+from history_store import InteractionHistoryStore
+
+APP_NAME = "history-benchmark"
+USER_ID = "bench-user"
+
+
+def legacy_append(session_service, session_id, entry):
+    """The previous implementation: copy the whole state and re-create the session."""
+    session = session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    interaction_history = session.state.get("interaction_history", [])
+    interaction_history.append(entry)
+    updated_state = session.state.copy()
+    updated_state["interaction_history"] = interaction_history
+    session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state=updated_state
+    )
+
+
+def make_entry(turn):
+    return {
+        "action": "user_query" if turn % 2 == 0 else "agent_response",
+        "query": f"turn {turn}: what is my wallet balance and my current plan validity?",
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def run(label, append, turns):
+    session_service = InMemorySessionService()
+    session_id = f"{label}-session"
+    session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=session_id,
+        state={"customer_info": {"customer_id": 101}, "interaction_history": []},
+    )
+    checkpoints = {10, 100, turns // 2, turns}
+    timings = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    for turn in range(1, turns + 1):
+        t0 = time.perf_counter()
+        append(session_service, session_id, make_entry(turn))
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_turn = ", ".join(f"turn {n}={timings[n - 1]:.3f}ms" for n in sorted(checkpoints) if n <= turns)
+    print(f"{label:<14} total={elapsed * 1000:8.1f}ms peak_mem={peak / 1024:8.0f}KiB  {per_turn}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--max-entries", type=int, default=50)
+    args = parser.parse_args()
+
+    store = InteractionHistoryStore(max_entries=args.max_entries, spill_path=":memory:")
+    run("copy-recreate", legacy_append, args.turns)
+    run(
+        "ring-buffer",
+        lambda service, session_id, entry: store.append(service, APP_NAME, USER_ID, session_id, entry),
+        args.turns,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares dense, BM25 and hybrid (RRF) FAQ retrieval: recall@k and per-query
+latency on the labelled FAQ questions, plus a set of exact product-name
+queries. Uses the deterministic fake embedder by default, so it runs offline.
+
+Run from app/:
+
+    python -m benchmarks.hybrid_benchmark --k 4
+    python -m benchmarks.hybrid_benchmark --provider local
+"""
+import argparse
+import time
+
+from langchain_community.vectorstores import Qdrant
+from qdrant_client import QdrantClient
+
+from benchmarks.common import labelled_chunks
+from benchmarks.fake_embeddings import FakeEmbeddings
+from manager.sub_agents.faq_agent.embeddings import create_embeddings
+from manager.sub_agents.faq_agent.hybrid import HybridRetriever, load_documents
+from manager.sub_agents.faq_agent.indexer import split_chunks
+from manager.sub_agents.faq_agent.ingest import IngestConfig, IngestionPipeline
+from manager.sub_agents.faq_agent.vector_store import faq_path
+from utils import percentile
+
+PRODUCT_TERMS = ["Xstream Fiber Mesh", "Chromecast", "Set-Top Box", "DTH HD", "Amazon Prime"]
+
+
+def product_queries(chunks):
+    """Short keyword queries; relevant chunks are those that mention the term."""
+    queries = []
+    for term in PRODUCT_TERMS:
+        relevant = {pid for pid, chunk in chunks.items() if term.lower() in chunk["text"].lower()}
+        if relevant:
+            queries.append((term, relevant))
+    return queries
+
+
+def run(name, search, questions):
+    latencies, hits = [], 0
+    for question, relevant in questions:
+        started = time.perf_counter()
+        documents = search(question)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += any(document.metadata.get("_id") in relevant for document in documents)
+    print(
+        f"  {name:>7}  recall={hits / len(questions):.3f}  "
+        f"p50={percentile(latencies, 50):6.2f}ms  p99={percentile(latencies, 99):6.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--provider", default="fake", help="fake, google or local")
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(faq_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    chunks = split_chunks(text)
+    embeddings = FakeEmbeddings() if args.provider == "fake" else create_embeddings(args.provider)
+
+    client = QdrantClient(":memory:")
+    IngestionPipeline(client, embeddings, "hybrid_benchmark", IngestConfig(workers=1)).run(
+        {"id": pid, "text": c["text"], "hash": c["hash"], "source": "NexTel_FAQ.txt"} for pid, c in chunks.items()
+    )
+    vector_store = Qdrant(client=client, collection_name="hybrid_benchmark", embeddings=embeddings)
+    started = time.perf_counter()
+    hybrid = HybridRetriever(vector_store, load_documents(client, "hybrid_benchmark"), k=args.k)
+    print(f"BM25 index over {len(chunks)} chunks built in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    searches = {
+        "dense": lambda q: vector_store.similarity_search(q, k=args.k),
+        "bm25": lambda q: [d for d, _ in hybrid.bm25.search(q, args.k)],
+        "hybrid": hybrid.invoke,
+    }
+    for label, questions in (
+        ("FAQ questions", labelled_chunks(text, chunks)),
+        ("product-name queries", product_queries(chunks)),
+    ):
+        print(f"{label} ({len(questions)}), recall@{args.k}:")
+        for name, search in searches.items():
+            run(name, search, questions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput benchmark for the FAQ ingestion pipeline: docs/sec and chunks/sec
+for each batch size and worker count, using the local fake embedding model
+(with a simulated network delay) and an in-memory Qdrant.
+
+Run from app/:
+
+    python -m benchmarks.ingest_benchmark --docs 2000 --batch-sizes 16,64,256 --workers 1,4,8
+"""
+import argparse
+import random
+import time
+
+from qdrant_client import QdrantClient
+
+from benchmarks.fake_embeddings import FakeEmbeddings
+from manager.sub_agents.faq_agent.ingest import IngestConfig, IngestionPipeline, iter_chunks
+from manager.sub_agents.faq_agent.vector_store import faq_path
+
+
+def synthetic_documents(count, seed=7):
+    """Manual-sized documents built by shuffling FAQ paragraphs, tagged to stay unique."""
+    with open(faq_path, "r", encoding="utf-8") as f:
+        paragraphs = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+    rng = random.Random(seed)
+    for i in range(count):
+        body = "\n\n".join(rng.sample(paragraphs, min(12, len(paragraphs))))
+        yield {"source": f"manual-{i}.txt", "text": f"Manual {i}\n\n{body}\n\nDocument reference {i}"}
+
+
+def run_case(args, batch_size, workers):
+    client = QdrantClient(":memory:")
+    embeddings = FakeEmbeddings(
+        dim=args.dim, call_latency_ms=args.call_latency_ms, per_text_ms=args.per_text_ms,
+        rate_limit_every=args.rate_limit_every,
+    )
+    pipeline = IngestionPipeline(
+        client, embeddings, "ingest_benchmark",
+        IngestConfig(batch_size=batch_size, workers=workers, backoff_base=0.05),
+    )
+    started = time.perf_counter()
+    report = pipeline.run(iter_chunks(synthetic_documents(args.docs)))
+    elapsed = time.perf_counter() - started
+    return args.docs / elapsed, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--call-latency-ms", type=float, default=50.0, help="simulated round trip per call")
+    parser.add_argument("--per-text-ms", type=float, default=0.5, help="simulated cost per text")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="fail every Nth call with a 429")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'workers':>8} {'docs/s':>9} {'chunks/s':>9} {'retries':>8}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for workers in (int(w) for w in args.workers.split(",")):
+            docs_per_sec, report = run_case(args, batch_size, workers)
+            print(
+                f"{batch_size:>6} {workers:>8} {docs_per_sec:>9.1f} "
+                f"{report['chunks_per_sec']:>9.1f} {report['retries']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Multi-worker throughput test: starts `uvicorn chat_server:app --workers N` for
+each N, runs the websocket load test against it and reports turns/s per
+worker count.
+
+Use a shared session backend so any worker can serve any session, e.g. from app/:
+
+    SESSION_BACKEND=postgres python -m benchmarks.multi_worker_load_test \
+        --workers 1,2,4 --sessions 200 --customers 101,102,103
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.chat_load_test import add_load_arguments, main_async
+
+
+def wait_until_healthy(port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--port", type=int, default=8100)
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    if os.getenv("SESSION_BACKEND", "memory") == "memory":
+        print("⚠️  SESSION_BACKEND=memory: sessions are per worker; use sqlite or postgres")
+
+    results = []
+    for workers in (int(n) for n in args.workers.split(",")):
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "chat_server:app",
+             "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"],
+        )
+        try:
+            wait_until_healthy(args.port)
+            args.url = f"ws://127.0.0.1:{args.port}"
+            print(f"\n=== {workers} worker(s) ===")
+            summary = asyncio.run(main_async(args))
+            results.append((workers, summary))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print("\nworkers  turns/s   p50_ms   p99_ms  errors")
+    for workers, summary in results:
+        throughput = summary["turns"] / summary["elapsed"] if summary["elapsed"] else 0
+        print(
+            f"{workers:>7} {throughput:8.1f} {summary['p50_ms'] or 0:8.0f} "
+            f"{summary['p99_ms'] or 0:8.0f} {summary['errors']:7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Concurrency benchmark for wallet operations: the transactional engine vs the
+previous one-statement-per-connection flow, for addon purchases and recharges.
+
+Fires --threads concurrent operations for one user, then checks the wallet
+against the ledger. Purchases must move it by exactly (successful purchases x
+addon price); recharges by the sum of the recharge transactions they logged.
+The legacy flows (reproduced statement for statement from the original
+tools) check the balance and deduct in separate autocommitted statements, so
+concurrent operations can pass the balance check together and overdraw the
+wallet, or leave the wallet and the ledger out of step when one statement
+fails. Use --balance to start each run from a small balance, where the race
+shows. Each flow also reports server round trips per operation (statements
+plus commits).
+
+WARNING: this writes to the wallet, users, user_addons and transactions
+tables. Point the DB_* variables at a local test database, then run from app/:
+
+    python -m benchmarks.recharge_concurrency --user-id 101 --addon-id 1 --plan-id 2 --threads 20
+    python -m benchmarks.recharge_concurrency --user-id 101 --addon-id 1 --balance 250 --restore
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from config.catalog_cache import catalog_cache
+from config.customer_service_tools import CustomerServiceTools
+from config.database_config import DatabaseConfig
+
+# Every failure message of the legacy and transactional flows starts with one of these
+FAILURE_PREFIXES = (
+    "User ", "New plan", "Wallet", "Insufficient", "Unknown", "Addon not found",
+    "Addon purchase failed", "Recharge failed",
+)
+
+
+class _CountingCursor:
+    def __init__(self, cursor, db: "CountingDatabase"):
+        self._cursor = cursor
+        self._db = db
+
+    def execute(self, query, params=None):
+        self._db.count()
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingDatabase(DatabaseConfig):
+    """DatabaseConfig that counts round trips (statements and commits) made by the calling thread."""
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.round_trips = 0
+
+    @property
+    def round_trips(self) -> int:
+        return getattr(self._local, "round_trips", 0)
+
+    def count(self, n: int = 1):
+        self._local.round_trips = self.round_trips + n
+
+    def execute_query(self, query, params=None):
+        self.count(2)
+        return super().execute_query(query, params)
+
+    def execute_update(self, query, params):
+        self.count(2)
+        return super().execute_update(query, params)
+
+    @contextmanager
+    def transaction(self):
+        try:
+            with super().transaction() as cursor:
+                yield _CountingCursor(cursor, self)
+        finally:
+            # COMMIT or ROLLBACK
+            self.count()
+
+
+def legacy_purchase_addon(db: DatabaseConfig, user_id: int, addon_id: int) -> str:
+    """The pre-transaction purchase_addon: every statement autocommits on its own connection."""
+    user = db.execute_query("SELECT id, status FROM users WHERE id = %s", (user_id,))
+    if not user:
+        return "User not found or inactive."
+    user = user["data"][0]
+    if user["status"] != "active":
+        return "User not found or inactive."
+    addon = db.execute_query(
+        "SELECT addon_id, addon_type, price FROM addons WHERE addon_id = %s", (addon_id,)
+    )
+    if not addon:
+        return "Addon not found."
+    addon = addon["data"][0]
+    addon_price = float(addon["price"])
+    wallet = db.execute_query("SELECT balance FROM wallet WHERE user_id = %s", (user_id,))
+    if not wallet:
+        return "Wallet not found."
+    balance = float(wallet["data"][0]["balance"])
+    if balance < addon_price:
+        return "Insufficient balance."
+    db.execute_update(
+        "UPDATE wallet SET balance = balance - %s, last_updated = CURRENT_TIMESTAMP WHERE user_id = %s",
+        (addon_price, user_id),
+    )
+    added_on = datetime.now().date()
+    expiry_date = added_on + timedelta(days=28)
+    db.execute_update(
+        "INSERT INTO user_addons (user_id, addon_id, added_on, expiry_date) VALUES (%s, %s, %s, %s)",
+        (user_id, addon_id, added_on, expiry_date),
+    )
+    db.execute_update(
+        "INSERT INTO transactions (user_id, addon_id, transaction_type, status, transaction_date, amount_paid) "
+        "VALUES (%s, %s, 'addon_purchase', 'success', CURRENT_TIMESTAMP, %s)",
+        (user_id, addon_id, addon_price),
+    )
+    return "Addon purchased."
+
+
+def legacy_recharge_user_with_wallet(db: DatabaseConfig, tools: CustomerServiceTools, user_id: int,
+                                     new_plan_id: int) -> str:
+    """The pre-transaction recharge_user_with_wallet, minus the session state update."""
+    user = db.execute_query(
+        "SELECT id, user_type, status, plan_id, current_plan_start FROM users WHERE id = %s", (user_id,)
+    )
+    if not user:
+        return "User not found."
+    user = user["data"][0]
+    if user["status"] != "active":
+        return "User is not active."
+    user_type = user["user_type"]
+    old_plan_id = user["plan_id"]
+    current_plan_start = user["current_plan_start"]
+
+    new_plan = db.execute_query(
+        "SELECT plan_id, plan_name, duration, price FROM plans WHERE plan_id = %s", (new_plan_id,)
+    )
+    if not new_plan:
+        return "New plan not found."
+    new_plan = new_plan["data"][0]
+    plan_price = float(new_plan["price"])
+    new_start = date.today()
+    new_end = new_start + timedelta(days=new_plan["duration"])
+
+    if user_type == "prepaid":
+        wallet = db.execute_query("SELECT balance FROM wallet WHERE user_id = %s", (user_id,))
+        if not wallet:
+            return "Wallet not found."
+        balance = wallet["data"][0]["balance"]
+        refund_amount = 0.00
+        if old_plan_id:
+            old_plan = db.execute_query("SELECT price, duration FROM plans WHERE plan_id = %s", (old_plan_id,))
+            if old_plan and current_plan_start:
+                old_plan = old_plan["data"][0]
+                total_days = old_plan["duration"]
+                days_used = (date.today() - current_plan_start).days
+                days_remaining = max(total_days - days_used, 0)
+                refund_amount = round((days_remaining / total_days) * float(old_plan["price"]), 2)
+        net_amount = plan_price - refund_amount
+        if net_amount > 0:
+            if balance < net_amount:
+                return "Insufficient wallet balance."
+            db.execute_update(
+                "UPDATE wallet SET balance = balance - %s, last_updated = CURRENT_TIMESTAMP WHERE user_id = %s",
+                (net_amount, user_id),
+            )
+        elif net_amount < 0:
+            db.execute_update(
+                "UPDATE wallet SET balance = balance + %s, last_updated = CURRENT_TIMESTAMP WHERE user_id = %s",
+                (abs(net_amount), user_id),
+            )
+        amount_paid = net_amount
+    elif user_type == "postpaid":
+        amount_paid = 0.00
+    else:
+        return f"Unknown user type: {user_type}"
+
+    db.execute_update(
+        "UPDATE users SET plan_id = %s, current_plan_start = %s, current_plan_end = %s WHERE id = %s",
+        (new_plan_id, new_start, new_end, user_id),
+    )
+    db.execute_update(
+        "INSERT INTO transactions (user_id, plan_id, transaction_type, status, transaction_date, amount_paid) "
+        "VALUES (%s, %s, 'recharge', 'success', CURRENT_TIMESTAMP, %s)",
+        (user_id, new_plan_id, amount_paid),
+    )
+    # The original refreshed the profile for session state afterwards
+    tools.get_user_profile(user_id)
+    return "Recharged."
+
+
+def wallet_balance(db, user_id):
+    return float(db.execute_query(
+        "SELECT balance FROM wallet WHERE user_id = %s", (user_id,)
+    )["data"][0]["balance"])
+
+
+def ledger_total(db, user_id, transaction_type, since):
+    """Sum of wallet movements the transactions table records since `since`."""
+    row = db.execute_query(
+        "SELECT COALESCE(SUM(amount_paid), 0) AS total FROM transactions "
+        "WHERE user_id = %s AND transaction_type = %s AND transaction_date >= %s",
+        (user_id, transaction_type, since),
+    )["data"][0]
+    return float(row["total"])
+
+
+def run(label, operation, transaction_type, counting_db, db, args):
+    saved = db.execute_query(
+        "SELECT plan_id, current_plan_start, current_plan_end FROM users WHERE id = %s", (args.user_id,)
+    )["data"][0]
+    if args.balance is not None:
+        db.execute_update("UPDATE wallet SET balance = %s WHERE user_id = %s", (args.balance, args.user_id))
+    before = wallet_balance(db, args.user_id)
+    # As text, so the timestamp keeps its sub-second precision
+    since = db.execute_query("SELECT now()::text AS ts", ())["data"][0]["ts"]
+
+    def timed(_):
+        counting_db.reset()
+        started = time.perf_counter()
+        result = operation()
+        ok = not result.startswith(FAILURE_PREFIXES)
+        return (time.perf_counter() - started) * 1000, ok, counting_db.round_trips
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(timed, range(args.threads)))
+    elapsed = time.perf_counter() - started
+
+    after = wallet_balance(db, args.user_id)
+    succeeded = sum(ok for _, ok, _ in results)
+    # Recharges log net amounts (negative for refunds), purchases the addon price
+    expected = before - ledger_total(db, args.user_id, transaction_type, since)
+    latencies = [ms for ms, _, _ in results]
+    round_trips = [trips for _, ok, trips in results if ok] or [trips for _, _, trips in results]
+    if abs(after - expected) >= 0.005:
+        verdict = "LEDGER MISMATCH"
+    elif after < 0:
+        verdict = "OVERDRAWN"
+    else:
+        verdict = "OK"
+    print(
+        f"{label:<24} ok={succeeded}/{args.threads} "
+        f"mean={statistics.mean(latencies):7.1f}ms max={max(latencies):7.1f}ms total={elapsed * 1000:7.1f}ms "
+        f"round_trips/op={statistics.mean(round_trips):4.1f} "
+        f"wallet {before:.2f} -> {after:.2f} (ledger {expected:.2f}) {verdict}"
+    )
+    if args.restore:
+        db.execute_update("UPDATE wallet SET balance = %s WHERE user_id = %s", (before, args.user_id))
+        db.execute_update(
+            "UPDATE users SET plan_id = %s, current_plan_start = %s, current_plan_end = %s WHERE id = %s",
+            (saved["plan_id"], saved["current_plan_start"], saved["current_plan_end"], args.user_id),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--addon-id", type=int, required=True)
+    parser.add_argument("--plan-id", type=int, default=None, help="also benchmark recharges to this plan")
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--balance", type=float, default=None, help="wallet balance to start each run from")
+    parser.add_argument("--restore", action="store_true", help="reset the wallet and plan after each run")
+    args = parser.parse_args()
+
+    db = DatabaseConfig()
+    counting_db = CountingDatabase()
+    tools = CustomerServiceTools()
+    tools.db = counting_db
+    # Catalog lookups are served from memory once loaded; load them outside the timed runs
+    catalog_cache.get_addon(args.addon_id)
+    tool_context = SimpleNamespace(state={})
+
+    run("legacy purchase", lambda: legacy_purchase_addon(counting_db, args.user_id, args.addon_id),
+        "addon_purchase", counting_db, db, args)
+    run("transactional purchase", lambda: tools.purchase_addon(args.user_id, args.addon_id),
+        "addon_purchase", counting_db, db, args)
+    if args.plan_id is not None:
+        catalog_cache.get_plan(args.plan_id)
+        run("legacy recharge",
+            lambda: legacy_recharge_user_with_wallet(counting_db, tools, args.user_id, args.plan_id),
+            "recharge", counting_db, db, args)
+        run("transactional recharge",
+            lambda: tools.recharge_user_with_wallet(args.user_id, args.plan_id, tool_context),
+            "recharge", counting_db, db, args)
+
+
+if __name__ == "__main__":
+    main()
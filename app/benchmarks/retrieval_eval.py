@@ -0,0 +1,113 @@
+"""
+Evaluation harness for FAQ retrieval: recall@k, MRR, p50/p99 query latency
+and index memory for each index layout and retrieval backend.
+
+The labelled set is derived from NexTel_FAQ.txt: every parsed question maps
+to its expected FAQ entry, and a retrieved document counts as a hit when it
+contains the start of that entry's answer. Each question is asked twice, as
+written and as bare keywords, so exact wording alone does not decide the
+score. The default embedder is the deterministic fake one, so results are
+reproducible offline and in CI. Run from app/:
+
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --layouts qa,500,1000 --ks 1,4,8 --backends dense,hybrid
+    python -m benchmarks.retrieval_eval --provider local --json results.json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from langchain_community.vectorstores import Qdrant
+from qdrant_client import QdrantClient
+
+from benchmarks.common import labelled_faq
+from benchmarks.fake_embeddings import FakeEmbeddings
+from manager.sub_agents.faq_agent.embeddings import create_embeddings
+from manager.sub_agents.faq_agent.hybrid import HybridRetriever, load_documents
+from manager.sub_agents.faq_agent.indexer import faq_documents, split_chunks
+from manager.sub_agents.faq_agent.ingest import IngestConfig, IngestionPipeline
+from manager.sub_agents.faq_agent.vector_store import faq_path
+from utils import percentile
+
+
+def build_documents(text, layout):
+    if layout == "qa":
+        return faq_documents(text)
+    size = int(layout)
+    return split_chunks(text, chunk_size=size, chunk_overlap=size // 5)
+
+
+def build_index(documents, embeddings, name):
+    """In-memory collection plus BM25 index; returns the searchers and their memory footprint."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    client = QdrantClient(":memory:")
+    IngestionPipeline(client, embeddings, name, IngestConfig(workers=1)).run(
+        dict(doc, id=pid, source="NexTel_FAQ.txt") for pid, doc in documents.items()
+    )
+    vector_store = Qdrant(client=client, collection_name=name, embeddings=embeddings)
+    hybrid = HybridRetriever(vector_store, load_documents(client, name))
+    memory_mb = (tracemalloc.get_traced_memory()[0] - before) / 2 ** 20
+    tracemalloc.stop()
+    return vector_store, hybrid, memory_mb
+
+
+def evaluate(search, labelled, ks):
+    max_k = max(ks)
+    latencies, ranks = [], []
+    for query, probe, _ in labelled:
+        started = time.perf_counter()
+        documents = search(query, max_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        rank = next((i for i, doc in enumerate(documents, 1) if probe in doc.page_content), None)
+        ranks.append(rank)
+    result = {f"recall@{k}": sum(1 for r in ranks if r and r <= k) / len(ranks) for k in ks}
+    result["mrr"] = sum(1 / r for r in ranks if r) / len(ranks)
+    result["p50_ms"] = percentile(latencies, 50)
+    result["p99_ms"] = percentile(latencies, 99)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--provider", default="fake", help="fake (deterministic), google or local")
+    parser.add_argument("--layouts", default="qa,300,500,1000", help="qa pairs and/or chunk sizes")
+    parser.add_argument("--ks", default="1,4,8")
+    parser.add_argument("--backends", default="dense,bm25,hybrid")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(faq_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    ks = [int(k) for k in args.ks.split(",")]
+    labelled = labelled_faq(text, keywords=True)
+    embeddings = FakeEmbeddings() if args.provider == "fake" else create_embeddings(args.provider)
+    print(f"{len(labelled)} labelled queries, provider={args.provider}")
+
+    results = []
+    for layout in args.layouts.split(","):
+        documents = build_documents(text, layout)
+        vector_store, hybrid, memory_mb = build_index(documents, embeddings, f"eval_{layout}")
+        searches = {
+            "dense": lambda q, k: vector_store.similarity_search(q, k=k),
+            "bm25": lambda q, k: [doc for doc, _ in hybrid.bm25.search(q, k)],
+            "hybrid": lambda q, k: hybrid.invoke(q, k=k),
+        }
+        for backend in args.backends.split(","):
+            row = dict(layout=layout, backend=backend, documents=len(documents),
+                       index_mb=round(memory_mb, 2), **evaluate(searches[backend], labelled, ks))
+            results.append(row)
+            print(
+                f"{layout:>5} {backend:>7} docs={row['documents']:<4} index={row['index_mb']:6.2f}MB  "
+                + "  ".join(f"R@{k}={row[f'recall@{k}']:.3f}" for k in ks)
+                + f"  MRR={row['mrr']:.3f}  p50={row['p50_ms']:.2f}ms  p99={row['p99_ms']:.2f}ms"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
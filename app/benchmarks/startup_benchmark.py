@@ -0,0 +1,76 @@
+"""
+Startup time of `uvicorn chat_server:app`: seconds until /health answers and
+until the FAQ index reports ready.
+
+Run from app/:
+
+    python -m benchmarks.startup_benchmark --runs 3
+    FAQ_WARMUP=false python -m benchmarks.startup_benchmark
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def poll_health(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+def measure(port, timeout):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "chat_server:app", "--port", str(port), "--log-level", "warning"]
+    )
+    serving = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            health = poll_health(port)
+            if health is not None:
+                serving = serving or time.perf_counter() - started
+                status = health.get("faq_index", {}).get("status")
+                if status in ("ready", "failed"):
+                    ready = time.perf_counter() - started
+                    break
+                if status == "cold":
+                    # Warm-up disabled: the index opens on the first retrieve call
+                    break
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return serving, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    serving_times, ready_times = [], []
+    for run in range(1, args.runs + 1):
+        serving, ready = measure(args.port, args.timeout)
+        print(f"run {run}: serving after {serving or float('nan'):.2f}s, "
+              f"FAQ index ready after {ready if ready is not None else float('nan'):.2f}s")
+        if serving is not None:
+            serving_times.append(serving)
+        if ready is not None:
+            ready_times.append(ready)
+
+    if serving_times:
+        print(f"median time to serve: {statistics.median(serving_times):.2f}s")
+    if ready_times:
+        print(f"median time to FAQ ready: {statistics.median(ready_times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
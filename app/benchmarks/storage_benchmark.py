@@ -0,0 +1,139 @@
+"""
+Memory and query latency of the FAQ collection storage modes at 10k/100k
+chunks: float32 in RAM vs scalar/binary quantisation with rescoring, and
+vectors or HNSW graph on disk (mmap).
+
+Storage modes need a Qdrant server (docker run -p 6333:6333 qdrant/qdrant).
+For the embedded local mode, which every worker loads into its own memory,
+pass --local to measure worker RSS. Run from app/:
+
+    python -m benchmarks.storage_benchmark --url http://localhost:6333 --scales 10000,100000
+    python -m benchmarks.storage_benchmark --local --scales 10000
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import psutil
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionStatus, PointStruct, SearchParams
+
+from manager.sub_agents.faq_agent.storage import StorageConfig
+from utils import percentile
+
+COLLECTION = "storage_benchmark"
+MODES = {
+    "float32": StorageConfig("none", False, False),
+    "scalar": StorageConfig("scalar", False, False),
+    "binary": StorageConfig("binary", False, False),
+    "scalar+vectors-on-disk": StorageConfig("scalar", True, False),
+    "float32+all-on-disk": StorageConfig("none", True, True),
+}
+
+
+def rss_mb():
+    return psutil.Process(os.getpid()).memory_info().rss / 2 ** 20
+
+
+def make_vectors(count, dim, seed=11):
+    rng = np.random.default_rng(seed)
+    # Clustered data behaves more like real embeddings than uniform noise
+    centers = rng.normal(size=(max(1, count // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load(client, vectors, storage):
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, **storage.create_kwargs(vectors.shape[1]))
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        client.upsert(COLLECTION, points=[
+            PointStruct(id=start + i, vector=vector.tolist()) for i, vector in enumerate(batch)
+        ])
+    # Wait for indexing and quantisation to finish before timing queries
+    while client.get_collection(COLLECTION).status != CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def measure(client, vectors, storage, queries, k=10):
+    rng = np.random.default_rng(3)
+    probes = vectors[rng.integers(0, len(vectors), queries)] + 0.05 * rng.normal(size=(queries, vectors.shape[1]))
+    latencies, recall = [], []
+    for probe in probes:
+        started = time.perf_counter()
+        found = client.query_points(COLLECTION, query=probe.tolist(), limit=k,
+                                    search_params=storage.search_params()).points
+        latencies.append((time.perf_counter() - started) * 1000)
+        exact = client.query_points(COLLECTION, query=probe.tolist(), limit=k,
+                                    search_params=SearchParams(exact=True)).points
+        recall.append(len({p.id for p in found} & {p.id for p in exact}) / k)
+    return percentile(latencies, 50), percentile(latencies, 99), float(np.mean(recall))
+
+
+def resident_vector_mb(count, dim, storage):
+    """RAM the server keeps for vectors: quantised copies always, originals unless on disk."""
+    quantised = {"none": 0, "scalar": count * dim, "binary": count * dim / 8}[storage.quantization]
+    originals = 0 if storage.on_disk else count * dim * 4
+    return (quantised + originals) / 2 ** 20
+
+
+def run_server(args, count, vectors):
+    client = QdrantClient(url=args.url)
+    for name, storage in MODES.items():
+        load(client, vectors, storage)
+        p50, p99, recall = measure(client, vectors, storage, args.queries)
+        print(
+            f"{count:>7} {name:>24}  server vectors≈{resident_vector_mb(count, args.dim, storage):7.1f}MB  "
+            f"worker rss={rss_mb():6.0f}MB  p50={p50:6.2f}ms  p99={p99:6.2f}ms  recall@10={recall:.3f}"
+        )
+    client.delete_collection(COLLECTION)
+
+
+def run_local(args, count, vectors):
+    path = tempfile.mkdtemp(prefix="qdrant-bench-")
+    try:
+        client = QdrantClient(path=path)
+        load(client, vectors, MODES["float32"])
+        client.close()
+        del client
+        gc.collect()
+        # What each worker pays when it opens the embedded store
+        before = rss_mb()
+        client = QdrantClient(path=path)
+        client.count(COLLECTION)
+        loaded = rss_mb() - before
+        p50, p99, recall = measure(client, vectors, MODES["float32"], args.queries)
+        print(
+            f"{count:>7} {'local (embedded)':>24}  worker rss +{loaded:7.1f}MB  "
+            f"p50={p50:6.2f}ms  p99={p99:6.2f}ms  recall@10={recall:.3f}"
+        )
+        client.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL", "http://localhost:6333"))
+    parser.add_argument("--local", action="store_true", help="measure the embedded local mode instead")
+    parser.add_argument("--scales", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=768, help="embedding-001 produces 768 dimensions")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for count in (int(c) for c in args.scales.split(",")):
+        vectors = make_vectors(count, args.dim)
+        if args.local:
+            run_local(args, count, vectors)
+        else:
+            run_server(args, count, vectors)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,41 @@
 import asyncio
+import logging
 import copy
 import json
 import os
 import uuid
-from datetime import datetime
 from typing import Dict, Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from manager.agent import coordinator_agent
 from setup_state import set_state_info
+from history_store import history_store
+from context_budget import context_budget
+from intent_router import intent_router
+from command_layer import command_layer
+from streaming import STREAMING_ENABLED, DeltaCoalescer, streaming_stats
+from tracing import DEBUG_STATE_ENDPOINT, session_state, snapshot_state, trace
+from session_backend import WriteBehindSessionService, create_session_service
+from manager.sub_agents.faq_agent import faq_agent
+from manager.sub_agents.faq_agent.answer_cache import answer_cache
+from manager.sub_agents.faq_agent.retrieval_service import (
+    index_status,
+    retrieval_stats,
+    start_warmup,
+)
+from utils import add_agent_response_to_history, add_user_query_to_history
 
 from fastapi import  Depends
 from typing import Optional
 from config.database_config import DatabaseConfig  # Update with your actual module
+from config.tool_executor import executor, run_blocking
+from config.catalog_cache import catalog_cache
 from fastapi.responses import JSONResponse
 
 db = DatabaseConfig()
@@ -34,147 +51,30 @@ __initial_state = {
     "customer_info": None,
     "plan_details": None, 
     "interaction_history": [],
+    "interaction_summary": "",
+    "interaction_context": "",
 }
 
 # ===== GLOBAL SERVICES =====
-session_service = InMemorySessionService()
+# SESSION_BACKEND=postgres/sqlite shares sessions between workers and restarts
+session_service = create_session_service()
 
 # ===== ACTIVE CONNECTIONS TRACKING =====
+# Connections open on this worker only; session state itself lives in session_service
 active_connections: Dict[str, WebSocket] = {}
 
-# ===== UTILITY FUNCTIONS (FROM utils.py) =====
-def update_interaction_history(session_service, app_name, user_id, session_id, entry):
-    """Add an entry to the interaction history in state."""
-    try:
-        session = session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
-
-        interaction_history = session.state.get("interaction_history", [])
-
-        if "timestamp" not in entry:
-            entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        interaction_history.append(entry)
-
-        updated_state = session.state.copy()
-        updated_state["interaction_history"] = interaction_history
-
-        session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
-        )
-    except Exception as e:
-        print(f"Error updating interaction history: {e}")
-
-
-def add_user_query_to_history(session_service, app_name, user_id, session_id, query):
-    """Add a user query to the interaction history."""
-    update_interaction_history(
-        session_service,
-        app_name,
-        user_id,
-        session_id,
-        {
-            "action": "user_query",
-            "query": query,
-        },
-    )
-
-
-def add_agent_response_to_history(
-    session_service, app_name, user_id, session_id, agent_name, response
-):
-    """Add an agent response to the interaction history."""
-    update_interaction_history(
-        session_service,
-        app_name,
-        user_id,
-        session_id,
-        {
-            "action": "agent_response",
-            "agent": agent_name,
-            "response": response,
-        },
-    )
-
-
-def display_state(session_service, app_name, user_id, session_id, label="Current State"):
-    """Display the current session state in a formatted way."""
-    try:
-        session = session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
+# ===== SESSION MANAGEMENT =====
+def initialize_chat_session(customer_id: str, resume_session_id: Optional[str] = None) -> str:
+    """Initialize a new chat session for a customer, or resume an existing one."""
+    if resume_session_id:
+        # Any worker can pick up a session created by another one
+        existing = session_service.get_session(
+            app_name=APP_NAME, user_id=customer_id, session_id=resume_session_id
         )
+        if existing:
+            print(f"♻️  Resumed session: {resume_session_id} for customer: {customer_id}")
+            return resume_session_id
 
-        print(f"\n{'-' * 10} {label} {'-' * 10}")
-        
-        customer_id = session.state.get("customer_id", "Not identified")
-        print(f"👤 Customer ID: {customer_id}")
-
-        customer_info = session.state.get("customer_info", "No customer info available")
-        if isinstance(customer_info, dict) and customer_info:
-            print("🧑‍💼 Customer Info:")
-            for key, value in customer_info.items():
-                print(f"  - {key}: {value}")
-        else:
-            print("🧑‍💼 Customer Info: Not available")
-
-        plan_id = session.state.get("plan_id", "No plan assigned")
-        print(f"💳 Plan ID: {plan_id}")
-
-        plan_name = session.state.get("plan_name", "No plan name available")
-        print(f"📦 Plan Name: {plan_name}")
-
-        plan_details = session.state.get("plan_details", "No details available")
-        if isinstance(plan_details, dict) and plan_details:
-            print("📃 Plan Details:")
-            for detail_key, detail_value in plan_details.items():
-                print(f"  - {detail_key}: {detail_value}")
-        else:
-            print("📃 Plan Details: Not available")
-
-        interaction_history = session.state.get("interaction_history", [])
-        if interaction_history:
-            print("📝 Interaction History:")
-            for idx, interaction in enumerate(interaction_history, 1):
-                if isinstance(interaction, dict):
-                    action = interaction.get("action", "interaction")
-                    timestamp = interaction.get("timestamp", "unknown time")
-
-                    if action == "user_query":
-                        query = interaction.get("query", "")
-                        print(f'  {idx}. User query at {timestamp}: "{query}"')
-                    elif action == "agent_response":
-                        agent = interaction.get("agent", "unknown")
-                        response = interaction.get("response", "")
-                        if len(response) > 100:
-                            response = response[:97] + "..."
-                        print(f'  {idx}. {agent} response at {timestamp}: "{response}"')
-                    else:
-                        details = ", ".join(
-                            f"{k}: {v}"
-                            for k, v in interaction.items()
-                            if k not in ["action", "timestamp"]
-                        )
-                        print(
-                            f"  {idx}. {action} at {timestamp}"
-                            + (f" ({details})" if details else "")
-                        )
-                else:
-                    print(f"  {idx}. {interaction}")
-        else:
-            print("📝 Interaction History: None")
-
-        print("-" * (22 + len(label)))
-    except Exception as e:
-        print(f"Error displaying state: {e}")
-
-
-# ===== SESSION MANAGEMENT =====
-def initialize_chat_session(customer_id: str) -> str:
-    """Initialize a new chat session for a customer."""
     session_id = str(uuid.uuid4())
     
     try:
@@ -206,32 +106,86 @@ def initialize_chat_session(customer_id: str) -> str:
     return session_id
 
 
+def answer_with_command_layer(customer_id: str, session_id: str, query: str) -> Optional[Dict[str, str]]:
+    """Answer deterministic read-only requests straight from the tools, without the agents."""
+    matched = command_layer.match(query)
+    if matched is None:
+        return None
+    session = session_service.get_session(app_name=APP_NAME, user_id=customer_id, session_id=session_id)
+    result = command_layer.run(matched, session.state.get("customer_info") if session else None)
+    if result is None:
+        return None
+    add_agent_response_to_history(
+        session_service, APP_NAME, customer_id, session_id, result["agent"], result["response"]
+    )
+    return result
+
+
+async def stream_command_reply(websocket: WebSocket, agent_name: str, text: str):
+    """Send a command layer reply through the same processing_agent/agent_delta frames as an agent reply."""
+    await websocket.send_text(json.dumps({"type": "processing_agent", "agent_name": agent_name}))
+
+    async def send_delta(delta: str):
+        await websocket.send_text(json.dumps({"type": "agent_delta", "agent_name": agent_name, "delta": delta}))
+
+    coalescer = DeltaCoalescer(send_delta)
+    for line in text.splitlines(keepends=True):
+        await coalescer.add(line)
+    await coalescer.flush()
+
+
 async def process_agent_response_async(runner, customer_id: str, session_id: str, query: str, websocket: WebSocket) -> Optional[str]:
     """Process agent response asynchronously (similar to call_agent_async from utils.py)."""
     content = types.Content(role="user", parts=[types.Part(text=query)])
-    print(f"\n🔄 Processing Query: {query}")
+    trace("agent_turn_started", session_id=session_id, query_chars=len(query))
     
     final_response_text = None
     agent_name = None
 
-    # Display state before processing
-    display_state(session_service, APP_NAME, customer_id, session_id, "State BEFORE processing")
+    async def send_delta(text: str):
+        await websocket.send_text(json.dumps({
+            "type": "agent_delta",
+            "agent_name": agent_name,
+            "delta": text,
+        }))
+
+    # Partial text events are coalesced into agent_delta frames as they arrive
+    coalescer = DeltaCoalescer(send_delta)
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if STREAMING_ENABLED else StreamingMode.NONE)
+
+    # Sampled, DEBUG-only state snapshot
+    await snapshot_state(session_service, APP_NAME, customer_id, session_id, "before_turn")
 
     try:
         async for event in runner.run_async(
-            user_id=customer_id, session_id=session_id, new_message=content
+            user_id=customer_id, session_id=session_id, new_message=content, run_config=run_config
         ):
-            if event.author:
+            if event.author and event.author != agent_name:
+                await coalescer.flush()
                 agent_name = event.author
                 await websocket.send_text(json.dumps({
                         "type": "processing_agent",
                         "agent_name": agent_name
                     }))
 
-                if event.actions and event.actions.transfer_to_agent:
-                    print("🔥 Captured transfer-to:", event.actions.transfer_to_agent)
+            if event.actions and event.actions.transfer_to_agent:
+                trace("agent_transfer", session_id=session_id, to_agent=event.actions.transfer_to_agent)
+                # The runner is suspended at this event and only starts the target agent when
+                # we ask for the next one. So the FAQ answer cache embeds the question here,
+                # in a worker thread, only for turns that actually reach faq_agent.
+                if event.actions.transfer_to_agent == faq_agent.name and answer_cache.enabled:
+                    await run_blocking(
+                        answer_cache.prepare, session_service, APP_NAME, customer_id, session_id, query
+                    )
+
+            if event.partial:
+                parts = event.content.parts if event.content and event.content.parts else []
+                # Called even for an empty part, so time to first token is the first partial event
+                await coalescer.add("".join(part.text for part in parts if part.text))
+                continue
 
             if event.is_final_response():
+                await coalescer.flush()
                 if (
                     event.content
                     and event.content.parts
@@ -239,12 +193,22 @@ async def process_agent_response_async(runner, customer_id: str, session_id: str
                     and event.content.parts[0].text
                 ):
                     final_response_text = event.content.parts[0].text.strip()
-                    print(f"\n✅ AGENT RESPONSE: {final_response_text}\n")
+                    trace("agent_response", logging.DEBUG, session_id=session_id, text=final_response_text)
                 break
 
     except Exception as e:
-        print(f"❌ ERROR during agent run: {e}")
+        trace("agent_run_failed", logging.ERROR, session_id=session_id, error=str(e))
         final_response_text = f"Error processing your request: {str(e)}"
+    finally:
+        coalescer.cancel()
+
+    streaming_stats.record(coalescer)
+    trace(
+        "agent_turn_finished", session_id=session_id, agent=agent_name,
+        ttft_ms=round(coalescer.ttft_ms, 1) if coalescer.ttft_ms is not None else None,
+        first_frame_ms=round(coalescer.first_frame_ms, 1) if coalescer.first_frame_ms is not None else None,
+        frames=coalescer.frames,
+    )
 
     # Add agent response to history
     if final_response_text and agent_name:
@@ -252,9 +216,7 @@ async def process_agent_response_async(runner, customer_id: str, session_id: str
             session_service, APP_NAME, customer_id, session_id, agent_name, final_response_text
         )
 
-    # Display state after processing
-    display_state(session_service, APP_NAME, customer_id, session_id, "State AFTER processing")
-    print(f"{'='*50}")
+    await snapshot_state(session_service, APP_NAME, customer_id, session_id, "after_turn")
 
     return final_response_text
 
@@ -321,6 +283,7 @@ async def get_chat_page():
             let ws = null;
             let sessionId = null;
             let customerId = null;
+            let streamingDiv = null;
 
             function connect() {
                 customerId = document.getElementById('customerId').value;
@@ -340,12 +303,26 @@ async def get_chat_page():
                 
                 ws.onmessage = function(event) {
                     const data = JSON.parse(event.data);
-                    if (data.type === 'agent_response') {
-                        addMessage('agent', data.message);
+                    if (data.type === 'agent_delta') {
+                        if (!streamingDiv) {
+                            streamingDiv = addMessage('agent', '');
+                        }
+                        streamingDiv.textContent += data.delta;
+                        scrollToBottom();
+                    } else if (data.type === 'agent_response') {
+                        // The final text replaces whatever was streamed for this turn
+                        if (streamingDiv) {
+                            streamingDiv.textContent = data.message;
+                            streamingDiv = null;
+                            scrollToBottom();
+                        } else {
+                            addMessage('agent', data.message);
+                        }
                     } else if (data.type === 'session_info') {
                         sessionId = data.session_id;
                         addMessage('system', `Session ID: ${sessionId}`);
                     } else if (data.type === 'error') {
+                        streamingDiv = null;
                         addMessage('system', `Error: ${data.message}`);
                     }
                 };
@@ -384,6 +361,12 @@ async def get_chat_page():
                 messageDiv.className = `message ${type}-message`;
                 messageDiv.textContent = message;
                 messages.appendChild(messageDiv);
+                scrollToBottom();
+                return messageDiv;
+            }
+
+            function scrollToBottom() {
+                const messages = document.getElementById('messages');
                 messages.scrollTop = messages.scrollHeight;
             }
             
@@ -401,13 +384,18 @@ async def get_chat_page():
 
 
 @app.websocket("/chat/{customer_id}")
-async def websocket_chat(websocket: WebSocket, customer_id: str):
+async def websocket_chat(
+    websocket: WebSocket,
+    customer_id: str,
+    session_id: Optional[str] = Query(None, description="Resume an existing session"),
+):
     """WebSocket endpoint for customer chat."""
     await websocket.accept()
+    resume_session_id, session_id = session_id, None
     
     try:
-        # Initialize session
-        session_id = initialize_chat_session(customer_id)
+        # Initialize session (profile lookup hits the database, so keep it off the event loop)
+        session_id = await run_blocking(initialize_chat_session, customer_id, resume_session_id)
         active_connections[session_id] = websocket
         
         # Create runner
@@ -426,8 +414,7 @@ async def websocket_chat(websocket: WebSocket, customer_id: str):
         
         print(f"👋 Customer {customer_id} connected with session {session_id}")
         
-        # Display initial state
-        display_state(session_service, APP_NAME, customer_id, session_id, "Initial Session State")
+        await snapshot_state(session_service, APP_NAME, customer_id, session_id, "session_start")
         
         while True:
             # Receive message from client
@@ -442,12 +429,24 @@ async def websocket_chat(websocket: WebSocket, customer_id: str):
                     session_service, APP_NAME, customer_id, session_id, user_message
                 )
                 
-                print(f"📝 User message: {user_message}")
+                trace("user_message", logging.DEBUG, session_id=session_id, text=user_message)
                 
+                # Simple read-only requests are answered from the tools directly
+                agent_response = None
+                if command_layer.enabled:
+                    command_result = await run_blocking(
+                        answer_with_command_layer, customer_id, session_id, user_message
+                    )
+                    if command_result is not None:
+                        agent_response = command_result["response"]
+                        if STREAMING_ENABLED:
+                            await stream_command_reply(websocket, command_result["agent"], agent_response)
+
                 # Process with agent
-                agent_response = await process_agent_response_async(
-                    runner, customer_id, session_id, user_message, websocket
-                )
+                if agent_response is None:
+                    agent_response = await process_agent_response_async(
+                        runner, customer_id, session_id, user_message, websocket
+                    )
                 
                 # Send response back
                 if agent_response:
@@ -476,27 +475,91 @@ async def websocket_chat(websocket: WebSocket, customer_id: str):
         # Cleanup
         if session_id in active_connections:
             del active_connections[session_id]
+        if session_id:
+            history_store.drop(session_id)
         
-        # Display final state
-        try:
-            display_state(session_service, APP_NAME, customer_id, session_id, "Final Session State")
-        except:
-            pass
+        if session_id:
+            await snapshot_state(session_service, APP_NAME, customer_id, session_id, "session_end")
+
+
+@app.get("/debug/sessions/{customer_id}/{session_id}/state")
+async def debug_session_state(customer_id: str, session_id: str):
+    """Full state of one session, on demand (DEBUG_STATE_ENDPOINT=true only)."""
+    if not DEBUG_STATE_ENDPOINT:
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+    state = await run_blocking(session_state, session_service, APP_NAME, customer_id, session_id)
+    if state is None:
+        return JSONResponse(status_code=404, content={"error": "Session not found"})
+    return state
 
 
 @app.get("/sessions")
 async def list_active_sessions():
     """List all active chat sessions."""
     return {
+        "worker_pid": os.getpid(),
         "active_sessions": len(active_connections),
         "sessions": list(active_connections.keys())
     }
 
 
+@app.on_event("startup")
+def warm_up_faq_index():
+    """Open the FAQ vector store in the background; FAQ_WARMUP=false defers it to the first query."""
+    if os.getenv("FAQ_WARMUP", "true").lower() == "true":
+        start_warmup()
+
+
+@app.on_event("startup")
+def train_intent_router():
+    """Retrain the intent pre-router on conversation_analytics; keyword rules and seed examples serve until then."""
+    if intent_router.enabled:
+        intent_router.start_training(db)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "NexTel Customer Support Chat"}
+    faq_index = await run_blocking(index_status)
+    return {
+        "status": "healthy",
+        "service": "NexTel Customer Support Chat",
+        "ready": faq_index["status"] == "ready",
+        "faq_index": faq_index,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime performance metrics."""
+    return {
+        "db_pool": db.pool_stats(),
+        "tool_executor": executor.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "context_budget": context_budget.stats(),
+        "session_write_behind": (
+            session_service.stats() if isinstance(session_service, WriteBehindSessionService) else None
+        ),
+        "faq_retrieval": await run_blocking(retrieval_stats),
+        "faq_answer_cache": answer_cache.stats(),
+        "intent_router": intent_router.stats(),
+        "command_layer": command_layer.stats(),
+        "chat_streaming": streaming_stats.stats(),
+    }
+
+
+@app.on_event("shutdown")
+def flush_sessions():
+    """Write any batched session state before the worker exits."""
+    if isinstance(session_service, WriteBehindSessionService):
+        session_service.close()
+
+
+@app.post("/catalog/invalidate")
+async def invalidate_catalog(table: Optional[str] = Query(None, description="plans or addons; all when omitted")):
+    """Drop cached catalog data after an out-of-band plan/addon change."""
+    catalog_cache.invalidate(table)
+    return {"invalidated": table or "all"}
 
 
 @app.get("/conversation_analytics")
@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.customer_service_tools import CustomerServiceTools
+from tracing import trace
+
+# Leading/trailing politeness that does not change what is being asked
+FILLER_PATTERN = re.compile(
+    r"^(?:(?:hi|hello|hey|please|pls|kindly|can you|could you|would you|i want to|i'd like to|i would like to|"
+    r"tell me|let me know)\s+)+|(?:\s+(?:please|pls|thanks|thank you))+$"
+)
+
+tools = CustomerServiceTools()
+
+# Largest "last N transactions" answered here; bigger requests go to the agents
+MAX_TRANSACTIONS = int(os.getenv("COMMAND_MAX_TRANSACTIONS", 20))
+COUNT_WORDS = {
+    "few": 5, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+
+def normalize_message(message: str) -> str:
+    text = re.sub(r"[^\w\s']", " ", message.lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    return FILLER_PATTERN.sub("", text).strip()
+
+
+def _short_date(value: Any) -> str:
+    return str(value or "")[:16].replace("T", " ")
+
+
+# ----- replies -----
+
+def wallet_balance_reply(user_id: int, **_) -> Optional[str]:
+    wallet = tools.get_wallet_balance(user_id)
+    if "error" in wallet:
+        return None
+    return f"Your wallet balance is ₹{wallet['balance']:.2f}."
+
+
+def transaction_count(match: "re.Match") -> Optional[Dict[str, Any]]:
+    """The number of transactions asked for (5 by default, 1 for "last transaction"), or None if too many."""
+    count = match.groupdict().get("count")
+    if count is None:
+        noun = match.groupdict().get("noun") or "transactions"
+        return {"limit": 5 if noun.endswith("s") else 1}
+    limit = int(count) if count.isdigit() else COUNT_WORDS[count]
+    if not 1 <= limit <= MAX_TRANSACTIONS:
+        return None
+    return {"limit": limit}
+
+
+def last_transactions_reply(user_id: int, limit: int = 5) -> Optional[str]:
+    transactions = tools.fetch_last_transactions(user_id, limit=limit)
+    if transactions is None:
+        return None
+    if not transactions:
+        return "You don't have any transactions yet."
+    lines = [
+        f"- {_short_date(t.get('transaction_date'))}: {t.get('item_name') or t.get('transaction_type')} "
+        f"({t.get('transaction_type')}), ₹{float(t.get('amount_paid') or 0):.2f}, {t.get('status')}"
+        for t in transactions
+    ]
+    noun = "transaction" if len(transactions) == 1 else "transactions"
+    return f"Here are your last {len(transactions)} {noun}:\n" + "\n".join(lines)
+
+
+def open_tickets_reply(user_id: int, **_) -> Optional[str]:
+    tickets = tools.get_open_tickets(user_id)
+    if "error" in tickets:
+        return None
+    rows = tickets["data"]
+    if not rows:
+        return "You have no open support tickets."
+    lines = [
+        f"- Ticket #{t.get('ticket_id')} ({t.get('status')}, raised {_short_date(t.get('created_at'))}): "
+        f"{t.get('description')}"
+        for t in rows
+    ]
+    noun = "ticket" if len(rows) == 1 else "tickets"
+    return f"You have {len(rows)} open support {noun}:\n" + "\n".join(lines)
+
+
+class Command:
+    """
+    An intent the layer answers by itself: whole-message patterns, the owning
+    agent and a reply builder. `parse` turns a pattern match into the reply's
+    keyword arguments, or rejects it with None.
+    """
+
+    def __init__(self, name: str, agent: str, patterns: List[str], reply: Callable[..., Optional[str]],
+                 parse: Optional[Callable[["re.Match"], Optional[Dict[str, Any]]]] = None):
+        self.name = name
+        self.agent = agent
+        self.patterns = [re.compile(p) for p in patterns]
+        self.reply = reply
+        self.parse = parse or (lambda match: {})
+
+    def matches(self, normalized: str) -> Optional[Dict[str, Any]]:
+        """The reply arguments if the message is this command, else None."""
+        for pattern in self.patterns:
+            match = pattern.fullmatch(normalized)
+            if match:
+                return self.parse(match)
+        return None
+
+
+COMMANDS = [
+    Command(
+        "wallet_balance",
+        "recharge_billing_agent",
+        [
+            r"(?:what is |what's |whats |check |show |show me |get |see )?(?:my )?(?:current |available )?"
+            r"(?:wallet )?balance",
+            r"(?:check|show|show me) my wallet",
+            r"how much (?:money |balance )?(?:is |do i have )?(?:left )?in my wallet",
+        ],
+        wallet_balance_reply,
+    ),
+    Command(
+        "last_transactions",
+        "recharge_billing_agent",
+        [
+            r"(?:show |show me |list |get |see |what are )?(?:my )?(?:last|recent|latest|past)"
+            r"(?: (?P<count>\d+|few|one|two|three|four|five|six|seven|eight|nine|ten))? "
+            r"(?P<noun>transactions?|payments?|recharges?)",
+            r"(?:show |show me |list |get |see )?(?:my )?(?:transactions|transaction history)",
+        ],
+        last_transactions_reply,
+        parse=transaction_count,
+    ),
+    Command(
+        "open_tickets",
+        "tech_support_agent",
+        [
+            r"(?:show |show me |list |get |see |what are )?(?:my )?(?:open|pending|active|unresolved) "
+            r"(?:tickets|complaints)",
+            r"(?:do i have )?any open (?:tickets|complaints)",
+        ],
+        open_tickets_reply,
+    ),
+]
+
+
+class CommandLayer:
+    """
+    Answers deterministic read-only requests without any LLM call.
+
+    A message that, after dropping punctuation and politeness, fully matches one
+    of a command's patterns is answered by running its tool with the session's
+    `customer_info.customer_id` and filling a fixed reply template. Unidentified
+    customers, tool errors and everything else fall through to the agents.
+    Disabled with `COMMAND_LAYER_ENABLED=false`.
+    """
+
+    def __init__(self, commands: List[Command] = COMMANDS):
+        self.enabled = os.getenv("COMMAND_LAYER_ENABLED", "true").lower() == "true"
+        self.commands = commands
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {
+            c.name: {"hits": 0, "errors": 0, "total_ms": 0.0} for c in commands
+        }
+        self._messages = 0
+
+    def match(self, message: str) -> Optional[Tuple[Command, Dict[str, Any]]]:
+        """The command this message asks for and its arguments, if any."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._messages += 1
+        normalized = normalize_message(message)
+        for command in self.commands:
+            args = command.matches(normalized)
+            if args is not None:
+                return command, args
+        return None
+
+    def run(self, matched: Tuple[Command, Dict[str, Any]], customer_info: Any) -> Optional[Dict[str, str]]:
+        """{"agent", "intent", "response"} when the command could be answered here, else None. Blocking."""
+        command, args = matched
+        customer_id = customer_info.get("customer_id") if isinstance(customer_info, dict) else None
+        if not customer_id:
+            return None
+
+        started = time.perf_counter()
+        try:
+            response = command.reply(customer_id, **args)
+        except Exception as e:
+            trace("command_failed", logging.WARNING, intent=command.name, error=str(e))
+            response = None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._stats[command.name]
+            if response is None:
+                stats["errors"] += 1
+            else:
+                stats["hits"] += 1
+                stats["total_ms"] += elapsed_ms
+        if response is None:
+            return None
+        trace("command_answered", intent=command.name, elapsed_ms=round(elapsed_ms, 2))
+        return {"agent": command.agent, "intent": command.name, "response": response}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            intents = {
+                name: {
+                    "hits": s["hits"],
+                    "errors": s["errors"],
+                    "avg_ms": round(s["total_ms"] / s["hits"], 2) if s["hits"] else 0.0,
+                }
+                for name, s in self._stats.items()
+            }
+            messages = self._messages
+        hits = sum(s["hits"] for s in intents.values())
+        return {
+            "enabled": self.enabled,
+            "messages": messages,
+            "hits": hits,
+            "hit_ratio": round(hits / messages, 4) if messages else 0.0,
+            "intents": intents,
+        }
+
+
+command_layer = CommandLayer()
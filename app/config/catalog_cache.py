@@ -0,0 +1,175 @@
+import os
+import select
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psycopg2
+
+from config.database_config import DatabaseConfig
+
+# Postgres channel the catalog triggers publish to (see config/sql/catalog_notify.sql)
+NOTIFY_CHANNEL = "catalog_changed"
+
+CATALOG_QUERIES = {
+    "plans": """
+    SELECT
+        plan_id,
+        plan_name,
+        plan_type,
+        price,
+        duration,
+        calls,
+        msgs,
+        data,
+        description
+    FROM plans
+    ORDER BY plan_id, plan_type
+    """,
+    "addons": """
+    SELECT
+        addon_id,
+        addon_type,
+        price,
+        amount,
+        description
+    FROM addons
+    ORDER BY addon_id, addon_type
+    """,
+}
+
+CATALOG_KEYS = {"plans": "plan_id", "addons": "addon_id"}
+
+
+class CatalogCache:
+    """
+    In-process cache of the plans and addons catalog.
+
+    Entries expire after `CATALOG_CACHE_TTL` seconds and are dropped as soon as
+    a `catalog_changed` notification arrives for their table, so edits are
+    picked up without waiting for the TTL. Each table has a generation counter
+    that every invalidation bumps. A read that was in flight when a
+    notification arrived is returned to its caller but not cached.
+    """
+
+    def __init__(self, db: Optional[DatabaseConfig] = None):
+        self.db = db or DatabaseConfig()
+        self.ttl = float(os.getenv("CATALOG_CACHE_TTL", 300))
+        self.listen_enabled = os.getenv("CATALOG_CACHE_LISTEN", "true").lower() == "true"
+        self._lock = threading.Lock()
+        # table -> (loaded_at, query result, rows keyed by id)
+        self._entries: Dict[str, tuple] = {}
+        self._generations: Dict[str, int] = {table: 0 for table in CATALOG_QUERIES}
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._listener: Optional[threading.Thread] = None
+
+    def _load(self, table: str) -> tuple:
+        self._ensure_listener()
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._hits += 1
+                return entry
+            self._misses += 1
+            generation = self._generations[table]
+
+        result = self.db.execute_query(CATALOG_QUERIES[table])
+        key = CATALOG_KEYS[table]
+        by_id = {row[key]: row for row in result.get("data", [])}
+        entry = (time.monotonic(), result, by_id)
+        # Only cache successful reads so a transient DB error is retried next call, and
+        # only if no invalidation arrived while reading (the rows may predate the change)
+        if result.get("success"):
+            with self._lock:
+                if self._generations[table] == generation:
+                    self._entries[table] = entry
+        return entry
+
+    def get_plans(self) -> Dict[str, Any]:
+        """All plans, in the same shape as DatabaseConfig.execute_query."""
+        return self._load("plans")[1]
+
+    def get_addons(self) -> Dict[str, Any]:
+        """All addons, in the same shape as DatabaseConfig.execute_query."""
+        return self._load("addons")[1]
+
+    def lookup(self, table: str, item_id: int) -> Dict[str, Any]:
+        """{"success": True, "data": row or None}, or {"error": ...} when the catalog could not be read."""
+        _, result, by_id = self._load(table)
+        if "error" in result:
+            return {"error": result["error"]}
+        return {"success": True, "data": by_id.get(item_id)}
+
+    def get_plan(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        return self.lookup("plans", plan_id).get("data")
+
+    def get_addon(self, addon_id: int) -> Optional[Dict[str, Any]]:
+        return self.lookup("addons", addon_id).get("data")
+
+    def invalidate(self, table: Optional[str] = None):
+        """Drop one table's entry, or the whole catalog when table is None."""
+        with self._lock:
+            tables = [table] if table in CATALOG_QUERIES else list(CATALOG_QUERIES)
+            for name in tables:
+                self._entries.pop(name, None)
+                self._generations[name] += 1
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "cached_tables": sorted(self._entries),
+                "ttl_seconds": self.ttl,
+                "listening": bool(self._listener and self._listener.is_alive()),
+            }
+
+    def _ensure_listener(self):
+        if not self.listen_enabled or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="catalog-listener", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        """Invalidate on NOTIFY; reconnects with backoff if the connection drops."""
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.db.connection_params)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Anything may have changed while we were not listening
+                self.invalidate()
+                backoff = 1
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.invalidate(notify.payload or None)
+            except Exception as e:
+                print(f"Catalog listener error, reconnecting in {backoff}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+catalog_cache = CatalogCache()
@@ -1,10 +1,88 @@
 from datetime import date, timedelta, datetime
 from google.adk.tools.tool_context import ToolContext
 from config.database_config import DatabaseConfig
+from config.catalog_cache import catalog_cache
 from typing import Dict, List, Any,Optional
 import json
 
 
+# Locks the user row and their wallet row for the rest of the transaction.
+# Plan and addon details come from the catalog cache, not from this query.
+USER_WALLET_LOCK_QUERY = """
+SELECT
+    u.id,
+    u.user_type,
+    u.status,
+    u.plan_id,
+    u.current_plan_start,
+    w.balance
+FROM users u
+LEFT JOIN LATERAL (
+    SELECT balance FROM wallet WHERE user_id = u.id FOR UPDATE
+) w ON TRUE
+WHERE u.id = %s
+FOR UPDATE OF u
+"""
+
+# Applies the wallet adjustment, plan switch and transaction log, and returns
+# the refreshed profile (same columns as get_user_profile).
+RECHARGE_APPLY_QUERY = """
+WITH wallet_update AS (
+    UPDATE wallet
+    SET balance = balance - %(net_amount)s, last_updated = CURRENT_TIMESTAMP
+    WHERE user_id = %(user_id)s AND %(net_amount)s <> 0
+    RETURNING balance
+),
+user_update AS (
+    UPDATE users
+    SET plan_id = %(plan_id)s, current_plan_start = %(start)s, current_plan_end = %(end)s
+    WHERE id = %(user_id)s
+    RETURNING *
+),
+txn AS (
+    INSERT INTO transactions (user_id, plan_id, transaction_type, status, transaction_date, amount_paid)
+    VALUES (%(user_id)s, %(plan_id)s, 'recharge', 'success', CURRENT_TIMESTAMP, %(amount_paid)s)
+    RETURNING trans_id
+)
+SELECT 
+    u.id AS user_id,
+    u.first_name,
+    u.last_name,
+    u.phone_number,
+    u.email,
+    u.address,
+    u.user_type,
+    u.status,
+    u.current_plan_start,
+    u.current_plan_end,
+    p.plan_id,
+    p.plan_name,
+    p.description,
+    p.price,
+    p.calls,
+    p.msgs,
+    p.data,
+    p.duration
+FROM user_update u
+LEFT JOIN plans p ON u.plan_id = p.plan_id
+"""
+
+ADDON_APPLY_QUERY = """
+WITH wallet_update AS (
+    UPDATE wallet
+    SET balance = balance - %(price)s, last_updated = CURRENT_TIMESTAMP
+    WHERE user_id = %(user_id)s
+    RETURNING balance
+),
+user_addon AS (
+    INSERT INTO user_addons (user_id, addon_id, added_on, expiry_date)
+    VALUES (%(user_id)s, %(addon_id)s, %(added_on)s, %(expiry_date)s)
+)
+INSERT INTO transactions (user_id, addon_id, transaction_type, status, transaction_date, amount_paid)
+VALUES (%(user_id)s, %(addon_id)s, 'addon_purchase', 'success', CURRENT_TIMESTAMP, %(price)s)
+"""
+
+
 class CustomerServiceTools:
     def __init__(self):
         self.db = DatabaseConfig()
@@ -16,22 +94,7 @@ class CustomerServiceTools:
         Returns:
             List[Dict]: All available plans.
         """
-        plans_query = """
-        SELECT 
-            plan_id,
-            plan_name,
-            plan_type,
-            price,
-            duration,
-            calls,
-            msgs,
-            data,
-            description
-        FROM plans
-        ORDER BY plan_id, plan_type
-        """
-
-        plans = self.db.execute_query(plans_query)
+        plans = catalog_cache.get_plans()
         return str(plans)
 
     def get_available_addons(self, ) -> List[Dict[str, Any]]:
@@ -41,18 +104,7 @@ class CustomerServiceTools:
             List[Dict]: All available addons.
         """
     
-        addons_query = """
-        SELECT 
-            addon_id,
-            addon_type,
-            price,
-            amount,
-            description
-        FROM addons
-        ORDER BY addon_id, addon_type
-        """
-
-        addons = self.db.execute_query(addons_query)
+        addons = catalog_cache.get_addons()
 
         return str(addons)
 
@@ -229,15 +281,16 @@ class CustomerServiceTools:
             """
         return self.db.execute_update(query, (status, ticket_id))
 
-    def get_last_transactions(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+    def fetch_last_transactions(self, user_id: int, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
         """
-        Fetches the last 5 transaction records for a user.
+        Fetches the last `limit` transaction records for a user as rows.
 
         Args:
             user_id (int): ID of the user.
+            limit (int): How many of the most recent transactions to return.
 
         Returns:
-            List of Dicts with transaction details, or None if no records found.
+            List of Dicts with transaction details, or None if the query failed.
         """
         query = """
         SELECT 
@@ -253,11 +306,26 @@ class CustomerServiceTools:
         LEFT JOIN addons a ON t.addon_id = a.addon_id
         WHERE t.user_id = %s
         ORDER BY t.transaction_date DESC
-        LIMIT 5
+        LIMIT %s
+        """
+        transaction_info = self.db.execute_query(query, (user_id, limit))
+        if "error" in transaction_info:
+            return None
+        return transaction_info["data"]
+
+    def get_last_transactions(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the last 5 transaction records for a user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            List of Dicts with transaction details, or None if no records found.
         """
-        transaction_info = self.db.execute_query(query, (user_id,))
-        if transaction_info:
-            return str(transaction_info["data"])
+        transactions = self.fetch_last_transactions(user_id)
+        if transactions is not None:
+            return str(transactions)
         else:
             return "Error fetching transaction info!"
 
@@ -273,184 +341,107 @@ class CustomerServiceTools:
         Returns:
             str: Descriptive status message.
         """
-        
-        # Fetch user details including type and current plan
-        user_query = """
-        SELECT id, user_type, status, plan_id, current_plan_start
-        FROM users WHERE id = %s
-        """
-        user = self.db.execute_query(user_query, (user_id,))
-        if not user:
-            return "User not found."
-        user = user["data"][0]
-        if user["status"] != "active":
-            return "User is not active."
-        
-        user_type = user["user_type"]
-        old_plan_id = user["plan_id"]
-        current_plan_start = user["current_plan_start"]
-
-        # Fetch new plan
-        plan_query = "SELECT plan_id, plan_name, duration, price FROM plans WHERE plan_id = %s"
-        new_plan = self.db.execute_query(plan_query, (new_plan_id,))
+        lookup = catalog_cache.lookup("plans", new_plan_id)
+        if "error" in lookup:
+            return f"Recharge failed: could not read the plan catalog ({lookup['error']})"
+        new_plan = lookup["data"]
         if not new_plan:
             return "New plan not found."
-        new_plan = new_plan["data"][0]
         plan_name = new_plan["plan_name"]
         plan_price = float(new_plan["price"])
-        plan_duration = new_plan["duration"]
-        
-        # PREPAID flow
-        if user_type == "prepaid":
-            # Wallet
-            wallet_query = "SELECT balance FROM wallet WHERE user_id = %s"
-            wallet = self.db.execute_query(wallet_query, (user_id,))
-            if not wallet:
-                return "Wallet not found."
-            wallet = wallet["data"][0]
-            balance = wallet["balance"]
-            refund_amount = 0.00
-            
-            # Calculate refund
-            if old_plan_id:
-                old_plan_query = "SELECT price, duration FROM plans WHERE plan_id = %s"
-                old_plan = self.db.execute_query(old_plan_query, (old_plan_id,))
-                if old_plan and current_plan_start:
-                    old_plan = old_plan["data"][0]
-                    total_days = old_plan["duration"]
-                    days_used = (date.today() - current_plan_start).days
-                    days_remaining = max(total_days - days_used, 0)
-                    refund_amount = round((days_remaining / total_days) * float(old_plan["price"]), 2)
-
-            
-            net_amount = plan_price - refund_amount
-
-            if net_amount > 0:
-                if balance < net_amount:
-                    return f"Insufficient wallet balance. Required: ₹{net_amount:.2f}, Available: ₹{balance:.2f}"
-                # Deduct from wallet
-                update_wallet_query = """
-                UPDATE wallet SET balance = balance - %s, last_updated = CURRENT_TIMESTAMP WHERE user_id = %s
-                """
-                self.db.execute_update(update_wallet_query, (net_amount, user_id))
-            elif net_amount < 0:
-                refund_to_wallet = abs(net_amount)
-                # Credit to wallet
-                update_wallet_query = """
-                UPDATE wallet SET balance = balance + %s, last_updated = CURRENT_TIMESTAMP WHERE user_id = %s
-                """
-                self.db.execute_update(update_wallet_query, (refund_to_wallet, user_id))
-            
-            
-            # Update user plan
-            new_start = date.today()
-            new_end = new_start + timedelta(days=plan_duration)
-            update_user_query = """
-            UPDATE users SET plan_id = %s, current_plan_start = %s, current_plan_end = %s WHERE id = %s
-            """
-            self.db.execute_update(update_user_query, (new_plan_id, new_start, new_end, user_id))
-            
-            # Insert transaction
-            txn_query = """
-            INSERT INTO transactions (user_id, plan_id, transaction_type, status, transaction_date, amount_paid)
-            VALUES (%s, %s, 'recharge', 'success', CURRENT_TIMESTAMP, %s)
-            """
-            self.db.execute_update(txn_query, (user_id, new_plan_id, net_amount))
-            
-            interaction_history = tool_context.state.get("interaction_history")
-            new_state = { 
-                "customer_info": None, 
-                "plan_details": None,
-                "interaction_history": interaction_history, 
-            }
-            if user_id:
-                user_data = self.get_user_profile(user_id)
-
-            # If customer found, update state with customer info
-            if user_data:
-                new_state["customer_info"] = {
-                    "customer_id" : user_data.get("user_id"),
-                    "first_name": user_data.get("first_name"),
-                    "last_name": user_data.get("last_name"),
-                    "phone_number": user_data.get("phone_number"),
-                    "email": user_data.get("email"),
-                    "user_type": user_data.get("user_type"),
-                }
-                new_state["plan_details"] = {
-                    "plan_id" :  user_data.get("plan_id"),
-                    "plan_name" :  user_data.get("plan_name"),
-                    "data_limit_gb": user_data.get("data"),
-                    "voice_minutes": user_data.get("calls"),
-                    "sms_allowance": user_data.get("msgs"),
-                    "monthly_fee": user_data.get("price"),
-                    "plan_description": user_data.get("description"),
-                    "plan_start": user_data.get("current_plan_start"),
-                    "plan_end": user_data.get("current_plan_end"),
-                }
-            tool_context.state["customer_info"] = new_state["customer_info"]
-            tool_context.state["plan_details"] = new_state["plan_details"]
-            
-            if net_amount > 0:
-                payment_message = f"₹{net_amount:.2f} deducted (₹{refund_amount:.2f} refunded)."
-            elif net_amount < 0:
-                payment_message = f"Plan downgraded. ₹{abs(net_amount):.2f} refunded to wallet (₹{refund_amount:.2f} total refund)."
-            else:
-                payment_message = f"No amount charged. Plan refund and cost are equal (₹{refund_amount:.2f})."
-            return payment_message
-
-        # POSTPAID flow
-        elif user_type == "postpaid":
-            # Immediate plan update (can be changed to next billing cycle if needed)
-            new_start = date.today()
-            new_end = new_start + timedelta(days=plan_duration)
-            update_user_query = """
-            UPDATE users SET plan_id = %s, current_plan_start = %s, current_plan_end = %s WHERE id = %s
-            """
-            self.db.execute_update(update_user_query, (new_plan_id, new_start, new_end, user_id))
-
-            # Log transaction (no amount deducted)
-            txn_query = """
-            INSERT INTO transactions (user_id, plan_id, transaction_type, status, transaction_date, amount_paid)
-            VALUES (%s, %s, 'recharge', 'success', CURRENT_TIMESTAMP, 0.00)
-            """
-            self.db.execute_update(txn_query, (user_id, new_plan_id))
-
-            interaction_history = tool_context.state.get("interaction_history")
-            new_state = { 
-                "customer_info": None, 
-                "plan_details": None,
-                "interaction_history": interaction_history, 
-            }
-            if user_id:
-                user_data = self.get_user_profile(user_id)
-
-            # If customer found, update state with customer info
-            if user_data:
-                new_state["customer_info"] = {
-                    "customer_id" : user_data.get("user_id"),
-                    "first_name": user_data.get("first_name"),
-                    "last_name": user_data.get("last_name"),
-                    "phone_number": user_data.get("phone_number"),
-                    "email": user_data.get("email"),
-                    "user_type": user_data.get("user_type"),
-                }
-                new_state["plan_details"] = {
-                    "plan_id" :  user_data.get("plan_id"),
-                    "plan_name" :  user_data.get("plan_name"),
-                    "data_limit_gb": user_data.get("data"),
-                    "voice_minutes": user_data.get("calls"),
-                    "sms_allowance": user_data.get("msgs"),
-                    "monthly_fee": user_data.get("price"),
-                    "plan_description": user_data.get("description"),
-                    "plan_start": user_data.get("current_plan_start"),
-                    "plan_end": user_data.get("current_plan_end"),
-                }
-            tool_context.state = new_state
-
+        new_start = date.today()
+        new_end = new_start + timedelta(days=new_plan["duration"])
+
+        try:
+            with self.db.transaction() as cursor:
+                # Lock the user and wallet rows so concurrent recharges are serialised
+                cursor.execute(USER_WALLET_LOCK_QUERY, (user_id,))
+                user = cursor.fetchone()
+                if not user:
+                    return "User not found."
+                if user["status"] != "active":
+                    return "User is not active."
+
+                user_type = user["user_type"]
+
+                if user_type == "prepaid":
+                    if user["balance"] is None:
+                        return "Wallet not found."
+                    balance = float(user["balance"])
+                    refund_amount = 0.00
+
+                    # Calculate refund for the unused part of the old plan
+                    old_plan = None
+                    if user["plan_id"]:
+                        old_lookup = catalog_cache.lookup("plans", user["plan_id"])
+                        if "error" in old_lookup:
+                            return f"Recharge failed: could not read the plan catalog ({old_lookup['error']})"
+                        old_plan = old_lookup["data"]
+                    if old_plan and user["current_plan_start"] and old_plan["duration"]:
+                        total_days = old_plan["duration"]
+                        days_used = (date.today() - user["current_plan_start"]).days
+                        days_remaining = max(total_days - days_used, 0)
+                        refund_amount = round((days_remaining / total_days) * float(old_plan["price"]), 2)
+
+                    net_amount = plan_price - refund_amount
+                    if net_amount > 0 and balance < net_amount:
+                        return f"Insufficient wallet balance. Required: ₹{net_amount:.2f}, Available: ₹{balance:.2f}"
+                    amount_paid = net_amount
+                elif user_type == "postpaid":
+                    # Immediate plan update (can be changed to next billing cycle if needed)
+                    net_amount = 0.00
+                    amount_paid = 0.00
+                else:
+                    return f"Unknown user type: {user_type}"
+
+                # Wallet adjustment, plan switch and transaction log in one statement
+                cursor.execute(RECHARGE_APPLY_QUERY, {
+                    "user_id": user_id,
+                    "plan_id": new_plan_id,
+                    "net_amount": net_amount,
+                    "start": new_start,
+                    "end": new_end,
+                    "amount_paid": amount_paid,
+                })
+                user_data = cursor.fetchone()
+        except Exception as e:
+            print(f"❌ Recharge failed for user {user_id}: {e}")
+            return f"Recharge failed: {e}"
+
+        self._update_profile_state(tool_context, user_data)
+
+        if user_type == "postpaid":
             return f"Postpaid plan changed to '{plan_name}'. No immediate charge. Will be billed in next cycle."
-
-        else:
-            return f"Unknown user type: {user_type}"
+        if net_amount > 0:
+            return f"₹{net_amount:.2f} deducted (₹{refund_amount:.2f} refunded)."
+        elif net_amount < 0:
+            return f"Plan downgraded. ₹{abs(net_amount):.2f} refunded to wallet (₹{refund_amount:.2f} total refund)."
+        return f"No amount charged. Plan refund and cost are equal (₹{refund_amount:.2f})."
+
+    def _update_profile_state(self, tool_context: ToolContext, user_data: Optional[Dict[str, Any]]):
+        """Refresh customer_info and plan_details in state from a profile row."""
+        if not user_data:
+            return
+        user_data = self.db.serialize_rows([user_data])[0]
+        tool_context.state["customer_info"] = {
+            "customer_id" : user_data.get("user_id"),
+            "first_name": user_data.get("first_name"),
+            "last_name": user_data.get("last_name"),
+            "phone_number": user_data.get("phone_number"),
+            "email": user_data.get("email"),
+            "user_type": user_data.get("user_type"),
+        }
+        tool_context.state["plan_details"] = {
+            "plan_id" :  user_data.get("plan_id"),
+            "plan_name" :  user_data.get("plan_name"),
+            "data_limit_gb": user_data.get("data"),
+            "voice_minutes": user_data.get("calls"),
+            "sms_allowance": user_data.get("msgs"),
+            "monthly_fee": user_data.get("price"),
+            "plan_description": user_data.get("description"),
+            "plan_start": user_data.get("current_plan_start"),
+            "plan_end": user_data.get("current_plan_end"),
+        }
 
     def purchase_addon(self, user_id: int, addon_id: int) -> str:
         """
@@ -463,94 +454,88 @@ class CustomerServiceTools:
         Returns:
             str: Status message.
         """
-
-        # 1. Validate user exists
-        user_query = "SELECT id, status FROM users WHERE id = %s"
-        user = self.db.execute_query(user_query, (user_id,))
-        if not user:
-            return "User not found or inactive."
-        user = user["data"][0]
-        if user["status"] != "active":
-            return "User not found or inactive."
-
-        # 2. Get addon details
-        addon_query = """
-        SELECT addon_id, addon_type, price
-        FROM addons
-        WHERE addon_id = %s
-        """
-        addon = self.db.execute_query(addon_query, (addon_id,))
+        lookup = catalog_cache.lookup("addons", addon_id)
+        if "error" in lookup:
+            return f"Addon purchase failed: could not read the addon catalog ({lookup['error']})"
+        addon = lookup["data"]
         if not addon:
             return "Addon not found."
-        addon = addon["data"][0]
         addon_price = float(addon["price"])
         addon_type = addon["addon_type"]
 
-        # 3. Get wallet balance
-        wallet_query = "SELECT balance FROM wallet WHERE user_id = %s"
-        wallet = self.db.execute_query(wallet_query, (user_id,))
-        if not wallet:
-            return "Wallet not found."
-        wallet = wallet["data"][0]
-        balance = float(wallet["balance"])
-        if balance < addon_price:
-            return f"Insufficient balance. Addon price is ₹{addon_price:.2f}, available balance is ₹{balance:.2f}"
-
-        # 4. Deduct from wallet
-        update_wallet_query = """
-        UPDATE wallet
-        SET balance = balance - %s, last_updated = CURRENT_TIMESTAMP
-        WHERE user_id = %s
-        """
-        self.db.execute_update(update_wallet_query, (addon_price, user_id))
-
-        # 5. Insert into user_addons (28-day default validity)
-        added_on = datetime.now().date()
-        expiry_date = added_on + timedelta(days=28)  # Can be customized per addon
-
-        insert_user_addon_query = """
-        INSERT INTO user_addons (user_id, addon_id, added_on, expiry_date)
-        VALUES (%s, %s, %s, %s)
-        """
-        self.db.execute_update(insert_user_addon_query, (user_id, addon_id, added_on, expiry_date))
-
-        # 6. Log transaction
-        txn_query = """
-        INSERT INTO transactions (user_id, addon_id, transaction_type, status, transaction_date, amount_paid)
-        VALUES (%s, %s, 'addon_purchase', 'success', CURRENT_TIMESTAMP, %s)
-        """
-        self.db.execute_update(txn_query, (user_id, addon_id, addon_price))
+        try:
+            with self.db.transaction() as cursor:
+                # Validate user and wallet while holding the wallet lock
+                cursor.execute(USER_WALLET_LOCK_QUERY, (user_id,))
+                row = cursor.fetchone()
+                if not row or row["status"] != "active":
+                    return "User not found or inactive."
+                if row["balance"] is None:
+                    return "Wallet not found."
+
+                balance = float(row["balance"])
+                if balance < addon_price:
+                    return f"Insufficient balance. Addon price is ₹{addon_price:.2f}, available balance is ₹{balance:.2f}"
+
+                # 28-day default validity, can be customized per addon
+                added_on = datetime.now().date()
+                expiry_date = added_on + timedelta(days=28)
+
+                # Deduct, attach addon and log transaction in one statement
+                cursor.execute(ADDON_APPLY_QUERY, {
+                    "user_id": user_id,
+                    "addon_id": addon_id,
+                    "price": addon_price,
+                    "added_on": added_on,
+                    "expiry_date": expiry_date,
+                })
+        except Exception as e:
+            print(f"❌ Addon purchase failed for user {user_id}: {e}")
+            return f"Addon purchase failed: {e}"
 
         return f"Addon '{addon_type}' purchased successfully. ₹{addon_price:.2f} deducted. Valid until {expiry_date}."
 
-    def check_wallet_balance(self, user_id: int) -> str:
+    def get_wallet_balance(self, user_id: int) -> Dict[str, Any]:
         """
-        Checks the current wallet balance for a user.
+        Looks up the wallet balance for an active user.
 
         Args:
             user_id (int): ID of the user.
 
         Returns:
-            str: Message with balance or appropriate error.
+            {"balance": float} or {"error": message}.
         """
 
         # Validate user
         user_query = "SELECT id, status FROM users WHERE id = %s"
         user = self.db.execute_query(user_query, (user_id,))
-        if not user:
-            return "User not found."
+        if not user.get("data"):
+            return {"error": "User not found."}
         user = user["data"][0]
         if user["status"] != "active":
-            return "User is inactive."
+            return {"error": "User is inactive."}
 
         # Get wallet balance
         wallet_query = "SELECT balance FROM wallet WHERE user_id = %s"
         wallet = self.db.execute_query(wallet_query, (user_id,))
-        if not wallet:
-            return "Wallet not found."
-        wallet = wallet["data"][0]
-        balance = float(wallet["balance"])
-        return f"Wallet balance for user {user_id} is ₹{balance:.2f}."
+        if not wallet.get("data"):
+            return {"error": "Wallet not found."}
+        return {"balance": float(wallet["data"][0]["balance"])}
+
+    def check_wallet_balance(self, user_id: int) -> str:
+        """
+        Checks the current wallet balance for a user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            str: Message with balance or appropriate error.
+        """
+        wallet = self.get_wallet_balance(user_id)
+        if "error" in wallet:
+            return wallet["error"]
+        return f"Wallet balance for user {user_id} is ₹{wallet['balance']:.2f}."
 
     def get_user_addons(self, user_id: int) -> List[Dict[str, Any]]:
         """
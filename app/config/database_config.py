@@ -1,14 +1,23 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
+import threading
+from contextlib import contextmanager
 from typing import Dict, Any
 from datetime import datetime
 import json
 from dotenv import load_dotenv
+from config.db_pool import AsyncConnectionPool, ConnectionPool
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Pools are shared by every DatabaseConfig instance (one per tools object / agent)
+_pool_lock = threading.Lock()
+_pool = None
+_async_pool = None
+
+
 class DatabaseConfig:
     def __init__(self):
         self.connection_params = {
@@ -20,15 +29,50 @@ class DatabaseConfig:
             "sslmode": os.getenv("DB_SSLMODE", "require")
         }
 
+    @property
+    def pool(self) -> ConnectionPool:
+        """Process-wide connection pool, created on first use"""
+        global _pool
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = ConnectionPool(self.connection_params)
+        return _pool
+
+    @property
+    def async_pool(self) -> AsyncConnectionPool:
+        """Process-wide async connection pool for coroutine code, created on first use"""
+        global _async_pool
+        if _async_pool is None:
+            with _pool_lock:
+                if _async_pool is None:
+                    _async_pool = AsyncConnectionPool(self.connection_params)
+        return _async_pool
+
     def get_connection(self):
-        """Get database connection with error handling"""
+        """Check a connection out of the pool; return it with release_connection()"""
         try:
-            conn = psycopg2.connect(**self.connection_params)
-            return conn
+            return self.pool.getconn()
         except Exception as e:
             print(f"Database connection failed: {e}")
             return None
 
+    def release_connection(self, conn, discard: bool = False):
+        """Return a connection obtained from get_connection() to the pool"""
+        self.pool.putconn(conn, discard=discard or bool(conn.closed))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Pool size and checkout/wait metrics for the sync and async pools.
+
+        Never creates a pool, so it is safe to call from async handlers: a pool
+        that has not been used yet is reported as not initialised.
+        """
+        stats = {}
+        for name, pool in (("sync", _pool), ("async", _async_pool)):
+            stats[name] = pool.stats() if pool is not None else {"status": "not initialised"}
+        return stats
+
     def execute_query(self, query: str, params: tuple = None) -> Dict[str, Any]:
         """Execute query safely with parameterized inputs"""
         conn = self.get_connection()
@@ -40,19 +84,8 @@ class DatabaseConfig:
                 cursor.execute(query, params)
                 if query.strip().upper().startswith('SELECT'):
                     result = cursor.fetchall()
-                    # Convert datetime objects to strings to make them JSON serializable
-                    serializable_result = []
-                    for row in result:
-                        serializable_row = {}
-                        for key, value in dict(row).items():
-                            if isinstance(value, datetime):
-                                # Ensure datetime objects are converted into strings
-                                serializable_row[key] = value.strftime("%Y-%m-%d %H:%M:%S")
-                            else:
-                                serializable_row[key] = value
-                        serializable_result.append(serializable_row)
-
-                    return {"success": True, "data": serializable_result}
+                    conn.commit()
+                    return {"success": True, "data": self.serialize_rows(result)}
 
                 else:
                     conn.commit()
@@ -63,7 +96,64 @@ class DatabaseConfig:
             return {"error": str(e)}
 
         finally:
-            conn.close()
+            self.release_connection(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several statements atomically on a single pooled connection.
+
+        Yields a RealDictCursor; commits when the block exits normally and
+        rolls back if it raises.
+        """
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    async def execute_query_async(self, query: str, params: tuple = None) -> Dict[str, Any]:
+        """Async variant of execute_query using the async pool"""
+        from psycopg.rows import dict_row
+
+        try:
+            async with self.async_pool.connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    await cursor.execute(query, params)
+                    if query.strip().upper().startswith('SELECT'):
+                        result = await cursor.fetchall()
+                        return {"success": True, "data": self.serialize_rows(result)}
+                    return {"success": True, "affected_rows": cursor.rowcount}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def execute_update_async(self, query: str, params: tuple) -> bool:
+        """Async variant of execute_update using the async pool"""
+        try:
+            async with self.async_pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+            return True
+        except Exception as e:
+            print(f"❌ Error executing update: {e}")
+            return False
+
+    @staticmethod
+    def serialize_rows(rows) -> list:
+        """Convert datetime objects to strings to make rows JSON serializable"""
+        serializable_result = []
+        for row in rows:
+            serializable_row = {}
+            for key, value in dict(row).items():
+                if isinstance(value, datetime):
+                    serializable_row[key] = value.strftime("%Y-%m-%d %H:%M:%S")
+                else:
+                    serializable_row[key] = value
+            serializable_result.append(serializable_row)
+        return serializable_result
 
     def execute_update(self, query: str, params: tuple) -> bool:
         """
@@ -89,7 +179,7 @@ class DatabaseConfig:
             print(f"❌ Error executing update: {e}")
             return False
         finally:
-            conn.close()
+            self.release_connection(conn)
 
     def to_json(self, data: Dict[str, Any]) -> str:
         """Convert the result to JSON"""
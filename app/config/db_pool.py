@@ -0,0 +1,306 @@
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+import psycopg2
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PoolConfig:
+    """Pool sizing and maintenance settings, read from the environment."""
+
+    def __init__(self):
+        self.min_size = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+        self.max_size = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+        # Seconds to wait for a free connection before giving up
+        self.timeout = float(os.getenv("DB_POOL_TIMEOUT", 10))
+        # Connections idle longer than this are closed (down to min_size)
+        self.max_idle = float(os.getenv("DB_POOL_MAX_IDLE", 300))
+        # Connections idle longer than this are pinged before being handed out
+        self.check_interval = float(os.getenv("DB_POOL_CHECK_INTERVAL", 30))
+
+
+class PoolMetrics:
+    """Checkout and wait-time counters shared by the sync and async pools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.failed_health_checks = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_checkout_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_checkin(self, held_ms: float):
+        with self._lock:
+            self.total_checkout_ms += held_ms
+
+    def incr(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "failed_health_checks": self.failed_health_checks,
+                "avg_wait_ms": round(self.total_wait_ms / checkouts, 3),
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "avg_checkout_ms": round(self.total_checkout_ms / checkouts, 3),
+            }
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are health-checked before being handed out when they have been
+    idle longer than `check_interval`, and connections idle longer than
+    `max_idle` are closed as long as the pool stays at or above `min_size`.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], config: Optional[PoolConfig] = None):
+        self.connection_params = connection_params
+        self.config = config or PoolConfig()
+        self.metrics = PoolMetrics()
+        self._cond = threading.Condition()
+        self._idle = []  # list of (connection, last_used_monotonic)
+        self._size = 0
+        self._closed = False
+        # psycopg2 connections do not accept extra attributes, so track checkouts by id
+        self._checked_out = {}
+
+        for _ in range(self.config.min_size):
+            try:
+                self._idle.append((self._connect(), time.monotonic()))
+                self._size += 1
+            except Exception as e:
+                # The pool still works without warm connections; they are opened on demand
+                print(f"Database pool warm-up failed: {e}")
+                break
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connection_params)
+        self.metrics.incr("connections_created")
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.metrics.incr("connections_closed")
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.config.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            self.metrics.incr("failed_health_checks")
+            return False
+
+    def _evict_idle(self):
+        """Close connections idle beyond max_idle. Caller must hold the lock."""
+        now = time.monotonic()
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.config.max_idle and self._size > self.config.min_size:
+                self._size -= 1
+                self._discard(conn)
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def getconn(self):
+        """Check out a connection, waiting up to the pool timeout for one to free up."""
+        started = time.monotonic()
+        deadline = started + self.config.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                self._evict_idle()
+
+                candidate = None
+                if self._idle:
+                    # Most recently used connection first; keeps the rest eligible for eviction
+                    candidate = self._idle.pop()
+                elif self._size < self.config.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics.incr("timeouts")
+                        raise PoolTimeout(
+                            f"No database connection available within {self.config.timeout}s"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            # Connect / health-check outside the lock so other threads are not blocked
+            if candidate is not None:
+                conn, last_used = candidate
+                if self._is_healthy(conn, time.monotonic() - last_used):
+                    break
+                self._discard(conn)
+                with self._cond:
+                    self._size -= 1
+                continue
+
+            try:
+                conn = self._connect()
+                break
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        self.metrics.record_wait((time.monotonic() - started) * 1000)
+        with self._cond:
+            self._checked_out[id(conn)] = time.monotonic()
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool; broken or discarded connections are closed."""
+        with self._cond:
+            checkout_at = self._checked_out.pop(id(conn), None)
+        if checkout_at is not None:
+            self.metrics.record_checkin((time.monotonic() - checkout_at) * 1000)
+
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            state = {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.config.min_size,
+                "max_size": self.config.max_size,
+            }
+        state.update(self.metrics.snapshot())
+        return state
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+
+class AsyncConnectionPool:
+    """
+    Async counterpart of ConnectionPool for coroutine code, backed by psycopg 3's
+    AsyncConnectionPool so queries keep the same %s placeholders.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], config: Optional[PoolConfig] = None):
+        try:
+            from psycopg_pool import AsyncConnectionPool as _PsycopgAsyncPool
+        except ImportError as e:
+            raise ImportError(
+                "The async database pool requires psycopg 3: pip install 'psycopg[binary,pool]'"
+            ) from e
+
+        self.config = config or PoolConfig()
+        self.metrics = PoolMetrics()
+        params = dict(connection_params)
+        params["dbname"] = params.pop("database", None)
+        self._pool = _PsycopgAsyncPool(
+            kwargs=params,
+            min_size=self.config.min_size,
+            max_size=self.config.max_size,
+            timeout=self.config.timeout,
+            max_idle=self.config.max_idle,
+            check=_PsycopgAsyncPool.check_connection,
+            open=False,
+        )
+        self._opened = False
+
+    async def open(self):
+        if not self._opened:
+            await self._pool.open()
+            self._opened = True
+
+    @asynccontextmanager
+    async def connection(self):
+        await self.open()
+        started = time.monotonic()
+        try:
+            async with self._pool.connection() as conn:
+                self.metrics.record_wait((time.monotonic() - started) * 1000)
+                checkout_at = time.monotonic()
+                try:
+                    yield conn
+                finally:
+                    self.metrics.record_checkin((time.monotonic() - checkout_at) * 1000)
+        except Exception as e:
+            if type(e).__name__ == "PoolTimeout":
+                self.metrics.incr("timeouts")
+                raise PoolTimeout(str(e)) from e
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        state = dict(self._pool.get_stats()) if self._opened else {}
+        state.update(self.metrics.snapshot())
+        return state
+
+    async def close(self):
+        if self._opened:
+            await self._pool.close()
+            self._opened = False
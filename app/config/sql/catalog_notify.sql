@@ -0,0 +1,20 @@
+-- Publishes catalog edits on the catalog_changed channel so every app process
+-- can drop its cached copy of the table (see config/catalog_cache.py).
+-- Apply once per database: psql -f app/config/sql/catalog_notify.sql
+
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS plans_catalog_changed ON plans;
+CREATE TRIGGER plans_catalog_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plans
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+DROP TRIGGER IF EXISTS addons_catalog_changed ON addons;
+CREATE TRIGGER addons_catalog_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON addons
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    """Parse "tool_a=4,tool_b=2" into {"tool_a": 4, "tool_b": 2}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class ToolExecutor:
+    """
+    Runs blocking tool and database calls on a bounded thread pool so they never
+    stall the asyncio event loop, with an optional concurrency cap per tool.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", 32))
+        self.default_limit = int(os.getenv("TOOL_DEFAULT_CONCURRENCY", 16))
+        self.limits = _parse_limits(os.getenv("TOOL_CONCURRENCY_LIMITS", ""))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="tool-worker"
+        )
+        # asyncio.Semaphore must be created on the loop that uses it
+        self._semaphores: Dict[tuple, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        key = (id(asyncio.get_running_loop()), name)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(name, self.default_limit))
+            self._semaphores[key] = semaphore
+        return semaphore
+
+    def _record(self, name: str, wait_ms: float, run_ms: float, failed: bool):
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"calls": 0, "errors": 0, "total_wait_ms": 0.0, "total_run_ms": 0.0, "max_run_ms": 0.0}
+            )
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["total_wait_ms"] += wait_ms
+            stats["total_run_ms"] += run_ms
+            stats["max_run_ms"] = max(stats["max_run_ms"], run_ms)
+
+    async def run(self, fn: Callable, *args, name: str = None, **kwargs) -> Any:
+        """Await `fn(*args, **kwargs)` on the worker pool, respecting the per-tool limit."""
+        name = name or getattr(fn, "__name__", "blocking_call")
+        queued_at = time.perf_counter()
+        async with self._semaphore(name):
+            started = time.perf_counter()
+            failed = False
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(fn, *args, **kwargs)
+                )
+            except Exception:
+                failed = True
+                raise
+            finally:
+                finished = time.perf_counter()
+                self._record(name, (started - queued_at) * 1000, (finished - started) * 1000, failed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for name, stats in self._stats.items():
+                calls = stats["calls"] or 1
+                tools[name] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "limit": self.limits.get(name, self.default_limit),
+                    "avg_wait_ms": round(stats["total_wait_ms"] / calls, 3),
+                    "avg_run_ms": round(stats["total_run_ms"] / calls, 3),
+                    "max_run_ms": round(stats["max_run_ms"], 3),
+                }
+        return {"max_workers": self.max_workers, "tools": tools}
+
+
+executor = ToolExecutor()
+
+
+async def run_blocking(fn: Callable, *args, name: str = None, **kwargs) -> Any:
+    """Run a blocking callable off the event loop using the shared executor."""
+    return await executor.run(fn, *args, name=name, **kwargs)
+
+
+def offload(fn: Callable) -> Callable:
+    """
+    Wrap a synchronous agent tool so ADK awaits it on the worker pool.
+
+    functools.wraps keeps the name, docstring and signature (via __wrapped__)
+    that ADK uses to build the tool declaration and inject tool_context.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await executor.run(fn, *args, name=fn.__name__, **kwargs)
+
+    return wrapper
@@ -0,0 +1,192 @@
+import logging
+import math
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+from google.adk.models import LlmResponse
+from google.adk.sessions import Session
+
+from tracing import trace
+
+HISTORY_STATE_KEY = "interaction_history"
+SUMMARY_STATE_KEY = "interaction_summary"
+# Rendered, budgeted history that agent instructions splice in
+CONTEXT_STATE_KEY = "interaction_context"
+
+GIST_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting."""
+    return math.ceil(len(text) / 4)
+
+
+def _parse_budgets(raw: str) -> Dict[str, int]:
+    budgets = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, value = item.partition("=")
+        budgets[name.strip()] = int(value)
+    return budgets
+
+
+def format_entry(entry: Any) -> str:
+    """One history entry, verbatim."""
+    if not isinstance(entry, dict):
+        return str(entry)
+    timestamp = entry.get("timestamp", "")
+    action = entry.get("action")
+    if action == "user_query":
+        return f"[{timestamp}] user: {entry.get('query', '')}"
+    if action == "agent_response":
+        return f"[{timestamp}] {entry.get('agent', 'agent')}: {entry.get('response', '')}"
+    details = ", ".join(f"{k}: {v}" for k, v in entry.items() if k not in ("action", "timestamp"))
+    return f"[{timestamp}] {action}: {details}"
+
+
+def gist(entry: Any) -> str:
+    """One-line summary of an entry for the rolling summary."""
+    line = format_entry(entry).replace("\n", " ")
+    return line if len(line) <= GIST_CHARS else line[: GIST_CHARS - 3] + "..."
+
+
+class ContextBudget:
+    """
+    Keeps the interaction history injected into agent prompts bounded.
+
+    The last `CONTEXT_VERBATIM_TURNS` entries are kept verbatim; anything older
+    is reduced to one gist line per entry, its first `GIST_CHARS` characters.
+    Entries spilled out of the history ring buffer are folded into a rolling
+    "summary" kept in state. This is truncation, not summarisation: nothing is
+    condensed by a model, and past `CONTEXT_SUMMARY_TOKENS` the oldest gists are
+    simply dropped. Each agent then renders the gists plus the verbatim turns
+    within its own token budget (`CONTEXT_TOKEN_BUDGET`, with per-agent
+    overrides in `CONTEXT_TOKEN_BUDGETS="tech_support_agent=800,..."`), again by
+    dropping the oldest lines first.
+    """
+
+    def __init__(self):
+        self.verbatim_turns = int(os.getenv("CONTEXT_VERBATIM_TURNS", 6))
+        self.summary_tokens = int(os.getenv("CONTEXT_SUMMARY_TOKENS", 400))
+        self.default_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+        self.budgets = _parse_budgets(os.getenv("CONTEXT_TOKEN_BUDGETS", ""))
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def budget_for(self, agent_name: str) -> int:
+        return self.budgets.get(agent_name, self.default_budget)
+
+    def fold(self, summary: str, entry: Any) -> str:
+        """Append a spilled entry's gist to the rolling summary, dropping the oldest gists past the cap."""
+        lines = summary.splitlines() if summary else []
+        lines.append(gist(entry))
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def render(self, history: List[Any], summary: str, agent_name: str) -> str:
+        """Summary plus the most recent verbatim turns, within the agent's budget."""
+        budget = self.budget_for(agent_name)
+        split = max(len(history) - self.verbatim_turns, 0)
+        verbatim = [format_entry(entry) for entry in history[split:]]
+        # The stored summary covers entries spilled out of the ring buffer; entries
+        # still buffered but outside the verbatim window are summarised here.
+        summary_lines = summary.splitlines() if summary else []
+        summary_lines += [gist(entry) for entry in history[:split]]
+
+        def assemble():
+            parts = []
+            if summary_lines:
+                parts.append("Earlier conversation (summary):\n" + "\n".join(summary_lines))
+            if verbatim:
+                parts.append("Recent turns:\n" + "\n".join(verbatim))
+            return "\n\n".join(parts) if parts else "No previous interactions."
+
+        text = assemble()
+        # Trim the oldest summary lines first, then the oldest verbatim turns
+        while estimate_tokens(text) > budget and (summary_lines or len(verbatim) > 1):
+            if summary_lines:
+                summary_lines.pop(0)
+            else:
+                verbatim.pop(0)
+            text = assemble()
+        return text
+
+    def before_agent_callback(self, callback_context: CallbackContext) -> None:
+        """Render this agent's view of the history into state before its prompt is built."""
+        state = callback_context.state
+        context = self.render(
+            list(state.get(HISTORY_STATE_KEY) or []),
+            state.get(SUMMARY_STATE_KEY) or "",
+            callback_context.agent_name,
+        )
+        state[CONTEXT_STATE_KEY] = context
+        self._record(callback_context.agent_name, "context_tokens", estimate_tokens(context))
+        return None
+
+    def prime_session(self, session_service, session: Session, agent_name: str) -> str:
+        """
+        Render the history into state before a live run, which skips agent callbacks.
+
+        In google-adk 0.3.0, BaseAgent.run_live goes straight to the agent's
+        live implementation without calling before_agent_callback. So on the
+        /ws path `{interaction_context}` would otherwise stay empty, or stale on
+        a resumed session. The live connection sends each agent's instruction
+        once, so rendering it at session start with the root agent's budget is
+        what the model sees, including after a transfer.
+        """
+        context = self.render(
+            list(session.state.get(HISTORY_STATE_KEY) or []),
+            session.state.get(SUMMARY_STATE_KEY) or "",
+            agent_name,
+        )
+        session_service.append_event(session, Event(
+            invocation_id=f"context-{uuid.uuid4()}",
+            author="user",
+            actions=EventActions(state_delta={CONTEXT_STATE_KEY: context}),
+        ))
+        self._record(agent_name, "context_tokens", estimate_tokens(context))
+        return context
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Report the prompt size the model actually billed for this call."""
+        if llm_response.partial:
+            return None
+        usage = getattr(llm_response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+        if prompt_tokens:
+            self._record(callback_context.agent_name, "prompt_tokens", prompt_tokens)
+            trace("prompt_tokens", logging.DEBUG, agent=callback_context.agent_name, prompt_tokens=prompt_tokens)
+        return None
+
+    def _record(self, agent_name: str, metric: str, value: int):
+        with self._lock:
+            stats = self._stats.setdefault(agent_name, {})
+            stats[f"{metric}_calls"] = stats.get(f"{metric}_calls", 0) + 1
+            stats[f"{metric}_total"] = stats.get(f"{metric}_total", 0) + value
+            stats[f"{metric}_max"] = max(stats.get(f"{metric}_max", 0), value)
+            stats[f"{metric}_last"] = value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {}
+            for agent_name, stats in self._stats.items():
+                entry = {"budget_tokens": self.budget_for(agent_name)}
+                for metric in ("context_tokens", "prompt_tokens"):
+                    calls = stats.get(f"{metric}_calls", 0)
+                    if calls:
+                        entry[metric] = {
+                            "last": stats[f"{metric}_last"],
+                            "avg": round(stats[f"{metric}_total"] / calls, 1),
+                            "max": stats[f"{metric}_max"],
+                        }
+                report[agent_name] = entry
+        return report
+
+
+context_budget = ContextBudget()
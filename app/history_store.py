@@ -0,0 +1,168 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import Session
+
+from context_budget import HISTORY_STATE_KEY, SUMMARY_STATE_KEY, context_budget
+
+
+class SqliteHistorySpill:
+    """Keeps entries that fell out of a session's ring buffer in a local SQLite file."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS interaction_history ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, entry TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.commit()
+
+    def write(self, session_id: str, seq: int, entry: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interaction_history VALUES (?, ?, ?)",
+                (session_id, seq, json.dumps(entry, default=str)),
+            )
+            self._conn.commit()
+
+    def read(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM interaction_history WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def last_seq(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(seq) FROM interaction_history WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row and row[0] is not None else -1
+
+
+class _SessionHistory:
+    def __init__(self, entries: List[Dict[str, Any]], max_entries: int, next_seq: int, summary: str):
+        self.window = deque(entries[-max_entries:], maxlen=max_entries)
+        # Sequence number the next appended entry will get (spilled entries keep theirs)
+        self.next_seq = next_seq
+        # Rolling summary of every entry that has left the window
+        self.summary = summary
+
+
+class InteractionHistoryStore:
+    """
+    Per-session interaction history with O(1) appends.
+
+    Each session keeps its most recent `HISTORY_MAX_ENTRIES` entries in a ring
+    buffer; older entries are folded into the rolling prompt summary and
+    spilled to SQLite (`HISTORY_SPILL_PATH`, empty to discard them). The
+    buffer is published to ADK state as a state delta on an appended event
+    instead of re-creating the session with a copied state.
+
+    With a shared session backend (`SESSION_BACKEND` other than memory),
+    another worker may have appended since this one last did. The buffer is
+    therefore re-read from the stored session on every append, not served
+    from this process's copy.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, spill_path: Optional[str] = None,
+                 shared: Optional[bool] = None):
+        self.max_entries = max_entries or int(os.getenv("HISTORY_MAX_ENTRIES", 50))
+        if shared is None:
+            shared = os.getenv("SESSION_BACKEND", "memory").lower() != "memory"
+        self.shared = shared
+        if spill_path is None:
+            spill_path = os.getenv("HISTORY_SPILL_PATH", "interaction_history.sqlite")
+        self.spill = SqliteHistorySpill(spill_path) if spill_path else None
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, _SessionHistory] = {}
+
+    def _load(self, session_service, app_name, user_id, session_id,
+              session: Optional[Session]) -> Tuple[_SessionHistory, Optional[Session]]:
+        """
+        Seed the ring buffer from session state: once per session, or on every call if shared.
+
+        Returns the buffer and the session to append through: the caller's, or
+        the one loaded from the service.
+        """
+        history = None if self.shared else self._sessions.get(session_id)
+        if history is None or session is None:
+            session = session or session_service.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+        if history is None:
+            state = session.state if session else {}
+            entries = list(state.get(HISTORY_STATE_KEY) or [])
+            summary = state.get(SUMMARY_STATE_KEY) or ""
+            first_seq = self.spill.last_seq(session_id) + 1 if self.spill else 0
+            overflow = max(len(entries) - self.max_entries, 0)
+            for offset, entry in enumerate(entries[:overflow]):
+                summary = context_budget.fold(summary, entry)
+                if self.spill:
+                    self.spill.write(session_id, first_seq + offset, entry)
+            history = _SessionHistory(entries, self.max_entries, first_seq + len(entries), summary)
+            self._sessions[session_id] = history
+        return history, session
+
+    def append(self, session_service, app_name, user_id, session_id, entry: Dict[str, Any],
+               session: Optional[Session] = None):
+        """
+        Append one entry and publish the updated buffer to session state.
+
+        Pass `session` when a runner holds that session object (e.g. a live
+        session). The delta is then applied to it, and its update time moves
+        with the stored row. Otherwise the current session is loaded from the
+        service, so ADK's stale-session check still guards against conflicting
+        writes.
+        """
+        with self._lock:
+            history, session = self._load(session_service, app_name, user_id, session_id, session)
+            if session is None:
+                print(f"⚠️ Session {session_id} not found, history entry not stored")
+                return
+            if len(history.window) == history.window.maxlen:
+                oldest = history.window[0]
+                history.summary = context_budget.fold(history.summary, oldest)
+                if self.spill:
+                    self.spill.write(session_id, history.next_seq - len(history.window), oldest)
+            history.window.append(entry)
+            history.next_seq += 1
+            state_delta = {HISTORY_STATE_KEY: list(history.window), SUMMARY_STATE_KEY: history.summary}
+
+        # A state-only event: ADK applies the delta to the stored session without
+        # touching the rest of the state or the conversation contents.
+        event = Event(
+            invocation_id=f"history-{uuid.uuid4()}",
+            author="user",
+            actions=EventActions(state_delta=state_delta),
+        )
+        session_service.append_event(session, event)
+
+    def entries(self, session_id: str) -> List[Dict[str, Any]]:
+        """The entries currently held in memory for a session (most recent last)."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            return list(history.window) if history else []
+
+    def full_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Spilled plus in-memory entries, oldest first."""
+        spilled = self.spill.read(session_id) if self.spill else []
+        return spilled + self.entries(session_id)
+
+    def drop(self, session_id: str):
+        """Release the in-memory buffer of a finished session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+history_store = InteractionHistoryStore()
@@ -0,0 +1,303 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from tracing import trace
+
+RECHARGE_AGENT = "recharge_billing_agent"
+PLAN_AGENT = "plan_enquiry_agent"
+TECH_AGENT = "tech_support_agent"
+FAQ_AGENT = "faq_agent"
+
+# Keyword rules: a message that matches exactly one agent's rules is routed without a model
+RULES: Dict[str, List[str]] = {
+    RECHARGE_AGENT: [
+        r"\bwallet\b", r"\brecharge\b", r"\btop[ -]?up\b", r"\btransactions?\b", r"\bpayment\b",
+        r"\bbill(ing)?\b", r"\brefund\b", r"\bbuy\b.*\badd[ -]?ons?\b",
+    ],
+    PLAN_AGENT: [
+        r"\bplans?\b", r"\bpacks?\b", r"\bvalidity\b", r"\btariff\b", r"\bcurrent subscription\b",
+        r"\bmy add[ -]?ons?\b", r"\bwhich add[ -]?ons?\b",
+    ],
+    TECH_AGENT: [
+        r"\bnot working\b", r"\bno (signal|service|network)\b", r"\bslow (internet|data|speed)\b",
+        r"\btickets?\b", r"\bcomplaint\b", r"\bcall drops?\b", r"\bcan'?t (connect|call)\b", r"\boutage\b",
+    ],
+    FAQ_AGENT: [
+        r"\bxstream\b", r"\bdth\b", r"\bfiber mesh\b", r"\bmesh node", r"\bset[ -]?top box\b",
+        r"\bchromecast\b", r"\bsim activation\b", r"\bkyc\b", r"\bsmart tv\b",
+    ],
+}
+
+# A few examples per agent so the classifier works before any analytics exist
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("what is my wallet balance", RECHARGE_AGENT),
+    ("recharge my number with the 299 plan", RECHARGE_AGENT),
+    ("show my last transactions", RECHARGE_AGENT),
+    ("add money and pay for my plan", RECHARGE_AGENT),
+    ("i want to buy a data addon", RECHARGE_AGENT),
+    ("which plans do you have", PLAN_AGENT),
+    ("tell me about unlimited data packs", PLAN_AGENT),
+    ("what is my current plan and its validity", PLAN_AGENT),
+    ("compare the prepaid plans", PLAN_AGENT),
+    ("my internet is not working", TECH_AGENT),
+    ("i have no signal at home", TECH_AGENT),
+    ("raise a complaint about call drops", TECH_AGENT),
+    ("what is the status of my ticket", TECH_AGENT),
+    ("does xstream tv need internet", FAQ_AGENT),
+    ("how do i activate a new sim card", FAQ_AGENT),
+    ("what is fiber mesh", FAQ_AGENT),
+    ("how to change channels on my dth box", FAQ_AGENT),
+]
+
+# conversation_analytics intent label keyword -> agent
+DEFAULT_LABEL_KEYWORDS = "recharge:recharge_billing_agent,billing:recharge_billing_agent," \
+    "payment:recharge_billing_agent,wallet:recharge_billing_agent,plan:plan_enquiry_agent," \
+    "tech:tech_support_agent,support:tech_support_agent,complaint:tech_support_agent," \
+    "faq:faq_agent,general:faq_agent"
+
+
+def _parse_label_keywords(raw: str) -> List[Tuple[str, str]]:
+    pairs = []
+    for item in raw.split(","):
+        if ":" in item:
+            keyword, agent = item.split(":", 1)
+            pairs.append((keyword.strip().lower(), agent.strip()))
+    return pairs
+
+
+def features(text: str, dim: int) -> np.ndarray:
+    """Hashed unigram + bigram counts, L2-normalised."""
+    tokens = re.findall(r"[a-z0-9']+", text.lower())
+    vector = np.zeros(dim, dtype=np.float32)
+    for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        vector[zlib.crc32(gram.encode()) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class LogisticIntentClassifier:
+    """Multinomial logistic regression over hashed n-grams, trained with plain gradient descent."""
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.labels: List[str] = []
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def fit(self, texts: List[str], labels: List[str], epochs: int = 300, lr: float = 1.0, l2: float = 1e-4):
+        self.labels = sorted(set(labels))
+        x = np.stack([features(text, self.dim) for text in texts])
+        y = np.zeros((len(labels), len(self.labels)), dtype=np.float32)
+        for row, label in enumerate(labels):
+            y[row, self.labels.index(label)] = 1.0
+        weights = np.zeros((self.dim, len(self.labels)), dtype=np.float32)
+        bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            probs = self._softmax(x @ weights + bias)
+            error = (probs - y) / len(texts)
+            weights -= lr * (x.T @ error + l2 * weights)
+            bias -= lr * error.sum(axis=0)
+        self.weights, self.bias = weights, bias
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        if self.weights is None:
+            return None, 0.0
+        probs = self._softmax(features(text, self.dim) @ self.weights + self.bias)
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+
+def _user_content(callback_context: CallbackContext) -> Optional[types.Content]:
+    """The customer message that started this invocation."""
+    content = getattr(callback_context, "user_content", None)
+    if content is None:
+        content = callback_context._invocation_context.user_content
+    return content
+
+
+class IntentRouter:
+    """
+    Routes clear-cut messages straight to a sub-agent, skipping the coordinator's LLM call.
+
+    Runs as the coordinator's before_model_callback. A message that matches the
+    keyword rules of exactly one agent is routed; otherwise the classifier's
+    prediction is used when its probability is at least `INTENT_ROUTER_THRESHOLD`.
+    Anything else falls through to the coordinator model. A routed turn returns
+    a synthetic `transfer_to_agent` call, which ADK executes as if the model
+    had made it.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("INTENT_ROUTER_THRESHOLD", 0.8))
+        self.min_words = int(os.getenv("INTENT_ROUTER_MIN_WORDS", 2))
+        self.rules = {agent: [re.compile(p, re.IGNORECASE) for p in patterns] for agent, patterns in RULES.items()}
+        self.classifier = LogisticIntentClassifier()
+        self.classifier.fit([text for text, _ in SEED_EXAMPLES], [agent for _, agent in SEED_EXAMPLES])
+        self._lock = threading.Lock()
+        # Invocations whose first coordinator call was already seen; bounded, oldest first
+        self._seen_invocations: "OrderedDict[str, None]" = OrderedDict()
+        self._stats: Dict[str, Any] = {
+            "messages": 0, "routed": {}, "by_rule": 0, "by_classifier": 0, "fallback": 0,
+            "decision_ms_total": 0.0, "training_examples": len(SEED_EXAMPLES),
+        }
+
+    # ----- training -----
+
+    def train_from_analytics(self, db) -> int:
+        """
+        Retrain on labelled conversations from conversation_analytics plus the seed examples.
+
+        conversation_analytics keeps no raw messages, so the default query trains
+        on each conversation's `title` against its `intent` labels (an array,
+        read as text). Override `INTENT_TRAINING_QUERY` to train on another
+        source; it must return `text` and `intent` columns.
+        """
+        query = os.getenv(
+            "INTENT_TRAINING_QUERY",
+            "SELECT title AS text, intent::text AS intent FROM conversation_analytics "
+            "WHERE intent IS NOT NULL AND title IS NOT NULL",
+        )
+        result = db.execute_query(query)
+        if "error" in result:
+            print(f"Intent router training skipped: {result['error']}")
+            return 0
+        label_keywords = _parse_label_keywords(os.getenv("INTENT_LABEL_KEYWORDS", DEFAULT_LABEL_KEYWORDS))
+        examples = list(SEED_EXAMPLES)
+        for row in result["data"]:
+            label = str(row.get("intent") or "").lower()
+            agent = next((a for keyword, a in label_keywords if keyword in label), None)
+            if agent and row.get("text"):
+                examples.append((str(row["text"]), agent))
+        classifier = LogisticIntentClassifier().fit([t for t, _ in examples], [a for _, a in examples])
+        self.classifier = classifier
+        with self._lock:
+            self._stats["training_examples"] = len(examples)
+        print(f"🧭 Intent router trained on {len(examples)} examples")
+        return len(examples)
+
+    def start_training(self, db) -> threading.Thread:
+        """Train in the background so startup does not wait on the analytics query."""
+
+        def train():
+            try:
+                self.train_from_analytics(db)
+            except Exception as e:
+                print(f"Intent router training failed: {e}")
+
+        thread = threading.Thread(target=train, name="intent-router-training", daemon=True)
+        thread.start()
+        return thread
+
+    # ----- routing -----
+
+    def classify(self, text: str) -> Tuple[Optional[str], float, str]:
+        """(agent or None, confidence, source) for a customer message."""
+        if len(text.split()) < self.min_words:
+            return None, 0.0, "fallback"
+        matched = [agent for agent, patterns in self.rules.items() if any(p.search(text) for p in patterns)]
+        if len(matched) == 1:
+            return matched[0], 1.0, "rule"
+        agent, confidence = self.classifier.predict(text)
+        # With conflicting rules, only trust the classifier if it picks one of them
+        if agent and confidence >= self.threshold and (not matched or agent in matched):
+            return agent, confidence, "classifier"
+        return None, confidence, "fallback"
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """
+        Answer the coordinator's routing call locally when the intent is clear.
+
+        Only the first model call of an invocation is routed, and only when the
+        request ends with the customer's own message. ADK rewrites other agents'
+        replies and tool output into user-role "For context:" content, so after
+        a sub-agent transfers back, the last content is not the customer's and
+        routing it could bounce the turn between agents.
+        """
+        if not self.enabled or not llm_request.contents:
+            return None
+        # The coordinator still identifies the customer before anything is delegated
+        if not callback_context.state.get("customer_info"):
+            return None
+        if not self._first_call(callback_context.invocation_id):
+            return None
+        last = llm_request.contents[-1]
+        if last != _user_content(callback_context) or not last.parts:
+            return None
+        text = " ".join(part.text for part in last.parts if part.text).strip()
+        if not text:
+            return None
+
+        started = time.perf_counter()
+        agent, confidence, source = self.classify(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["messages"] += 1
+            self._stats["decision_ms_total"] += elapsed_ms
+            if agent:
+                self._stats["routed"][agent] = self._stats["routed"].get(agent, 0) + 1
+                self._stats[f"by_{source}"] += 1
+            else:
+                self._stats["fallback"] += 1
+        if agent is None:
+            return None
+
+        trace(
+            "intent_prerouted", agent=agent, source=source,
+            confidence=round(confidence, 3), decision_ms=round(elapsed_ms, 2),
+        )
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(
+                    name="transfer_to_agent", args={"agent_name": agent}
+                ))],
+            )
+        )
+
+    def _first_call(self, invocation_id: str) -> bool:
+        with self._lock:
+            if invocation_id in self._seen_invocations:
+                return False
+            self._seen_invocations[invocation_id] = None
+            while len(self._seen_invocations) > 1000:
+                self._seen_invocations.popitem(last=False)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, routed=dict(self._stats["routed"]))
+        messages = stats.pop("messages")
+        decision_ms_total = stats.pop("decision_ms_total")
+        routed = stats["by_rule"] + stats["by_classifier"]
+        return dict(
+            stats,
+            enabled=self.enabled,
+            threshold=self.threshold,
+            messages=messages,
+            routed_ratio=round(routed / messages, 4) if messages else 0.0,
+            avg_decision_ms=round(decision_ms_total / messages, 3) if messages else 0.0,
+        )
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,474 @@
+"""
+Per-session audio plumbing for main.py's run_live streaming.
+
+Mic audio from the websocket and agent audio from the live events each go
+through a bounded buffer, drained by their own task:
+
+    websocket -> mic aggregator -> mic queue -> BoundedLiveRequestQueue
+    live events -> jitter buffer -> websocket
+
+The browser worklet posts a few milliseconds of audio at a time. The mic
+aggregator re-blocks it into `LIVE_MIC_BLOCK_MS` blocks (20-100 ms), so the
+model connection sees tens of sends per second instead of hundreds. When the
+mic queue is full, a new block is merged into the newest queued block, up to
+`LIVE_MERGE_MAX_MS` of audio. Past that, the oldest block is dropped, so a
+slow model connection costs a little audio, not unbounded memory and
+latency. The live request queue handed to run_live is a
+BoundedLiveRequestQueue. The model connection takes audio from it through
+`get()`, which returns credit to the mic pump, and at most
+`LIVE_UPSTREAM_MAX_PENDING` blobs may wait in it. While it is full, the mic
+pump waits and blocks pile up (and merge) in the mic queue instead.
+
+Agent audio arrives in bursts. The jitter buffer collects
+`LIVE_JITTER_PREBUFFER_MS` before it starts a burst. It then releases
+`LIVE_SPEAKER_FRAME_MS` frames at playback pace, at most `LIVE_JITTER_LEAD_MS`
+ahead of the client's playback clock. It holds at most `LIVE_JITTER_MAX_MS`.
+An interruption clears it, so the agent stops talking at once.
+
+Response latency is measured from the last voiced mic chunk (RMS above
+`VOICE_RMS_THRESHOLD`) to the first agent audio chunk sent back.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from fastapi import WebSocket
+from google.adk.agents import LiveRequestQueue
+from google.genai import types
+
+from audio_frames import MIC_SAMPLE_RATE, SPEAKER_SAMPLE_RATE, AudioChannel
+from tracing import trace
+from utils import percentile
+
+MIC_BLOCK_MS = min(100, max(20, int(os.getenv("LIVE_MIC_BLOCK_MS", 40))))
+MIC_QUEUE_CHUNKS = int(os.getenv("LIVE_MIC_QUEUE_CHUNKS", 50))
+MERGE_MAX_MS = int(os.getenv("LIVE_MERGE_MAX_MS", 200))
+SPEAKER_FRAME_MS = int(os.getenv("LIVE_SPEAKER_FRAME_MS", 40))
+JITTER_PREBUFFER_MS = int(os.getenv("LIVE_JITTER_PREBUFFER_MS", 60))
+JITTER_LEAD_MS = int(os.getenv("LIVE_JITTER_LEAD_MS", 200))
+JITTER_MAX_MS = int(os.getenv("LIVE_JITTER_MAX_MS", 10000))
+UPSTREAM_MAX_PENDING = int(os.getenv("LIVE_UPSTREAM_MAX_PENDING", 20))
+UPSTREAM_MAX_WAIT_S = float(os.getenv("LIVE_UPSTREAM_MAX_WAIT_MS", 2000)) / 1000
+VOICE_RMS_THRESHOLD = float(os.getenv("VOICE_RMS_THRESHOLD", 500))
+
+BYTES_PER_SAMPLE = 2
+
+
+def pcm_bytes_for_ms(ms: float, sample_rate: int) -> int:
+    return int(sample_rate * ms / 1000) * BYTES_PER_SAMPLE
+
+
+def pcm_ms(byte_count: int, sample_rate: int) -> float:
+    return byte_count / BYTES_PER_SAMPLE / sample_rate * 1000
+
+
+def is_voiced(pcm: bytes) -> bool:
+    """Crude energy-based voice check on 16-bit PCM."""
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // BYTES_PER_SAMPLE)
+    if not samples.size:
+        return False
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) >= VOICE_RMS_THRESHOLD
+
+
+class AudioQueue:
+    """
+    Bounded queue of PCM chunks that merges, then drops the oldest, when full.
+
+    The first merge into the newest chunk copies it into a bytearray of
+    `merge_max_bytes`; later merges write into that buffer in place.
+    """
+
+    def __init__(self, max_chunks: int, merge_max_bytes: int):
+        self.max_chunks = max_chunks
+        self.merge_max_bytes = merge_max_bytes
+        # [pcm, filled bytes, enqueued_at, merged]; a merged pcm is the preallocated bytearray
+        self._chunks: Deque[List[Any]] = deque()
+        self._ready = asyncio.Event()
+        self.stats: Dict[str, Any] = {
+            "enqueued": 0, "merged": 0, "dropped": 0, "flushed": 0, "max_depth": 0,
+            "wait_ms_total": 0.0, "dequeued": 0,
+        }
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def put(self, pcm: bytes):
+        self.stats["enqueued"] += 1
+        if len(self._chunks) >= self.max_chunks:
+            tail = self._chunks[-1]
+            filled = tail[1]
+            if filled + len(pcm) <= self.merge_max_bytes:
+                if not tail[3]:
+                    merged = bytearray(self.merge_max_bytes)
+                    merged[:filled] = tail[0]
+                    tail[0], tail[3] = merged, True
+                tail[0][filled:filled + len(pcm)] = pcm
+                tail[1] = filled + len(pcm)
+                self.stats["merged"] += 1
+                return
+            self._chunks.popleft()
+            self.stats["dropped"] += 1
+        self._chunks.append([pcm, len(pcm), time.perf_counter(), False])
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._chunks))
+        self._ready.set()
+
+    async def get(self):
+        """The oldest chunk: bytes as put, or a bytearray when chunks were merged into it."""
+        while not self._chunks:
+            self._ready.clear()
+            await self._ready.wait()
+        pcm, filled, enqueued_at, merged = self._chunks.popleft()
+        if merged:
+            # Trims the unused preallocation in place, without copying
+            del pcm[filled:]
+        self.stats["dequeued"] += 1
+        self.stats["wait_ms_total"] += (time.perf_counter() - enqueued_at) * 1000
+        return pcm
+
+    def flush(self) -> int:
+        count = len(self._chunks)
+        self._chunks.clear()
+        self.stats["flushed"] += count
+        return count
+
+
+class MicAggregator:
+    """Re-blocks small mic chunks into fixed-size blocks, copying each input byte once."""
+
+    def __init__(self, block_ms: int, sample_rate: int):
+        self.block_bytes = pcm_bytes_for_ms(block_ms, sample_rate)
+        self._block = bytearray(self.block_bytes)
+        self._fill = 0
+        self.stats: Dict[str, Any] = {"chunks_in": 0, "blocks_out": 0}
+
+    def add(self, pcm) -> List[bytes]:
+        """Completed blocks, if any; `pcm` may be bytes or a memoryview into a websocket frame."""
+        view = memoryview(pcm)
+        blocks = []
+        offset = 0
+        while offset < len(view):
+            take = min(self.block_bytes - self._fill, len(view) - offset)
+            self._block[self._fill:self._fill + take] = view[offset:offset + take]
+            self._fill += take
+            offset += take
+            if self._fill == self.block_bytes:
+                blocks.append(bytes(self._block))
+                self._fill = 0
+        self.stats["chunks_in"] += 1
+        self.stats["blocks_out"] += len(blocks)
+        return blocks
+
+    def flush(self) -> Optional[bytes]:
+        """The partial block, e.g. before a text message is sent."""
+        if not self._fill:
+            return None
+        block = bytes(self._block[:self._fill])
+        self._fill = 0
+        self.stats["blocks_out"] += 1
+        return block
+
+
+class JitterBuffer:
+    """Outbound agent audio, read back in fixed-size frames without re-concatenating chunks."""
+
+    def __init__(self, sample_rate: int, frame_ms: int, prebuffer_ms: int, max_ms: int):
+        self.sample_rate = sample_rate
+        self.frame_bytes = pcm_bytes_for_ms(frame_ms, sample_rate)
+        self.prebuffer_bytes = pcm_bytes_for_ms(prebuffer_ms, sample_rate)
+        self.max_bytes = pcm_bytes_for_ms(max_ms, sample_rate)
+        self._chunks: Deque[memoryview] = deque()
+        self._buffered = 0
+        self._ready = asyncio.Event()
+        self.stats: Dict[str, Any] = {
+            "bytes_in": 0, "frames_out": 0, "dropped_bytes": 0, "flushed_bytes": 0, "underruns": 0,
+            "max_buffered_ms": 0.0, "occupancy_ms_total": 0.0,
+        }
+
+    def __len__(self):
+        return self._buffered
+
+    @property
+    def buffered_ms(self) -> float:
+        return pcm_ms(self._buffered, self.sample_rate)
+
+    def put(self, pcm: bytes):
+        self._chunks.append(memoryview(pcm))
+        self._buffered += len(pcm)
+        self.stats["bytes_in"] += len(pcm)
+        # Past the cap, the oldest audio goes first
+        while self._buffered > self.max_bytes:
+            excess = self._buffered - self.max_bytes
+            head = self._chunks[0]
+            if len(head) <= excess:
+                self._chunks.popleft()
+                dropped = len(head)
+            else:
+                self._chunks[0] = head[excess:]
+                dropped = excess
+            self._buffered -= dropped
+            self.stats["dropped_bytes"] += dropped
+        self.stats["max_buffered_ms"] = max(self.stats["max_buffered_ms"], self.buffered_ms)
+        self._ready.set()
+
+    def read(self, max_bytes: int) -> bytearray:
+        """
+        Up to `max_bytes` from the front, copied once into a new frame.
+
+        Chunk boundaries are sliced, not copied around, and the frame is handed
+        to the sender as is.
+        """
+        self.stats["occupancy_ms_total"] += self.buffered_ms
+        frame = bytearray(min(max_bytes, self._buffered))
+        filled = 0
+        while filled < len(frame):
+            head = self._chunks[0]
+            take = min(len(head), len(frame) - filled)
+            frame[filled:filled + take] = head[:take]
+            filled += take
+            if take == len(head):
+                self._chunks.popleft()
+            else:
+                self._chunks[0] = head[take:]
+        self._buffered -= filled
+        self.stats["frames_out"] += 1
+        return frame
+
+    async def wait_ready(self, max_wait_s: float):
+        """Wait for audio, then up to `max_wait_s` more for the prebuffer to fill."""
+        while not self._buffered:
+            self._ready.clear()
+            await self._ready.wait()
+        deadline = time.perf_counter() + max_wait_s
+        while self._buffered < self.prebuffer_bytes:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+    def clear(self) -> int:
+        flushed = self._buffered
+        self._chunks.clear()
+        self._buffered = 0
+        self.stats["flushed_bytes"] += flushed
+        return flushed
+
+
+class BoundedLiveRequestQueue(LiveRequestQueue):
+    """
+    LiveRequestQueue with a bounded number of realtime blobs waiting for the model connection.
+
+    Credit comes back through the public `get()`. In google-adk 0.3.0 that is
+    the only consumer: Runner.run_live -> BaseLlmFlow.run_live starts
+    `_send_to_model`, which loops on
+    `await asyncio.wait_for(live_request_queue.get(), timeout=0.25)`. The
+    credit is returned in a `finally`, so a get() that wait_for cancels right
+    after the dequeue still gives it back. If a future ADK read the queue some
+    other way, a full queue would never drain. So a wait is capped at
+    `LIVE_UPSTREAM_MAX_WAIT_MS`; after that the credit count is assumed lost,
+    reset, and reported as `credit_resets`.
+    """
+
+    def __init__(self, max_pending: int = UPSTREAM_MAX_PENDING, max_wait_s: float = UPSTREAM_MAX_WAIT_S):
+        super().__init__()
+        self.max_pending = max_pending
+        self.max_wait_s = max_wait_s
+        self._blobs_pending = 0
+        self._drained = asyncio.Event()
+        self.stats: Dict[str, Any] = {"waits": 0, "max_pending": 0, "credit_resets": 0}
+
+    async def put_realtime(self, blob: types.Blob):
+        """send_realtime, waiting first while `max_pending` blobs are already queued."""
+        if self._blobs_pending >= self.max_pending:
+            self.stats["waits"] += 1
+        deadline = time.perf_counter() + self.max_wait_s
+        while self._blobs_pending >= self.max_pending:
+            remaining = deadline - time.perf_counter()
+            self._drained.clear()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._drained.wait(), remaining)
+            except asyncio.TimeoutError:
+                self.stats["credit_resets"] += 1
+                trace("live_upstream_credit_reset", logging.WARNING, pending=self._blobs_pending)
+                self._blobs_pending = 0
+        self._blobs_pending += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self._blobs_pending)
+        self.send_realtime(blob)
+
+    async def get(self):
+        # Called by ADK's _send_to_model for every request it takes (see the class docstring)
+        request = None
+        try:
+            request = await super().get()
+            return request
+        finally:
+            if request is not None and request.blob is not None and self._blobs_pending:
+                self._blobs_pending -= 1
+                self._drained.set()
+
+
+class LiveAudioSession:
+    """Bounded mic and speaker audio paths for one /ws connection."""
+
+    def __init__(self, websocket: WebSocket, live_request_queue: BoundedLiveRequestQueue, channel: AudioChannel):
+        self.websocket = websocket
+        self.live_request_queue = live_request_queue
+        self.channel = channel
+        self.aggregator = MicAggregator(MIC_BLOCK_MS, MIC_SAMPLE_RATE)
+        self.mic = AudioQueue(MIC_QUEUE_CHUNKS, pcm_bytes_for_ms(MERGE_MAX_MS, MIC_SAMPLE_RATE))
+        self.jitter = JitterBuffer(SPEAKER_SAMPLE_RATE, SPEAKER_FRAME_MS, JITTER_PREBUFFER_MS, JITTER_MAX_MS)
+        self.started = time.perf_counter()
+        self.mic_sends = 0
+        self.interruptions = 0
+        self.latencies_ms = []
+        self._last_voice_at: Optional[float] = None
+        self._awaiting_first_audio = True
+        self._in_turn = False
+
+    # ----- mic -----
+
+    def on_mic_audio(self, pcm):
+        for block in self.aggregator.add(pcm):
+            if is_voiced(block):
+                self._last_voice_at = time.perf_counter()
+            self.mic.put(block)
+
+    def flush_mic(self):
+        """Send the partial mic block now, e.g. ahead of a text message."""
+        block = self.aggregator.flush()
+        if block:
+            self.mic.put(block)
+
+    async def pump_mic(self):
+        while True:
+            pcm = await self.mic.get()
+            # While the model connection lags, this waits and chunks pile up (and merge) in self.mic
+            await self.live_request_queue.put_realtime(types.Blob(data=pcm, mime_type="audio/pcm"))
+            self.mic_sends += 1
+
+    # ----- speaker -----
+
+    def on_agent_audio(self, pcm: bytes):
+        self._in_turn = True
+        self.jitter.put(pcm)
+
+    async def pump_speaker(self):
+        playback_end = None
+        while True:
+            await self.jitter.wait_ready(JITTER_PREBUFFER_MS / 1000)
+            # The client ran dry mid-turn before this burst arrived
+            if self._in_turn and playback_end is not None and time.perf_counter() > playback_end:
+                self.jitter.stats["underruns"] += 1
+            # Playback clock for this burst: how far ahead of the client's speaker we are
+            clock_start = time.perf_counter()
+            sent_ms = 0.0
+            while len(self.jitter):
+                frame = self.jitter.read(self.jitter.frame_bytes)
+                await self.websocket.send(self.channel.encode(frame))
+                self._record_first_audio()
+                sent_ms += pcm_ms(len(frame), SPEAKER_SAMPLE_RATE)
+                ahead_ms = sent_ms - (time.perf_counter() - clock_start) * 1000
+                if ahead_ms > JITTER_LEAD_MS:
+                    await asyncio.sleep((ahead_ms - JITTER_LEAD_MS) / 1000)
+            playback_end = clock_start + sent_ms / 1000
+
+    def _record_first_audio(self):
+        if not self._awaiting_first_audio:
+            return
+        self._awaiting_first_audio = False
+        if self._last_voice_at is not None:
+            latency_ms = (time.perf_counter() - self._last_voice_at) * 1000
+            self.latencies_ms.append(latency_ms)
+            trace("speech_to_first_audio", latency_ms=round(latency_ms, 1))
+        # Each utterance gives one sample; a later text-only turn must not reuse this one
+        self._last_voice_at = None
+
+    # ----- turn events -----
+
+    def interrupt(self) -> int:
+        """Drop agent audio not yet sent; the customer has started talking over it. Returns the ms dropped."""
+        self.interruptions += 1
+        self._awaiting_first_audio = True
+        self._in_turn = False
+        return int(pcm_ms(self.jitter.clear(), SPEAKER_SAMPLE_RATE))
+
+    def turn_complete(self):
+        self._awaiting_first_audio = True
+        self._in_turn = False
+        self._last_voice_at = None
+
+
+class LiveAudioStats:
+    """Process-wide buffer, send-rate, interruption and latency figures for live audio sessions."""
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._interruptions = 0
+        self._session_seconds = 0.0
+        self._mic_sends = 0
+        self._totals: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Deque[float] = deque(maxlen=max_samples)
+
+    def record(self, session: LiveAudioSession):
+        components = (
+            ("mic_aggregator", session.aggregator.stats),
+            ("mic_queue", session.mic.stats),
+            ("upstream_queue", session.live_request_queue.stats),
+            ("jitter_buffer", session.jitter.stats),
+        )
+        with self._lock:
+            self._sessions += 1
+            self._interruptions += session.interruptions
+            self._session_seconds += time.perf_counter() - session.started
+            self._mic_sends += session.mic_sends
+            self._latencies.extend(session.latencies_ms)
+            for name, stats in components:
+                totals = self._totals.setdefault(name, {})
+                for key, value in stats.items():
+                    totals[key] = max(totals.get(key, 0), value) if key.startswith("max_") else totals.get(key, 0) + value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {name: dict(values) for name, values in self._totals.items()}
+            latencies = list(self._latencies)
+            session_seconds = self._session_seconds
+            report = {
+                "sessions": self._sessions,
+                "interruptions": self._interruptions,
+                "mic_sends_per_session_second": (
+                    round(self._mic_sends / session_seconds, 1) if session_seconds else None
+                ),
+            }
+        queue = totals.get("mic_queue", {})
+        dequeued = queue.pop("dequeued", 0)
+        wait_total = queue.pop("wait_ms_total", 0.0)
+        if queue:
+            queue["avg_wait_ms"] = round(wait_total / dequeued, 2) if dequeued else None
+        jitter = totals.get("jitter_buffer", {})
+        occupancy_total = jitter.pop("occupancy_ms_total", 0.0)
+        if jitter:
+            frames = jitter.get("frames_out", 0)
+            jitter["avg_occupancy_ms"] = round(occupancy_total / frames, 1) if frames else None
+            jitter["max_buffered_ms"] = round(jitter.get("max_buffered_ms", 0.0), 1)
+            jitter["frames_per_session_second"] = round(frames / session_seconds, 1) if session_seconds else None
+        report.update(totals)
+        report["speech_to_audio_ms"] = {
+            "samples": len(latencies),
+            "p50": round(percentile(latencies, 50), 1) if latencies else None,
+            "p95": round(percentile(latencies, 95), 1) if latencies else None,
+        }
+        return report
+
+
+live_audio_stats = LiveAudioStats()
@@ -3,6 +3,8 @@ from datetime import datetime
 
 from config.customer_service_tools import CustomerServiceTools
 from google.adk.agents import Agent
+from context_budget import context_budget
+from intent_router import intent_router
 
 # Import the specialized agents
 from .sub_agents.plan_enquiry_agent.agent import plan_enquiry_agent
@@ -40,7 +42,7 @@ coordinator_agent = Agent(
        - Maintain conversation context using state
 
     2. State Management
-       - Track customer interactions in state['interaction_history']
+       - Track customer interactions in state['interaction_history'] (older turns are summarised)
        - Track customer information in state['customer_info']
        - Track customer's plan in state['plan_id']
        - Use state to provide personalized responses
@@ -57,7 +59,7 @@ coordinator_agent = Agent(
 
     **Interaction History:**
     <interaction_history>
-    {interaction_history}
+    {interaction_context}
     </interaction_history>
 
     You have access to the following specialized agents:
@@ -102,6 +104,9 @@ coordinator_agent = Agent(
         faq_agent,
         recharge_billing_agent,
     ],
+    before_agent_callback=context_budget.before_agent_callback,
+    after_model_callback=context_budget.after_model_callback,
+    before_model_callback=intent_router.before_model_callback,
     tools=[get_current_time],
 )
 
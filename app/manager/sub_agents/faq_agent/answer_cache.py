@@ -0,0 +1,313 @@
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from tracing import trace
+
+from .retrieval_service import embed_query
+from .vector_store import collection_config_file, faq_path, index_fingerprint
+
+# Numbers with 3+ digits (amounts, ids, phone and account numbers) and e-mail addresses
+NUMBER_PATTERN = re.compile(r"\d[\d,./:-]*\d{2,}|\d{3,}")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+# Phrasing that only makes sense about this customer's own account
+ACCOUNT_PATTERN = re.compile(
+    r"\byour (?:current |wallet |account )?balance\b"
+    r"|\byour (?:current )?plan (?:is|expires|ends|renews)\b"
+    r"|\byour (?:last|recent) (?:transactions?|recharges?|tickets?)\b"
+    r"|\byour (?:account|mobile|registered) number\b",
+    re.IGNORECASE,
+)
+HISTORY_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _user_question(callback_context: CallbackContext) -> str:
+    """Text of the customer message that started this invocation."""
+    content = getattr(callback_context, "user_content", None)
+    if content is None:
+        content = callback_context._invocation_context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text).strip()
+
+
+def _response_text(llm_response: LlmResponse) -> Optional[str]:
+    """Final text of a model response, or None for partial/tool-call responses."""
+    content = llm_response.content
+    if llm_response.partial or not content or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    text = "".join(part.text for part in content.parts if part.text).strip()
+    return text or None
+
+
+class SemanticAnswerCache:
+    """
+    Caches faq_agent answers keyed by the question embedding.
+
+    A question whose cosine similarity to a cached question is at least
+    `SEMANTIC_CACHE_THRESHOLD` is answered from the cache by the agent's
+    before_agent_callback, skipping retrieval and generation. Answers are
+    stored by after_model_callback.
+
+    The question is embedded by `prepare`, called from a worker thread when the
+    run transfers to faq_agent, so turns routed elsewhere never pay for the
+    embedding and the callbacks never embed on the event loop. The cache key
+    is the bare message. So `prepare` skips the cache when the session had an
+    agent reply within `SEMANTIC_CACHE_CONTEXT_SECONDS`, because a follow-up
+    such as "what about for DTH?" only makes sense with that context. Answers
+    that carry the customer's details are not cached, since they would leak
+    into other customers' sessions. That covers any value from customer_info
+    or the plan ids and dates, numbers and e-mail addresses not found in the
+    FAQ, and phrasing such as "your balance" or "your plan expires".
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_SIZE", 500))
+        self.ttl = float(os.getenv("SEMANTIC_CACHE_TTL", 86400))
+        self.context_seconds = float(os.getenv("SEMANTIC_CACHE_CONTEXT_SECONDS", 600))
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._fingerprint: Optional[str] = None
+        self._fingerprint_mtimes: Optional[Tuple[float, ...]] = None
+        # Numbers and e-mail addresses that appear in the FAQ itself, and are safe to cache
+        self._public_tokens: Set[str] = set()
+        # session_id -> (question, vector, prepared_at), embedded off the event loop
+        self._prepared: Dict[str, Tuple[str, np.ndarray, float]] = {}
+        # invocation_id -> (question, vector, started) for misses awaiting an answer
+        self._pending: Dict[str, Tuple[str, np.ndarray, float]] = {}
+        self._stats = {
+            "hits": 0, "misses": 0, "stored": 0, "skipped_personal": 0, "skipped_context": 0,
+            "not_prepared": 0, "invalidations": 0,
+            "hit_ms_total": 0.0, "answer_ms_total": 0.0, "answers_timed": 0,
+        }
+
+    # ----- invalidation -----
+
+    def _check_fingerprint(self):
+        """Clear the cache when NexTel_FAQ.txt or the collection config changed."""
+        mtimes = tuple(
+            os.path.getmtime(path) if os.path.exists(path) else 0.0
+            for path in (faq_path, collection_config_file)
+        )
+        if mtimes == self._fingerprint_mtimes:
+            return
+        fingerprint = index_fingerprint()
+        public_tokens: Set[str] = set()
+        if os.path.exists(faq_path):
+            with open(faq_path, "r", encoding="utf-8") as f:
+                faq_text = f.read()
+            public_tokens = set(NUMBER_PATTERN.findall(faq_text)) | set(EMAIL_PATTERN.findall(faq_text))
+        with self._lock:
+            self._public_tokens = public_tokens
+            self._fingerprint_mtimes = mtimes
+            if fingerprint != self._fingerprint:
+                if self._fingerprint is not None:
+                    print("🧹 FAQ index changed, clearing semantic answer cache")
+                    self._stats["invalidations"] += 1
+                self._fingerprint = fingerprint
+                self._vectors = np.zeros((0, 0), dtype=np.float32)
+                self._entries = []
+
+    def clear(self):
+        with self._lock:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._entries = []
+
+    # ----- lookup / store -----
+
+    @staticmethod
+    def _embed(question: str) -> np.ndarray:
+        vector = np.asarray(embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._entries:
+                return None
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            entry = self._entries[best]
+            if scores[best] < self.threshold or time.time() - entry["created"] > self.ttl:
+                return None
+            return dict(entry, similarity=float(scores[best]))
+
+    def store(self, question: str, vector: np.ndarray, answer: str):
+        with self._lock:
+            entry = {"question": question, "answer": answer, "created": time.time()}
+            if not self._entries:
+                self._vectors = vector[np.newaxis, :]
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                self._vectors = self._vectors[1:]
+                self._entries.pop(0)
+            self._stats["stored"] += 1
+
+    # ----- agent callbacks -----
+
+    def _has_recent_context(self, state: Dict[str, Any]) -> bool:
+        """Whether the session had an agent reply recently enough for this message to be a follow-up."""
+        now = datetime.now()
+        for entry in reversed(state.get("interaction_history") or []):
+            if not isinstance(entry, dict) or entry.get("action") != "agent_response":
+                continue
+            try:
+                replied_at = datetime.strptime(entry.get("timestamp", ""), HISTORY_TIME_FORMAT)
+            except (TypeError, ValueError):
+                return True
+            return (now - replied_at).total_seconds() < self.context_seconds
+        return False
+
+    def prepare(self, session_service, app_name: str, user_id: str, session_id: str, question: str):
+        """
+        Embed the customer's message for the cache (blocking, call from a worker thread).
+
+        Runs when the run transfers to faq_agent, before the agent starts. Its
+        before_agent_callback then finds the vector here.
+        """
+        if not self.enabled or not question.strip():
+            return
+        now = time.time()
+        with self._lock:
+            self._prepared.pop(session_id, None)
+            # Forget vectors for turns that never reached faq_agent
+            for stale_id, (_, _, prepared_at) in list(self._prepared.items()):
+                if now - prepared_at > 600:
+                    del self._prepared[stale_id]
+        session = session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is not None and self._has_recent_context(session.state):
+            with self._lock:
+                self._stats["skipped_context"] += 1
+            return
+        try:
+            self._check_fingerprint()
+            vector = self._embed(question.strip())
+        except Exception as e:
+            trace("faq_cache_unavailable", logging.WARNING, error=str(e))
+            return
+        with self._lock:
+            self._prepared[session_id] = (question.strip(), vector, now)
+
+    def before_agent_callback(self, callback_context: CallbackContext) -> Optional[types.Content]:
+        """Answer near-duplicate questions from the cache instead of running the agent."""
+        if not self.enabled:
+            return None
+        question = _user_question(callback_context)
+        if not question:
+            return None
+        started = time.perf_counter()
+        session_id = callback_context._invocation_context.session.id
+        with self._lock:
+            prepared = self._prepared.pop(session_id, None)
+        if prepared is None or prepared[0] != question:
+            # Follow-up, or a path that does not prepare (e.g. live audio): no lookup, no store
+            with self._lock:
+                self._stats["not_prepared"] += 1
+            return None
+        _, vector, _ = prepared
+
+        entry = self.lookup(vector)
+        if entry is None:
+            with self._lock:
+                self._stats["misses"] += 1
+                # Forget misses whose answer never arrived (errors, abandoned turns)
+                for invocation_id, (_, _, pending_started) in list(self._pending.items()):
+                    if started - pending_started > 600:
+                        del self._pending[invocation_id]
+                self._pending[callback_context.invocation_id] = (question, vector, started)
+            return None
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["hit_ms_total"] += elapsed_ms
+        trace("faq_cache_hit", similarity=round(entry["similarity"], 3), elapsed_ms=round(elapsed_ms, 1))
+        return types.Content(role="model", parts=[types.Part(text=entry["answer"])])
+
+    def _is_personal(self, answer: str, state) -> bool:
+        """Whether an answer carries details of this customer's account."""
+        lowered = answer.lower()
+        customer_info = state.get("customer_info")
+        plan_details = state.get("plan_details")
+        values = list(customer_info.values()) if isinstance(customer_info, dict) else []
+        if isinstance(plan_details, dict):
+            values += [plan_details.get(key) for key in ("plan_id", "plan_name", "plan_start", "plan_end")]
+        values += [state.get("customer_id"), state.get("plan_id")]
+        if any(value is not None and len(str(value)) >= 3 and str(value).lower() in lowered for value in values):
+            return True
+        with self._lock:
+            public_tokens = self._public_tokens
+        tokens = NUMBER_PATTERN.findall(answer) + EMAIL_PATTERN.findall(answer)
+        if any(token not in public_tokens for token in tokens):
+            return True
+        return bool(ACCOUNT_PATTERN.search(answer))
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Store the agent's final answer for the question that missed the cache."""
+        # With streaming, partial chunks also pass through here; only the full text is stored
+        if llm_response.partial:
+            return None
+        answer = _response_text(llm_response)
+        if answer is None:
+            return None
+        with self._lock:
+            pending = self._pending.pop(callback_context.invocation_id, None)
+        if pending is None:
+            return None
+        question, vector, started = pending
+        with self._lock:
+            self._stats["answer_ms_total"] += (time.perf_counter() - started) * 1000
+            self._stats["answers_timed"] += 1
+
+        if self._is_personal(answer, callback_context.state):
+            with self._lock:
+                self._stats["skipped_personal"] += 1
+            return None
+
+        self.store(question, vector, answer)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        avg_answer_ms = stats["answer_ms_total"] / stats["answers_timed"] if stats["answers_timed"] else 0.0
+        avg_hit_ms = stats["hit_ms_total"] / stats["hits"] if stats["hits"] else 0.0
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "size": size,
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "stored": stats["stored"],
+            "skipped_personal": stats["skipped_personal"],
+            "skipped_context": stats["skipped_context"],
+            "not_prepared": stats["not_prepared"],
+            "invalidations": stats["invalidations"],
+            "avg_hit_ms": round(avg_hit_ms, 2),
+            "avg_answer_ms": round(avg_answer_ms, 1),
+            "estimated_saved_ms": round(stats["hits"] * max(avg_answer_ms - avg_hit_ms, 0.0), 1),
+        }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip("?.!")
+
+
+class CacheStats:
+    """Hit/miss counters plus the average cost of a miss, to estimate time saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.miss_ms_total = 0.0
+
+    def hit(self, disk: bool = False):
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += int(disk)
+
+    def miss(self, elapsed_ms: float, count: int = 1):
+        with self._lock:
+            self.misses += count
+            self.miss_ms_total += elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = self.miss_ms_total / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_miss_ms": round(avg_miss_ms, 2),
+                "estimated_saved_ms": round(self.hits * avg_miss_ms, 1),
+            }
+
+
+class LRUCache:
+    """Small thread-safe LRU map."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteVectorStore:
+    """
+    Persistent key -> float32 vector map backing the in-memory embedding LRU.
+
+    Holds at most `max_entries` vectors. Past that, the oldest writes are
+    deleted down to 90% of the limit, so trimming runs once per batch of
+    inserts rather than on every one.
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", 100000))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.evicted = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def put_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            # Counts replaced keys too, so recount before trimming
+            self._count += len(items)
+            if self._count > self.max_entries:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                excess = self._count - int(self.max_entries * 0.9)
+                if self._count > self.max_entries and excess > 0:
+                    # REPLACE re-inserts a key, so rowid order is write order
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                        (excess,),
+                    )
+                    self._count -= excess
+                    self.evicted += excess
+            self._conn.commit()
+
+    def __len__(self):
+        return self._count
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches vectors by normalised text.
+
+    Lookups go memory LRU -> SQLite file -> wrapped model, so repeated FAQ
+    questions skip the remote embedding call, also across restarts.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: str, path: Optional[str] = None,
+                 max_entries: Optional[int] = None):
+        self.inner = inner
+        self.model_name = model_name
+        self.memory = LRUCache(max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", 10000)))
+        if path is None:
+            path = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite")
+        self.disk = SqliteVectorStore(path) if path else None
+        self.stats = CacheStats()
+
+    def _key(self, kind: str, text: str) -> str:
+        normalized = normalize_query(text) if kind == "query" else text
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{normalized}".encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.stats.hit()
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.put(key, vector)
+                self.stats.hit(disk=True)
+                return vector
+        return None
+
+    def _store(self, items: Dict[str, List[float]]):
+        for key, vector in items.items():
+            self.memory.put(key, vector)
+        if self.disk is not None and items:
+            self.disk.put_many(items)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        vector = self._lookup(key)
+        if vector is None:
+            started = time.perf_counter()
+            vector = self.inner.embed_query(text)
+            self.stats.miss((time.perf_counter() - started) * 1000)
+            self._store({key: vector})
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("document", text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            started = time.perf_counter()
+            embedded = self.inner.embed_documents([texts[i] for i in missing])
+            self.stats.miss((time.perf_counter() - started) * 1000, count=len(missing))
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+            self._store({keys[i]: vectors[i] for i in missing})
+        return vectors
+
+
+class ResultCache:
+    """LRU of normalised query -> retrieved context, for exact-repeat questions."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.cache = LRUCache(max_entries or int(os.getenv("RETRIEVAL_RESULT_CACHE_SIZE", 1000)))
+        self.stats = CacheStats()
+
+    def get(self, query: str) -> Optional[str]:
+        result = self.cache.get(normalize_query(query))
+        if result is not None:
+            self.stats.hit()
+        return result
+
+    def put(self, query: str, result: str, elapsed_ms: float):
+        self.stats.miss(elapsed_ms)
+        self.cache.put(normalize_query(query), result)
+
+    def clear(self):
+        """Drop all results, e.g. after the index changed."""
+        self.cache.clear()
@@ -0,0 +1,64 @@
+"""
+Removes Qdrant collections no embedding provider uses any more, such as
+airtel_faq_v2 and NexTel_faq_v2 left behind by earlier hand-bumped
+collection names. A collection is kept when a provider's collection config
+file names it, or when it is passed with --keep. Lists what would be deleted
+unless --apply is given. Run from app/ (stop the server first in local mode):
+
+    python -m manager.sub_agents.faq_agent.cleanup
+    python -m manager.sub_agents.faq_agent.cleanup --apply
+"""
+import argparse
+import json
+import os
+from typing import List, Set
+
+from qdrant_client import QdrantClient
+
+from .embeddings import PROVIDERS
+
+
+def active_collections(config_dir: str) -> Set[str]:
+    """Collections named by each provider's config file, or its default name."""
+    names = set()
+    for provider in PROVIDERS.values():
+        path = os.path.join(config_dir, provider["config_file"])
+        try:
+            with open(path, "r") as f:
+                names.add(json.load(f)["collection_name"])
+        except (OSError, ValueError, KeyError):
+            names.add(provider["collection"])
+    return names
+
+
+def orphaned_collections(client: QdrantClient, keep: Set[str]) -> List[str]:
+    return sorted(c.name for c in client.get_collections().collections if c.name not in keep)
+
+
+def main():
+    from . import vector_store
+
+    parser = argparse.ArgumentParser(description="Delete orphaned FAQ collections")
+    parser.add_argument("--keep", action="append", default=[], help="collection to keep (repeatable)")
+    parser.add_argument("--apply", action="store_true", help="delete instead of listing")
+    args = parser.parse_args()
+
+    client = vector_store.get_client()
+    keep = active_collections(vector_store.current_dir) | set(args.keep)
+    orphans = orphaned_collections(client, keep)
+    print(f"Keeping: {', '.join(sorted(keep))}")
+    if not orphans:
+        print("No orphaned collections")
+        return
+    for name in orphans:
+        if args.apply:
+            client.delete_collection(name)
+            print(f"🗑️ Deleted {name}")
+        else:
+            print(f"Would delete {name}")
+    if not args.apply:
+        print("Re-run with --apply to delete them")
+
+
+if __name__ == "__main__":
+    main()
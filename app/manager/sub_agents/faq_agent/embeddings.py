@@ -0,0 +1,76 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# Each provider writes to its own collection: vectors from different models
+# (and dimensions) cannot share one.
+PROVIDERS: Dict[str, Dict[str, str]] = {
+    "google": {
+        "model": os.getenv("GOOGLE_EMBEDDING_MODEL", "models/embedding-001"),
+        "collection": "NexTel_faq_v3",
+        "config_file": "qdrant_collection_config_v3.json",
+    },
+    "local": {
+        "model": os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"),
+        "collection": "NexTel_faq_local",
+        "config_file": "qdrant_collection_config_local.json",
+    },
+}
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    CPU embeddings through fastembed, which runs quantised ONNX models.
+
+    No network round trip per query. The model is downloaded on first use and
+    loaded lazily; texts are embedded in batches of `LOCAL_EMBEDDING_BATCH_SIZE`.
+    """
+
+    def __init__(self, model_name: str, batch_size: Optional[int] = None, threads: Optional[int] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size or int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", 64))
+        self.threads = threads or (int(os.getenv("LOCAL_EMBEDDING_THREADS")) if os.getenv("LOCAL_EMBEDDING_THREADS") else None)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from fastembed import TextEmbedding
+                    except ImportError as e:
+                        raise ImportError(
+                            "EMBEDDING_PROVIDER=local requires fastembed (pip install fastembed)"
+                        ) from e
+                    self._model = TextEmbedding(model_name=self.model_name, threads=self.threads)
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self._get_model().embed(texts, batch_size=self.batch_size)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self._get_model().query_embed(text))).tolist()
+
+
+def get_provider_name() -> str:
+    provider = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
+    return provider
+
+
+def create_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """Build the (uncached) embedding model for a provider."""
+    provider = provider or get_provider_name()
+    model = PROVIDERS[provider]["model"]
+    if provider == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return GoogleGenerativeAIEmbeddings(model=model)
+    return LocalEmbeddings(model)
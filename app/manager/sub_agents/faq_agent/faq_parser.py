@@ -0,0 +1,144 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+from .hybrid import STOPWORDS
+
+# "1. What is ...", "2) How does ...", "Q16. I am placing ..."
+QUESTION_PATTERN = re.compile(r"^\s*(?:Q\s*)?(\d+)\s*[.)]\s*(.+?)\s*$")
+RULE_PATTERN = re.compile(r"^\s*={3,}\s*$")
+HEADING_PATTERN = re.compile(r"^\s*#{1,6}\s*(.+?)\s*$")
+
+
+def normalize_question(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace, for question lookups."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _is_subheading(lines: List[str], index: int) -> bool:
+    """A short standalone line directly followed (after blanks) by a numbered question."""
+    line = lines[index].strip()
+    if not line or len(line) > 60 or line.endswith((".", ":", "?", "!")) or line.startswith("-"):
+        return False
+    if index > 0 and lines[index - 1].strip():
+        return False
+    following = next((l for l in lines[index + 1:] if l.strip()), "")
+    return bool(QUESTION_PATTERN.match(following))
+
+
+def parse_faq(text: str) -> List[Dict[str, str]]:
+    """
+    Split the FAQ into question/answer entries.
+
+    Sections come from "### Title" lines or titles framed by "====" rules;
+    short standalone lines right before a question become the subsection.
+    Each entry is {"section", "subsection", "number", "question", "answer"}.
+    """
+    lines = text.splitlines()
+    entries: List[Dict[str, str]] = []
+    section, subsection = "", ""
+    current: Optional[Dict[str, str]] = None
+    answer: List[str] = []
+
+    def close():
+        if current is not None:
+            current["answer"] = "\n".join(answer).strip()
+            if current["answer"]:
+                entries.append(current)
+
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        heading = HEADING_PATTERN.match(line)
+        framed = (
+            RULE_PATTERN.match(line) and index + 2 < len(lines) and RULE_PATTERN.match(lines[index + 2])
+        )
+        question = QUESTION_PATTERN.match(line)
+        previous_blank = index == 0 or not lines[index - 1].strip()
+
+        if heading or framed:
+            close()
+            current, answer = None, []
+            section = heading.group(1) if heading else lines[index + 1].strip()
+            subsection = ""
+            index += 1 if heading else 3
+            continue
+        if question and previous_blank:
+            close()
+            current = {
+                "section": section, "subsection": subsection,
+                "number": question.group(1), "question": question.group(2),
+            }
+            answer = []
+        elif _is_subheading(lines, index):
+            close()
+            current, answer = None, []
+            subsection = line.strip()
+        elif current is not None:
+            answer.append(line)
+        index += 1
+
+    close()
+    return entries
+
+
+def entry_text(entry: Dict[str, str]) -> str:
+    """The text indexed and returned for one entry: its question followed by its answer."""
+    return f"{entry['question']}\n{entry['answer']}"
+
+
+class QAIndex:
+    """
+    Normalised question -> entry map for the embedding-free fast path.
+
+    Only exact matches after normalisation are answered directly. Near matches
+    go to retrieval, because FAQ questions that differ by one word ("...DTH
+    Online?" / "...DTH Offline?", "HD" / "SD") have different answers. The
+    index also guesses which section a free-form query is about, for
+    section-filtered vector search.
+    """
+
+    def __init__(self, entries: List[Dict[str, str]]):
+        self.entries = entries
+        self.by_question = {normalize_question(entry["question"]): entry for entry in entries}
+        self.sections = sorted({entry["section"] for entry in entries if entry["section"]})
+        self._section_terms = {
+            section: set(normalize_question(section).split()) - STOPWORDS - {"nextel", "faqs", "faq"}
+            for section in self.sections
+        }
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact": 0}
+
+    @classmethod
+    def from_file(cls, path: str) -> "QAIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(parse_faq(f.read()))
+
+    def match(self, query: str) -> Optional[Dict[str, str]]:
+        key = normalize_question(query)
+        entry = self.by_question.get(key)
+        with self._lock:
+            self._stats["lookups"] += 1
+            if entry is not None:
+                self._stats["exact"] += 1
+        return entry
+
+    def guess_section(self, query: str) -> Optional[str]:
+        """The section whose distinctive title words the query mentions most, if any."""
+        terms = set(normalize_question(query).split())
+        scored = [
+            (len(terms & section_terms) / len(section_terms), section)
+            for section, section_terms in self._section_terms.items()
+            if section_terms and terms & section_terms
+        ]
+        if not scored:
+            return None
+        best_score, best_section = max(scored)
+        # Ties (e.g. a bare "Xstream") are ambiguous, so search everything instead
+        if sum(1 for score, _ in scored if score == best_score) > 1:
+            return None
+        return best_section
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, questions=len(self.by_question))
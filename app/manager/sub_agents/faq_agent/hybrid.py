@@ -0,0 +1,125 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_community.vectorstores import Qdrant
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, MatchValue, SearchParams
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or the to what when "
+    "where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring, built once over the FAQ chunks."""
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for index, document in enumerate(documents):
+            counts = Counter(tokenize(document.page_content))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((index, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, k: int,
+               predicate: Optional[Callable[[Document], bool]] = None) -> List[Tuple[Document, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / self.avg_length)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + norm)
+        if predicate is not None:
+            scores = {index: score for index, score in scores.items() if predicate(self.documents[index])}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[index], score) for index, score in ranked]
+
+
+def load_documents(client: QdrantClient, collection_name: str) -> List[Document]:
+    """All chunks stored in the collection, as langchain Documents."""
+    documents, offset = [], None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name, limit=1000, offset=offset, with_payload=True, with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            metadata = dict(payload.get("metadata") or {}, _id=str(point.id))
+            documents.append(Document(page_content=payload.get("page_content", ""), metadata=metadata))
+        if offset is None:
+            return documents
+
+
+def section_filter(section: str) -> Filter:
+    """Qdrant filter restricting a search to one FAQ section."""
+    return Filter(must=[FieldCondition(key="metadata.section", match=MatchValue(value=section))])
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], rrf_k: int) -> List[Document]:
+    """Merge ranked lists; a document scores sum(1 / (rrf_k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = defaultdict(float)
+    by_key: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document.page_content
+            scores[key] += 1.0 / (rrf_k + rank)
+            by_key.setdefault(key, document)
+    return [by_key[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever:
+    """
+    Dense Qdrant search fused with BM25 using reciprocal-rank fusion.
+
+    Exact product names ("Xstream Fiber Mesh", "Chromecast") that dense
+    search ranks low still surface through the lexical ranking. The BM25
+    lookup is local, so it adds well under a millisecond per query.
+    """
+
+    def __init__(self, vector_store: Qdrant, documents: List[Document], k: int = 4,
+                 candidates: Optional[int] = None, rrf_k: Optional[int] = None,
+                 search_params: Optional[SearchParams] = None):
+        self.vector_store = vector_store
+        self.search_params = search_params
+        self.bm25 = BM25Index(documents)
+        self.k = k
+        self.candidates = candidates or int(os.getenv("RETRIEVAL_CANDIDATES", 20))
+        self.rrf_k = rrf_k or int(os.getenv("RETRIEVAL_RRF_K", 60))
+
+    def invoke(self, query: str, section: Optional[str] = None, k: Optional[int] = None) -> List[Document]:
+        """Top-k documents for the query, optionally restricted to one FAQ section."""
+        if section is None:
+            dense = self.vector_store.similarity_search(
+                query, k=self.candidates, search_params=self.search_params
+            )
+            lexical = self.bm25.search(query, self.candidates)
+        else:
+            dense = self.vector_store.similarity_search(
+                query, k=self.candidates, filter=section_filter(section), search_params=self.search_params
+            )
+            lexical = self.bm25.search(
+                query, self.candidates, predicate=lambda document: document.metadata.get("section") == section
+            )
+        lexical = [document for document, _ in lexical]
+        return reciprocal_rank_fusion([dense, lexical], self.rrf_k)[:k or self.k]
@@ -0,0 +1,219 @@
+"""
+Incremental FAQ indexer.
+
+Splits NexTel_FAQ.txt into one document per question/answer pair (or
+fixed-size chunks with FAQ_INDEX_MODE=chunks), identifies each by a hash of
+its text, and brings the Qdrant collection in line with the file: only new
+or changed documents are embedded, and ones that no longer exist are
+deleted by point ID. Only points whose `metadata.source` is the FAQ file
+(or that have no source) are ever deleted, so documents added with
+ingest.py survive a sync.
+Run from app/ (stop the server first when Qdrant runs in local mode, which
+allows a single process per storage folder):
+
+    python -m manager.sub_agents.faq_agent.indexer
+    python -m manager.sub_agents.faq_agent.indexer --dry-run
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, IsEmptyCondition, MatchValue, PayloadField, PointIdsList
+
+from .ingest import IngestConfig, IngestionPipeline
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+
+# Fixed namespace so a chunk always maps to the same point ID
+POINT_NAMESPACE = uuid.UUID("7b1f0c1e-4f5a-4c1b-9a53-2f6f0f7d9c10")
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def point_id(digest: str) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, digest))
+
+
+def split_chunks(text: str, chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP) -> Dict[str, Dict[str, str]]:
+    """Map point ID -> chunk for the text; identical chunks collapse to one point."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = {}
+    for chunk in splitter.split_text(text):
+        digest = chunk_hash(chunk)
+        chunks[point_id(digest)] = {"text": chunk, "hash": digest}
+    return chunks
+
+
+def faq_documents(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Map point ID -> document for the FAQ, one document per question/answer pair.
+
+    Falls back to fixed-size chunks when the text has no numbered questions.
+    """
+    from .faq_parser import entry_text, parse_faq
+
+    entries = parse_faq(text)
+    if not entries:
+        return split_chunks(text)
+    documents = {}
+    for entry in entries:
+        document = entry_text(entry)
+        digest = chunk_hash(document)
+        documents[point_id(digest)] = {
+            "text": document,
+            "hash": digest,
+            "metadata": {
+                "section": entry["section"],
+                "subsection": entry["subsection"],
+                "question": entry["question"],
+            },
+        }
+    return documents
+
+
+def split_document(text: str) -> Dict[str, Dict[str, Any]]:
+    """Split the FAQ according to `FAQ_INDEX_MODE`: qa (default) pairs or fixed-size chunks."""
+    if os.getenv("FAQ_INDEX_MODE", "qa").lower() == "chunks":
+        return split_chunks(text)
+    return faq_documents(text)
+
+
+def source_filter(source: str) -> Filter:
+    """Points ingested from `source`, plus points without a recorded source."""
+    return Filter(should=[
+        FieldCondition(key="metadata.source", match=MatchValue(value=source)),
+        IsEmptyCondition(is_empty=PayloadField(key="metadata.source")),
+    ])
+
+
+def existing_point_ids(client: QdrantClient, collection_name: str, source: Optional[str] = None) -> List[str]:
+    """IDs of every point in the collection, or only those from `source`."""
+    ids, offset = [], None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name, limit=1000, offset=offset,
+            scroll_filter=source_filter(source) if source else None,
+            with_payload=False, with_vectors=False,
+        )
+        ids.extend(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def index_hash(chunks: Dict[str, Dict[str, Any]]) -> str:
+    """Content version of the whole index, recorded in the collection config."""
+    return hashlib.sha256("".join(sorted(chunks)).encode()).hexdigest()
+
+
+def sync_index(client: QdrantClient, embeddings: Embeddings, collection_name: str, text: str,
+               source: str = "NexTel_FAQ.txt", batch_size: int = EMBED_BATCH_SIZE,
+               dry_run: bool = False) -> Dict[str, Any]:
+    """Embed new chunks and delete removed ones so the collection's `source` points match `text`."""
+    started = time.perf_counter()
+    chunks = split_document(text)
+
+    collection_exists = any(c.name == collection_name for c in client.get_collections().collections)
+    current = set(existing_point_ids(client, collection_name)) if collection_exists else set()
+    # Documents from ingest.py share the collection; only this file's points are candidates for deletion
+    owned = set(existing_point_ids(client, collection_name, source=source)) if collection_exists else set()
+    to_add = [pid for pid in chunks if pid not in current]
+    to_delete = sorted(owned - set(chunks))
+
+    report = {
+        "collection": collection_name,
+        "chunks": len(chunks),
+        "unchanged": len(chunks) - len(to_add),
+        "added": len(to_add),
+        "deleted": len(to_delete),
+        "index_hash": index_hash(chunks),
+    }
+    if dry_run:
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return report
+
+    if to_add:
+        pipeline = IngestionPipeline(client, embeddings, collection_name, IngestConfig(batch_size=batch_size))
+        pipeline.run(
+            dict(chunks[pid], id=pid, source=source) for pid in to_add
+        )
+
+    if to_delete:
+        client.delete(collection_name=collection_name, points_selector=PointIdsList(points=to_delete))
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def write_collection_config(path: str, collection_name: str, report: Dict[str, Any]):
+    """Record the collection and its content version, rewriting only when it changed."""
+    config = {"collection_name": collection_name, "index_hash": report["index_hash"], "chunks": report["chunks"]}
+    try:
+        with open(path, "r") as f:
+            existing = json.load(f)
+        # Keep the ingest record (see record_ingest) for the same collection
+        if existing.get("collection_name") == collection_name and "ingested" in existing:
+            config["ingested"] = existing["ingested"]
+        if existing == config:
+            return
+    except (OSError, ValueError):
+        pass
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+
+def record_ingest(path: str, collection_name: str, report: Dict[str, Any]):
+    """
+    Note an ingest run in the collection config.
+
+    Running processes watch this file to clear their retrieval caches, so
+    documents added by ingest.py show up without waiting for cache expiry.
+    """
+    try:
+        with open(path, "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return
+    if config.get("collection_name") != collection_name:
+        return
+    config["ingested"] = {"chunks": report["chunks"], "at": time.time()}
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+
+def main():
+    from . import vector_store
+
+    parser = argparse.ArgumentParser(description="Incrementally re-index the NexTel FAQ")
+    parser.add_argument("--file", default=vector_store.faq_path)
+    parser.add_argument("--collection", default=None, help="defaults to the configured collection")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="report changes without embedding")
+    args = parser.parse_args()
+
+    collection_name = args.collection or vector_store.get_collection_name()
+    with open(args.file, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    report = sync_index(
+        vector_store.get_client(), vector_store.get_embedding_model(), collection_name, text,
+        batch_size=args.batch_size, dry_run=args.dry_run,
+    )
+    if not args.dry_run:
+        write_collection_config(vector_store.collection_config_file, collection_name, report)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Streaming ingestion of large document sets into the FAQ collection.
+
+Documents are read lazily, chunked, and embedded in batches by a bounded pool
+of worker threads. At most `workers * 2` batches are in flight, so memory stays
+flat however large the corpus is. Embedding calls are retried with exponential
+backoff when the provider rate-limits or fails transiently, and finished
+batches are bulk-upserted into Qdrant. Each point records its file in
+`metadata.source`. The FAQ sync (indexer.py) only deletes NexTel_FAQ.txt's
+own points, so ingested documents stay in the shared collection. Run from app/:
+
+    python -m manager.sub_agents.faq_agent.ingest manuals/ --batch-size 64 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from .storage import StorageConfig, storage_config
+
+Chunk = Dict[str, Any]  # {"id", "text", "hash", "source"}, optionally "metadata"
+
+DOCUMENT_EXTENSIONS = (".txt", ".md")
+
+
+class IngestConfig:
+    """Ingestion settings, overridable via INGEST_* environment variables."""
+
+    def __init__(self, batch_size: Optional[int] = None, workers: Optional[int] = None,
+                 max_retries: Optional[int] = None, backoff_base: Optional[float] = None):
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", 64))
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", 4))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("INGEST_MAX_RETRIES", 5))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("INGEST_BACKOFF_BASE", 1.0))
+        self.max_in_flight = self.workers * 2
+
+
+def iter_documents(paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Yield {"source", "text"} for every document file under the given paths."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(DOCUMENT_EXTENSIONS):
+                        yield from iter_documents([os.path.join(root, name)])
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                yield {"source": os.path.basename(path), "text": f.read()}
+
+
+def iter_chunks(documents: Iterable[Dict[str, str]]) -> Iterator[Chunk]:
+    """Split documents into hashed chunks, one document at a time."""
+    from .indexer import split_chunks
+
+    for document in documents:
+        for pid, chunk in split_chunks(document["text"]).items():
+            yield {"id": pid, "text": chunk["text"], "hash": chunk["hash"], "source": document["source"]}
+
+
+def iter_batches(chunks: Iterable[Chunk], batch_size: int, skip_ids: Optional[Set[str]] = None) -> Iterator[List[Chunk]]:
+    batch, seen = [], set()
+    for chunk in chunks:
+        if chunk["id"] in seen or (skip_ids and chunk["id"] in skip_ids):
+            continue
+        seen.add(chunk["id"])
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("429", "rate", "quota", "resourceexhausted", "resource_exhausted"))
+
+
+class IngestionPipeline:
+    """Embeds chunk batches in parallel and upserts them into one collection."""
+
+    def __init__(self, client: QdrantClient, embeddings: Embeddings, collection_name: str,
+                 config: Optional[IngestConfig] = None, storage: Optional[StorageConfig] = None):
+        self.client = client
+        self.embeddings = embeddings
+        self.collection_name = collection_name
+        self.config = config or IngestConfig()
+        self.storage = storage or storage_config
+        self._collection_lock = threading.Lock()
+        self._collection_ready = any(
+            c.name == collection_name for c in client.get_collections().collections
+        )
+        self._stats_lock = threading.Lock()
+        self.stats = {"batches": 0, "chunks": 0, "retries": 0, "rate_limited": 0, "embed_seconds": 0.0}
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                with self._stats_lock:
+                    self.stats["embed_seconds"] += time.perf_counter() - started
+                return vectors
+            except Exception as e:
+                attempt += 1
+                if attempt > self.config.max_retries:
+                    raise
+                rate_limited = is_rate_limited(e)
+                # Rate limits back off harder than transient errors; jitter spreads the workers out
+                delay = self.config.backoff_base * (2 ** (attempt - 1)) * (2 if rate_limited else 1)
+                delay *= random.uniform(0.5, 1.0)
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                    self.stats["rate_limited"] += int(rate_limited)
+                print(f"Embedding batch failed ({e}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _ensure_collection(self, size: int):
+        if self._collection_ready:
+            return
+        with self._collection_lock:
+            if not self._collection_ready:
+                self.client.create_collection(
+                    collection_name=self.collection_name, **self.storage.create_kwargs(size)
+                )
+                self._collection_ready = True
+
+    def _process(self, batch: List[Chunk]) -> int:
+        vectors = self._embed([chunk["text"] for chunk in batch])
+        self._ensure_collection(len(vectors[0]))
+        # Payload layout matches langchain's Qdrant store so the retriever reads it as-is
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                PointStruct(
+                    id=chunk["id"],
+                    vector=vector,
+                    payload={
+                        "page_content": chunk["text"],
+                        "metadata": dict(
+                            chunk.get("metadata") or {}, chunk_hash=chunk["hash"], source=chunk["source"]
+                        ),
+                    },
+                )
+                for chunk, vector in zip(batch, vectors)
+            ],
+        )
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["chunks"] += len(batch)
+        return len(batch)
+
+    def run(self, chunks: Iterable[Chunk], skip_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Embed and upsert every chunk; returns throughput stats."""
+        started = time.perf_counter()
+        in_flight: Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="faq-ingest") as pool:
+            for batch in iter_batches(chunks, self.config.batch_size, skip_ids):
+                # Backpressure: stop reading documents until a batch slot frees up
+                if len(in_flight) >= self.config.max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(pool.submit(self._process, batch))
+            for future in in_flight:
+                future.result()
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            report = dict(self.stats)
+        report.update(
+            seconds=round(elapsed, 3),
+            chunks_per_sec=round(report["chunks"] / elapsed, 1) if elapsed else 0.0,
+            embed_seconds=round(report["embed_seconds"], 3),
+        )
+        return report
+
+
+def main():
+    from . import vector_store
+    from .indexer import existing_point_ids, record_ingest
+
+    parser = argparse.ArgumentParser(description="Stream documents into the FAQ collection")
+    parser.add_argument("paths", nargs="+", help="files or directories of .txt/.md documents")
+    parser.add_argument("--collection", default=None, help="defaults to the configured collection")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    client = vector_store.get_client()
+    collection_name = args.collection or vector_store.get_collection_name()
+    pipeline = IngestionPipeline(
+        client, vector_store.get_embedding_model(), collection_name,
+        IngestConfig(batch_size=args.batch_size, workers=args.workers),
+    )
+    # Chunks already in the collection are skipped, so re-running only embeds what is new
+    skip_ids = set(existing_point_ids(client, collection_name)) if pipeline._collection_ready else set()
+    report = pipeline.run(iter_chunks(iter_documents(args.paths)), skip_ids=skip_ids)
+    if report["chunks"]:
+        record_ingest(vector_store.collection_config_file, collection_name, report)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Retrieval sidecar: one process owns the FAQ index and serves every uvicorn
+worker over a Unix socket.
+
+Embedded Qdrant holds a lock on its storage folder, so only one process can
+open it, and each process would otherwise hold its own copy of the vectors,
+BM25 index and caches. Start the sidecar once, then the workers:
+
+    python -m manager.sub_agents.faq_agent.retrieval_service
+    RETRIEVAL_SERVICE=shared uvicorn chat_server:app --workers 4
+
+`RETRIEVAL_SERVICE` selects how `retrieve` reaches the index:
+
+- embedded: open the index in this process
+- shared: always go through the sidecar at `RETRIEVAL_SERVICE_SOCKET`
+- auto (default): use the sidecar when its socket exists, embedded otherwise
+  (and when the socket is stale: missing or refusing connections, in a
+  single-worker server only)
+
+The protocol is one JSON object per line in each direction.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import vector_store
+from .faq_parser import entry_text
+
+DEFAULT_SOCKET = "/tmp/nextel-retrieval.sock"
+
+
+# ----- embedded retrieval -----
+
+def retrieve_local(query: str) -> str:
+    """Fast path, result cache, then (section-filtered) search on the in-process index."""
+    vector_store.check_index_fingerprint()
+    # Questions that match an FAQ question are answered without any embedding call
+    entry = vector_store.get_qa_index().match(query)
+    if entry is not None:
+        return entry_text(entry)
+
+    cached = vector_store.result_cache.get(query)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    # The vector store is opened on first use (or by the warm-up task), not at import
+    docs = vector_store.search(query)
+    result = "\n\n".join([doc.page_content for doc in docs])
+    vector_store.result_cache.put(query, result, (time.perf_counter() - started) * 1000)
+    return result
+
+
+def _local_status() -> Dict[str, Any]:
+    return {"index": vector_store.vector_store_status(), "stats": vector_store.retrieval_cache_stats()}
+
+
+# ----- sidecar -----
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "retrieve":
+                    response = {"result": retrieve_local(request["query"])}
+                elif op == "embed_query":
+                    response = {"vector": vector_store.get_embedding_model().embed_query(request["text"])}
+                elif op == "status":
+                    response = _local_status()
+                else:
+                    response = {"error": f"unknown op: {op}"}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class RetrievalServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+        self.socket_path = socket_path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# ----- client -----
+
+class RetrievalClient:
+    """
+    Keeps one connection to the sidecar per thread (tools run on executor threads).
+
+    When the sidecar is gone (socket missing or refusing connections), calls
+    fail fast without connecting until a retry time, which backs off from 1s up
+    to `RETRIEVAL_SERVICE_BACKOFF_MAX` seconds. Only the changes between up and
+    down are logged.
+    """
+
+    def __init__(self, socket_path: str, timeout: float, backoff_max: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+        self._state_lock = threading.Lock()
+        self._down_since: Optional[float] = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def _check_available(self):
+        with self._state_lock:
+            if self._down_since is not None and time.monotonic() < self._retry_at:
+                raise ConnectionRefusedError(
+                    f"retrieval service down, next retry in {self._retry_at - time.monotonic():.1f}s"
+                )
+
+    def _mark_down(self, error: OSError):
+        with self._state_lock:
+            now = time.monotonic()
+            self._backoff = min(max(self._backoff * 2, 1.0), self.backoff_max)
+            self._retry_at = now + self._backoff
+            if self._down_since is not None:
+                return
+            self._down_since = now
+        print(f"Retrieval service unavailable ({error}), retrying with backoff up to {self.backoff_max:.0f}s")
+
+    def _mark_up(self):
+        with self._state_lock:
+            if self._down_since is None:
+                return
+            down_for = time.monotonic() - self._down_since
+            self._down_since, self._backoff, self._retry_at = None, 0.0, 0.0
+        print(f"🔎 Retrieval service reachable again after {down_for:.0f}s")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def call(self, op: str, **params) -> Dict[str, Any]:
+        self._check_available()
+        payload = json.dumps(dict(params, op=op)).encode() + b"\n"
+        # A dropped connection (e.g. sidecar restart) is retried once on a fresh socket
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("retrieval service closed the connection")
+                break
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                # Nothing is listening: no point retrying right away
+                self._reset()
+                self._mark_down(e)
+                raise
+            except (OSError, ConnectionError):
+                self._reset()
+                if attempt:
+                    raise
+        self._mark_up()
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"retrieval service: {response['error']}")
+        return response
+
+
+# ----- mode switch -----
+
+socket_path = os.getenv("RETRIEVAL_SERVICE_SOCKET", DEFAULT_SOCKET)
+service_mode = os.getenv("RETRIEVAL_SERVICE", "auto").lower()
+_client = RetrievalClient(
+    socket_path,
+    float(os.getenv("RETRIEVAL_SERVICE_TIMEOUT", 10)),
+    float(os.getenv("RETRIEVAL_SERVICE_BACKOFF_MAX", 30)),
+)
+
+
+def is_shared() -> bool:
+    if service_mode == "shared":
+        return True
+    return service_mode == "auto" and os.path.exists(socket_path)
+
+
+def _fallback(error: OSError):
+    """
+    In auto mode a stale socket (sidecar gone) falls back to the embedded index.
+
+    Only a missing socket or a refused connection counts as gone. A sidecar
+    that times out is still alive and holds the Qdrant folder lock, so
+    opening the embedded index would fail as well; that error is raised. It
+    is also raised when this is one of several server workers: each would
+    open the embedded index, and only one can hold its folder lock. The
+    client logs the outage once, so nothing is printed here.
+    """
+    if service_mode == "shared" or not isinstance(error, (FileNotFoundError, ConnectionRefusedError)):
+        raise error
+    if _multi_worker():
+        raise error
+
+
+def _multi_worker() -> bool:
+    """Whether this process is one of several server workers (`uvicorn --workers N`)."""
+    # uvicorn reads --workers from WEB_CONCURRENCY and spawns its workers as child processes
+    return int(os.getenv("WEB_CONCURRENCY", 1)) > 1 or multiprocessing.parent_process() is not None
+
+
+def retrieve(query: str) -> str:
+    """Retrieve relevant chunks from indexed text."""
+    if is_shared():
+        try:
+            return _client.call("retrieve", query=query)["result"]
+        except OSError as e:
+            _fallback(e)
+    return retrieve_local(query)
+
+
+def embed_query(text: str) -> List[float]:
+    """Query embedding, from the sidecar's model and cache when it is in use."""
+    if is_shared():
+        try:
+            return _client.call("embed_query", text=text)["vector"]
+        except OSError as e:
+            _fallback(e)
+    return vector_store.get_embedding_model().embed_query(text)
+
+
+def start_warmup():
+    """Warm the in-process index; the sidecar warms its own."""
+    if not is_shared():
+        return vector_store.start_warmup()
+    return None
+
+
+def index_status() -> Dict[str, Any]:
+    """Readiness of the FAQ index for /health, wherever it lives."""
+    if not is_shared():
+        return dict(vector_store.vector_store_status(), mode="embedded")
+    try:
+        return dict(_client.call("status")["index"], mode="shared")
+    except Exception as e:
+        return {"status": "unavailable", "error": str(e), "mode": "shared"}
+
+
+def retrieval_stats() -> Dict[str, Any]:
+    """Retrieval cache statistics for /metrics, wherever the index lives."""
+    if not is_shared():
+        return vector_store.retrieval_cache_stats()
+    try:
+        return _client.call("status")["stats"]
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve FAQ retrieval to all workers over a Unix socket")
+    parser.add_argument("--socket", default=socket_path)
+    args = parser.parse_args()
+
+    # The socket only appears once the index is ready, so auto-mode workers never wait on it
+    print("Opening FAQ index for the retrieval service...")
+    vector_store.get_retriever()
+    server = RetrievalServer(args.socket)
+    print(f"🔎 Retrieval service listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
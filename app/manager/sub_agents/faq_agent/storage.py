@@ -0,0 +1,127 @@
+import os
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionInfo,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+load_dotenv()
+
+
+class StorageConfig:
+    """
+    How the FAQ collection stores vectors, from QDRANT_* environment variables.
+
+    - QDRANT_QUANTIZATION: none (default), scalar (int8, 4x smaller) or
+      binary (1 bit per dimension, 32x smaller). Quantised vectors stay in
+      RAM; the originals are used to rescore the top candidates.
+    - QDRANT_ON_DISK: keep the original float32 vectors in memory-mapped files.
+    - QDRANT_HNSW_ON_DISK: keep the HNSW graph in memory-mapped files.
+    - QDRANT_RESCORE / QDRANT_OVERSAMPLING: rescoring of quantised results.
+
+    These settings only take effect against a Qdrant server (QDRANT_URL). The
+    embedded local mode keeps every vector as float32 in memory and accepts
+    but ignores them.
+    """
+
+    def __init__(self, quantization: Optional[str] = None, on_disk: Optional[bool] = None,
+                 hnsw_on_disk: Optional[bool] = None):
+        self.quantization = (quantization or os.getenv("QDRANT_QUANTIZATION", "none")).lower()
+        if self.quantization not in ("none", "scalar", "binary"):
+            raise ValueError(f"Unknown QDRANT_QUANTIZATION: {self.quantization}")
+        self.on_disk = on_disk if on_disk is not None else os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+        self.hnsw_on_disk = (
+            hnsw_on_disk if hnsw_on_disk is not None
+            else os.getenv("QDRANT_HNSW_ON_DISK", "false").lower() == "true"
+        )
+        self.rescore = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+        self.oversampling = float(os.getenv("QDRANT_OVERSAMPLING", 2.0))
+
+    @property
+    def label(self) -> str:
+        parts = [self.quantization]
+        if self.on_disk:
+            parts.append("vectors-on-disk")
+        if self.hnsw_on_disk:
+            parts.append("hnsw-on-disk")
+        return "+".join(parts)
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def create_kwargs(self, size: int) -> Dict[str, Any]:
+        """Arguments for client.create_collection()."""
+        return {
+            "vectors_config": VectorParams(size=size, distance=Distance.COSINE, on_disk=self.on_disk),
+            "quantization_config": self.quantization_config(),
+            "hnsw_config": HnswConfigDiff(on_disk=self.hnsw_on_disk),
+        }
+
+    def search_params(self) -> Optional[SearchParams]:
+        """Search parameters for queries against the collection."""
+        if self.quantization == "none":
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        )
+
+    def matches(self, info: CollectionInfo) -> bool:
+        """Whether an existing collection already uses these storage settings."""
+        quantization = info.config.quantization_config
+        kind = (
+            "none" if quantization is None
+            else "scalar" if isinstance(quantization, ScalarQuantization)
+            else "binary" if isinstance(quantization, BinaryQuantization)
+            else "other"
+        )
+        return (
+            kind == self.quantization
+            and bool(getattr(info.config.params.vectors, "on_disk", False)) == self.on_disk
+            and bool(info.config.hnsw_config.on_disk) == self.hnsw_on_disk
+        )
+
+    def apply(self, client: QdrantClient, collection_name: str) -> bool:
+        """Bring an existing collection's storage settings in line with this config."""
+        if self.matches(client.get_collection(collection_name)):
+            return False
+        client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": VectorParamsDiff(on_disk=self.on_disk)},
+            quantization_config=self.quantization_config() or Disabled.DISABLED,
+            hnsw_config=HnswConfigDiff(on_disk=self.hnsw_on_disk),
+        )
+        return True
+
+
+def is_server_mode() -> bool:
+    return bool(os.getenv("QDRANT_URL"))
+
+
+def create_client(local_path: str) -> QdrantClient:
+    """Client for the Qdrant server at QDRANT_URL, or the embedded store at `local_path`."""
+    if is_server_mode():
+        return QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY") or None)
+    return QdrantClient(path=local_path)
+
+
+storage_config = StorageConfig()
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_community.vectorstores import Qdrant
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from .cache import CachedEmbeddings, ResultCache
+from .embeddings import PROVIDERS, create_embeddings, get_provider_name
+from .faq_parser import QAIndex
+from .hybrid import HybridRetriever, load_documents, section_filter
+from .storage import create_client, is_server_mode, storage_config
+from .indexer import sync_index, write_collection_config
+
+load_dotenv()
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+faq_path = os.path.join(current_dir, "NexTel_FAQ.txt")
+qdrant_db_path = os.path.join(current_dir, "qdrant_db")
+
+# The provider is fixed per process and selects both the model and the collection
+embedding_provider = get_provider_name()
+embedding_model_name = PROVIDERS[embedding_provider]["model"]
+collection_config_file = os.path.join(current_dir, PROVIDERS[embedding_provider]["config_file"])
+default_collection_name = PROVIDERS[embedding_provider]["collection"]
+retrieval_k = int(os.getenv("RETRIEVAL_K", 4))
+retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+# Initialisation state, guarded by _lock. Nothing touches Qdrant or the
+# embedding API until the first retrieve() call or an explicit warm-up.
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    "status": "cold",  # cold -> warming -> ready | failed
+    "error": None,
+    "init_seconds": None,
+}
+_vector_store: Optional[Qdrant] = None
+_client: Optional[QdrantClient] = None
+_embedding_model: Optional[CachedEmbeddings] = None
+_retriever = None
+_retriever_lock = threading.Lock()
+_qa_index: Optional[QAIndex] = None
+
+# Exact-repeat questions are answered from here without touching the index
+result_cache = ResultCache()
+_index_lock = threading.Lock()
+_index_mtimes: Optional[Tuple[float, ...]] = None
+_index_fingerprint: Optional[str] = None
+
+
+def get_embedding_model() -> CachedEmbeddings:
+    global _embedding_model
+    if _embedding_model is None:
+        cache_path = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(current_dir, "embedding_cache.sqlite"))
+        _embedding_model = CachedEmbeddings(
+            create_embeddings(embedding_provider),
+            model_name=f"{embedding_provider}:{embedding_model_name}",
+            path=cache_path,
+        )
+    return _embedding_model
+
+
+def get_client() -> QdrantClient:
+    global _client
+    if _client is None:
+        _client = create_client(qdrant_db_path)
+    return _client
+
+
+def get_collection_name() -> str:
+    if os.path.exists(collection_config_file):
+        with open(collection_config_file, "r") as f:
+            return json.load(f)["collection_name"]
+    return default_collection_name
+
+
+def setup_vector_store() -> Qdrant:
+    """Open the FAQ collection, bringing it in line with NexTel_FAQ.txt first."""
+    client = get_client()
+    embedding_model = get_embedding_model()
+    collection_name = get_collection_name()
+
+    collections = client.get_collections()
+    collection_exists = any(collection.name == collection_name for collection in collections.collections)
+
+    if not collection_exists or os.getenv("FAQ_SYNC_ON_START", "true").lower() == "true":
+        # Only new or edited chunks are embedded, so an unchanged file costs a hash pass
+        with open(faq_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        report = sync_index(client, embedding_model, collection_name, text)
+        write_collection_config(collection_config_file, collection_name, report)
+        print(
+            f"FAQ collection {collection_name}: {report['unchanged']} unchanged, "
+            f"{report['added']} added, {report['deleted']} deleted ({report['seconds']}s)"
+        )
+    else:
+        print(f"Loading existing collection: {collection_name}")
+
+    if is_server_mode() and storage_config.apply(client, collection_name):
+        print(f"FAQ collection {collection_name} storage updated to {storage_config.label}")
+
+    return Qdrant(
+        client=client,
+        collection_name=collection_name,
+        embeddings=embedding_model
+    )
+
+
+def get_vector_store() -> Qdrant:
+    """Return the FAQ vector store, initialising it on first use."""
+    global _vector_store
+    if _vector_store is not None:
+        return _vector_store
+    with _lock:
+        if _vector_store is None:
+            _state["status"] = "warming"
+            started = time.perf_counter()
+            try:
+                _vector_store = setup_vector_store()
+            except Exception as e:
+                _state.update(status="failed", error=str(e))
+                raise
+            _state.update(
+                status="ready", error=None, init_seconds=round(time.perf_counter() - started, 3)
+            )
+    return _vector_store
+
+
+def get_retriever():
+    """
+    Return the shared retriever, built on top of the vector store on first use
+    and again after check_index_fingerprint saw the index change.
+
+    `RETRIEVAL_MODE=hybrid` (default) fuses dense search with a BM25 index
+    over the same chunks; `dense` uses the Qdrant search alone.
+    """
+    global _retriever
+    retriever = _retriever
+    if retriever is None:
+        vector_store = get_vector_store()
+        with _retriever_lock:
+            if _retriever is None:
+                if retrieval_mode == "hybrid":
+                    documents = load_documents(get_client(), get_collection_name())
+                    _retriever = HybridRetriever(
+                        vector_store, documents, k=retrieval_k, search_params=storage_config.search_params()
+                    )
+                else:
+                    _retriever = vector_store.as_retriever(
+                        search_kwargs={"k": retrieval_k, "search_params": storage_config.search_params()}
+                    )
+            # Read under the lock: check_index_fingerprint may reset the global at any time
+            retriever = _retriever
+    return retriever
+
+
+def get_qa_index() -> QAIndex:
+    """Question/answer pairs parsed from NexTel_FAQ.txt, for the embedding-free fast path."""
+    global _qa_index
+    if _qa_index is None:
+        _qa_index = QAIndex.from_file(faq_path)
+    return _qa_index
+
+
+def index_fingerprint() -> str:
+    """Hash of the FAQ source and the collection config; any change invalidates the caches."""
+    digest = hashlib.sha256(get_collection_name().encode())
+    for path in (faq_path, collection_config_file):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def check_index_fingerprint():
+    """
+    Clear the result cache and rebuild the retriever when NexTel_FAQ.txt or the
+    collection config changed.
+
+    The indexer and ingest.py both rewrite the collection config, so this
+    catches re-indexing and ingestion done by another process. Files are only
+    hashed when their mtimes moved. The retriever is dropped so the next search
+    rebuilds it, because the hybrid retriever's BM25 index holds a copy of the
+    corpus. The Q&A fast path is reloaded too, since it is parsed from the FAQ
+    file.
+    """
+    global _index_mtimes, _index_fingerprint, _qa_index, _retriever
+    mtimes = tuple(
+        os.path.getmtime(path) if os.path.exists(path) else 0.0
+        for path in (faq_path, collection_config_file)
+    )
+    if mtimes == _index_mtimes:
+        return
+    fingerprint = index_fingerprint()
+    with _index_lock:
+        _index_mtimes = mtimes
+        if fingerprint == _index_fingerprint:
+            return
+        if _index_fingerprint is not None:
+            print("🧹 FAQ index changed, clearing retrieval result cache and retriever")
+            with _retriever_lock:
+                _retriever = None
+            result_cache.clear()
+            _qa_index = None
+        _index_fingerprint = fingerprint
+
+
+def search(query: str) -> List[Document]:
+    """
+    Retrieve documents for a query, restricted to the FAQ section it names when
+    one is recognised. Falls back to the whole index when the filtered search
+    finds nothing, e.g. for a collection indexed with FAQ_INDEX_MODE=chunks.
+    """
+    retriever = get_retriever()
+    section = get_qa_index().guess_section(query)
+    if section is not None:
+        if isinstance(retriever, HybridRetriever):
+            documents = retriever.invoke(query, section=section)
+        else:
+            documents = get_vector_store().similarity_search(
+                query, k=retrieval_k, filter=section_filter(section), search_params=storage_config.search_params()
+            )
+        if documents:
+            return documents
+    return retriever.invoke(query)
+
+
+def start_warmup() -> threading.Thread:
+    """Initialise the vector store in a background thread so startup does not wait for it."""
+
+    def warm():
+        try:
+            get_retriever()
+        except Exception as e:
+            print(f"FAQ vector store warm-up failed: {e}")
+
+    thread = threading.Thread(target=warm, name="faq-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def vector_store_status() -> Dict[str, Any]:
+    """Readiness of the FAQ index for /health."""
+    return dict(_state)
+
+
+def retrieval_cache_stats() -> Dict[str, Any]:
+    """Hit ratios and estimated latency saved by the embedding and result caches."""
+    disk = _embedding_model.disk if _embedding_model else None
+    return {
+        "qa_fast_path": _qa_index.stats() if _qa_index else None,
+        "query_embeddings": _embedding_model.stats.snapshot() if _embedding_model else None,
+        "embedding_disk_cache": {"size": len(disk), "evicted": disk.evicted} if disk else None,
+        "results": dict(result_cache.stats.snapshot(), size=len(result_cache.cache)),
+    }
@@ -1,5 +1,7 @@
 from google.adk.agents import Agent
+from context_budget import context_budget
 from config.customer_service_tools import CustomerServiceTools
+from config.tool_executor import offload
 import os
 from dotenv import load_dotenv
 # Initialize the tools
@@ -48,7 +50,7 @@ plan_enquiry_agent = Agent(
 
     **Interaction History:**
     <interaction_history>
-    {interaction_history}
+    {interaction_context}
     </interaction_history>
 
     Always maintain a professional and helpful tone. If you need additional information to assist the customer,
@@ -72,11 +74,13 @@ plan_enquiry_agent = Agent(
     data: 999 = unlimited data(default is total data per plan duration)
     nsgs: (default is total msgs per plan duration)
     """,
+    before_agent_callback=context_budget.before_agent_callback,
+    after_model_callback=context_budget.after_model_callback,
     tools=[
-        tools.get_available_plans,
-        tools.get_available_addons,
-        tools.get_current_subscription,
-        tools.get_user_addons,
+        offload(tools.get_available_plans),
+        offload(tools.get_available_addons),
+        offload(tools.get_current_subscription),
+        offload(tools.get_user_addons),
     ],
 )
 
@@ -1,5 +1,7 @@
 from google.adk.agents import Agent
+from context_budget import context_budget
 from config.customer_service_tools import CustomerServiceTools
+from config.tool_executor import offload
 import os
 
 # Initialize the tools
@@ -44,7 +46,7 @@ recharge_billing_agent = Agent(
 
     **Interaction History:**
     <interaction_history>
-    {interaction_history}
+    {interaction_context}
     </interaction_history>
 
     Always maintain a professional and helpful tone. If you need additional information to assist the customer,
@@ -58,12 +60,14 @@ recharge_billing_agent = Agent(
     Important:
     - While recharging to a new plan, if user has a old plan then appropriate refund amount will be calculated and new plan's amount will be adjusted according to that.
     """,
+    before_agent_callback=context_budget.before_agent_callback,
+    after_model_callback=context_budget.after_model_callback,
     tools=[
-        tools.get_last_transactions,
-        tools.recharge_user_with_wallet,
-        tools.purchase_addon,
-        tools.check_wallet_balance,
-        tools.get_available_plans,
+        offload(tools.get_last_transactions),
+        offload(tools.recharge_user_with_wallet),
+        offload(tools.purchase_addon),
+        offload(tools.check_wallet_balance),
+        offload(tools.get_available_plans),
     ],
 )
 
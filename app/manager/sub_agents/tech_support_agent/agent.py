@@ -1,5 +1,7 @@
 from google.adk.agents import Agent
+from context_budget import context_budget
 from config.customer_service_tools import CustomerServiceTools
+from config.tool_executor import offload
 import os
 from dotenv import load_dotenv
 # Initialize the tools
@@ -34,7 +36,7 @@ tech_support_agent = Agent(
 
     **Interaction History:**
     <interaction_history>
-    {interaction_history}
+    {interaction_context}
     </interaction_history>
 
     Always maintain a professional and helpful tone. If you need additional information to assist the customer,
@@ -53,11 +55,13 @@ tech_support_agent = Agent(
     - Assure the user that issue will be resolved ASAP
 
     """,
+    before_agent_callback=context_budget.before_agent_callback,
+    after_model_callback=context_budget.after_model_callback,
     tools=[
-        tools.get_open_tickets,
-        tools.get_ticket_history,
-        tools.create_support_ticket,
-        tools.update_ticket_status,
+        offload(tools.get_open_tickets),
+        offload(tools.get_ticket_history),
+        offload(tools.create_support_ticket),
+        offload(tools.update_ticket_status),
     ],
 )
 
@@ -0,0 +1,218 @@
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote_plus
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+
+from context_budget import HISTORY_STATE_KEY, SUMMARY_STATE_KEY
+
+SessionKey = Tuple[str, str, str]
+
+# The history is published as one whole list per append, so another worker
+# reading a stale copy would overwrite entries; these deltas are never buffered
+WRITE_THROUGH_KEYS = frozenset({HISTORY_STATE_KEY, SUMMARY_STATE_KEY})
+
+
+def _is_state_only(event: Event) -> bool:
+    """Events that only carry a state delta (e.g. rendered prompt context) can be batched."""
+    actions = event.actions
+    return (
+        not event.partial
+        and not event.content
+        and actions is not None
+        and bool(actions.state_delta)
+        and not WRITE_THROUGH_KEYS.intersection(actions.state_delta)
+        and not actions.transfer_to_agent
+        and not actions.escalate
+        and not actions.artifact_delta
+    )
+
+
+class WriteBehindSessionService(BaseSessionService):
+    """
+    Wraps a persistent session service and batches state-only events.
+
+    State deltas are merged in memory and written as a single event per session
+    every `SESSION_FLUSH_INTERVAL_MS`, or earlier when `SESSION_FLUSH_BATCH_SIZE`
+    deltas are pending. Pending deltas for a session are always flushed before
+    that session is read or receives a regular event through this service, so
+    within this process writes are seen in order. Other workers only see a
+    buffered delta once it is flushed. Deltas to the interaction history
+    (`WRITE_THROUGH_KEYS`) are therefore written through, since a worker that
+    resumes the session must not append to a stale copy of it.
+
+    Every `Session` object handed out or appended through this service is
+    tracked. After each write, the tracked objects get the stored update time.
+    A runner holding its session across a flush then still passes ADK's
+    stale-session check.
+    """
+
+    def __init__(self, inner: BaseSessionService):
+        self.inner = inner
+        self.flush_interval = float(os.getenv("SESSION_FLUSH_INTERVAL_MS", 200)) / 1000
+        self.batch_size = int(os.getenv("SESSION_FLUSH_BATCH_SIZE", 20))
+        self._lock = threading.RLock()
+        self._pending: Dict[SessionKey, Dict[str, Any]] = {}
+        self._pending_counts: Dict[SessionKey, int] = {}
+        self._stats = {"buffered_events": 0, "flushes": 0, "flushed_events": 0}
+        self._live: Dict[SessionKey, "weakref.WeakSet[Session]"] = {}
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+
+    # ----- batching -----
+
+    def _track(self, session: Optional[Session]) -> Optional[Session]:
+        if session is not None:
+            key = (session.app_name, session.user_id, session.id)
+            with self._lock:
+                self._live.setdefault(key, weakref.WeakSet()).add(session)
+        return session
+
+    def _refresh(self, key: SessionKey, update_time: float):
+        """Move the in-process holders of a session up to the update time of our own write."""
+        with self._lock:
+            live = self._live.get(key)
+            sessions = list(live) if live else []
+            if live is not None and not sessions:
+                del self._live[key]
+        for session in sessions:
+            if session.last_update_time < update_time:
+                session.last_update_time = update_time
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Session write-behind flush failed: {e}")
+
+    def _flush_key(self, key: SessionKey):
+        with self._lock:
+            delta = self._pending.pop(key, None)
+            count = self._pending_counts.pop(key, 0)
+            if not delta:
+                return
+            app_name, user_id, session_id = key
+            session = self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            if session is None:
+                # Deleted in the meantime (possibly by another worker)
+                return
+            self.inner.append_event(
+                session,
+                Event(invocation_id=f"write-behind-{session_id}", author="user",
+                      actions=EventActions(state_delta=delta)),
+            )
+            # Sessions held elsewhere in this process must follow the stored update time
+            self._refresh(key, session.last_update_time)
+            self._stats["flushes"] += 1
+            self._stats["flushed_events"] += count
+
+    def flush(self):
+        """Write every pending delta to the underlying store."""
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush_key(key)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, pending_sessions=len(self._pending))
+
+    # ----- BaseSessionService -----
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        self._track(session)
+        if _is_state_only(event):
+            # Keep the caller's session object consistent without touching storage yet
+            super().append_event(session=session, event=event)
+            with self._lock:
+                self._pending.setdefault(key, {}).update(event.actions.state_delta)
+                self._pending_counts[key] = self._pending_counts.get(key, 0) + 1
+                self._stats["buffered_events"] += 1
+                full = self._pending_counts[key] >= self.batch_size
+            if full:
+                self._flush_key(key)
+            return event
+
+        self._flush_key(key)
+        event = self.inner.append_event(session, event)
+        self._refresh(key, session.last_update_time)
+        return event
+
+    def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                       session_id: Optional[str] = None) -> Session:
+        return self._track(
+            self.inner.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        )
+
+    def get_session(self, *, app_name: str, user_id: str, session_id: str, config=None) -> Optional[Session]:
+        self._flush_key((app_name, user_id, session_id))
+        return self._track(
+            self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        )
+
+    def list_sessions(self, *, app_name: str, user_id: str):
+        self.flush()
+        return self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._pending.pop((app_name, user_id, session_id), None)
+            self._pending_counts.pop((app_name, user_id, session_id), None)
+            self._live.pop((app_name, user_id, session_id), None)
+        self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str):
+        self._flush_key((app_name, user_id, session_id))
+        return self.inner.list_events(app_name=app_name, user_id=user_id, session_id=session_id)
+
+
+def _postgres_url() -> str:
+    """SQLAlchemy URL for the application database, from the same DB_* variables."""
+    return "postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}?sslmode={sslmode}".format(
+        user=quote_plus(os.getenv("DB_USER", "")),
+        password=quote_plus(os.getenv("DB_PASSWORD", "")),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432),
+        name=os.getenv("DB_NAME", ""),
+        sslmode=os.getenv("DB_SSLMODE", "require"),
+    )
+
+
+def create_session_service() -> BaseSessionService:
+    """
+    Build the session service selected by `SESSION_BACKEND`:
+
+    - memory (default): InMemorySessionService, single process only
+    - sqlite: DatabaseSessionService on `SESSION_DB_URL` (default sqlite:///sessions.db)
+    - postgres: DatabaseSessionService on `SESSION_DB_URL` or the DB_* database
+
+    Persistent backends are wrapped in WriteBehindSessionService unless
+    `SESSION_WRITE_BEHIND=false`.
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "memory":
+        return InMemorySessionService()
+
+    from google.adk.sessions import DatabaseSessionService
+
+    if backend == "sqlite":
+        db_url = os.getenv("SESSION_DB_URL", "sqlite:///sessions.db")
+    elif backend == "postgres":
+        db_url = os.getenv("SESSION_DB_URL") or _postgres_url()
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+    service = DatabaseSessionService(db_url=db_url)
+    if os.getenv("SESSION_WRITE_BEHIND", "true").lower() == "true":
+        return WriteBehindSessionService(service)
+    return service
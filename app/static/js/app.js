@@ -12,6 +12,14 @@ const ws_url = "ws://" + window.location.host + "/ws/" + sessionId;
 let websocket = null;
 let is_audio = false;
 let currentMessageId = null; // Track the current message ID during a conversation turn
+let binaryAudio = false; // Set once the server accepts binary audio frames
+
+// Binary audio frame header: version, kind, sample rate, sequence number (little-endian)
+const AUDIO_HEADER_BYTES = 8;
+const AUDIO_FRAME_VERSION = 1;
+const AUDIO_KIND_PCM = 1;
+const MIC_SAMPLE_RATE = 16000;
+let audioSeq = 0;
 
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
@@ -27,8 +35,10 @@ const recordingContainer = document.getElementById("recording-container");
 // WebSocket handlers
 function connectWebsocket() {
   // Connect websocket
-  const wsUrl = ws_url + "?is_audio=" + is_audio;
+  const wsUrl = ws_url + "?is_audio=" + is_audio + "&audio_format=binary";
   websocket = new WebSocket(wsUrl);
+  websocket.binaryType = "arraybuffer";
+  binaryAudio = false;
 
   // Handle connection open
   websocket.onopen = function () {
@@ -44,10 +54,23 @@ function connectWebsocket() {
 
   // Handle incoming messages
   websocket.onmessage = function (event) {
+    // Binary frames are agent audio: skip the header and play the PCM
+    if (event.data instanceof ArrayBuffer) {
+      typingIndicator.classList.add("visible");
+      playAudio(event.data.slice(AUDIO_HEADER_BYTES));
+      return;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
 
+    // Audio format negotiation reply
+    if (message_from_server.audio_format) {
+      binaryAudio = message_from_server.audio_format === "binary";
+      return;
+    }
+
     // Show typing indicator for first message in a response sequence,
     // but not for turn_complete messages
     if (
@@ -58,6 +81,11 @@ function connectWebsocket() {
       typingIndicator.classList.add("visible");
     }
 
+    // The agent was interrupted: stop playing audio the customer talked over
+    if (message_from_server.interrupted && audioPlayerNode) {
+      audioPlayerNode.port.postMessage({ command: "endOfAudio" });
+    }
+
     // Check if the turn is complete
     if (
       message_from_server.turn_complete &&
@@ -70,22 +98,8 @@ function connectWebsocket() {
     }
 
     // If it's audio, play it
-    if (message_from_server.mime_type === "audio/pcm" && audioPlayerNode) {
-      audioPlayerNode.port.postMessage(base64ToArray(message_from_server.data));
-
-      // If we have an existing message element for this turn, add audio icon if needed
-      if (currentMessageId) {
-        const messageElem = document.getElementById(currentMessageId);
-        if (
-          messageElem &&
-          !messageElem.querySelector(".audio-icon") &&
-          is_audio
-        ) {
-          const audioIcon = document.createElement("span");
-          audioIcon.className = "audio-icon";
-          messageElem.prepend(audioIcon);
-        }
-      }
+    if (message_from_server.mime_type === "audio/pcm") {
+      playAudio(base64ToArray(message_from_server.data));
     }
 
     // Handle text messages
@@ -166,6 +180,26 @@ function connectWebsocket() {
 }
 connectWebsocket();
 
+// Play a chunk of agent PCM audio
+function playAudio(pcmBuffer) {
+  if (!audioPlayerNode) return;
+  audioPlayerNode.port.postMessage(pcmBuffer);
+
+  // If we have an existing message element for this turn, add audio icon if needed
+  if (currentMessageId) {
+    const messageElem = document.getElementById(currentMessageId);
+    if (
+      messageElem &&
+      !messageElem.querySelector(".audio-icon") &&
+      is_audio
+    ) {
+      const audioIcon = document.createElement("span");
+      audioIcon.className = "audio-icon";
+      messageElem.prepend(audioIcon);
+    }
+  }
+}
+
 // Add submit handler to the form
 function addSubmitHandler() {
   messageForm.onsubmit = function (e) {
@@ -312,11 +346,18 @@ function audioRecorderHandler(pcmData) {
   // Only send data if we're still recording
   if (!isRecording) return;
 
-  // Send the pcm data as base64
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(pcmData),
-  });
+  if (binaryAudio) {
+    // Raw PCM behind a small header, no base64 or JSON
+    if (websocket && websocket.readyState == WebSocket.OPEN) {
+      websocket.send(encodeAudioFrame(pcmData));
+    }
+  } else {
+    // Send the pcm data as base64
+    sendMessage({
+      mime_type: "audio/pcm",
+      data: arrayBufferToBase64(pcmData),
+    });
+  }
 
   // Log every few samples to avoid flooding the console
   if (Math.random() < 0.01) {
@@ -325,6 +366,19 @@ function audioRecorderHandler(pcmData) {
   }
 }
 
+// Prefix PCM data with the binary audio frame header
+function encodeAudioFrame(pcmData) {
+  const frame = new Uint8Array(AUDIO_HEADER_BYTES + pcmData.byteLength);
+  const header = new DataView(frame.buffer);
+  header.setUint8(0, AUDIO_FRAME_VERSION);
+  header.setUint8(1, AUDIO_KIND_PCM);
+  header.setUint16(2, MIC_SAMPLE_RATE, true);
+  header.setUint32(4, audioSeq, true);
+  audioSeq = (audioSeq + 1) >>> 0;
+  frame.set(new Uint8Array(pcmData), AUDIO_HEADER_BYTES);
+  return frame.buffer;
+}
+
 // Encode an array buffer with Base64
 function arrayBufferToBase64(buffer) {
   let binary = "";
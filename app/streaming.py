@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+# Chat replies are forwarded as agent_delta frames when enabled
+STREAMING_ENABLED = os.getenv("CHAT_STREAMING", "true").lower() == "true"
+STREAM_MIN_CHARS = int(os.getenv("STREAM_MIN_CHARS", 24))
+STREAM_MAX_INTERVAL_MS = float(os.getenv("STREAM_MAX_INTERVAL_MS", 50))
+
+
+class DeltaCoalescer:
+    """
+    Buffers streamed text and sends it in frames of at least `min_chars`.
+
+    A shorter buffer is sent by a timer `max_interval_ms` after the previous
+    frame, whether or not another delta arrives, so a short tail is not held
+    back until the next token. `flush()` sends whatever is left at the end of
+    the turn. `ttft_ms` is measured to the first partial event, before any
+    coalescing; `first_frame_ms` to the first frame actually sent.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        min_chars: int = STREAM_MIN_CHARS,
+        max_interval_ms: float = STREAM_MAX_INTERVAL_MS,
+    ):
+        self.send = send
+        self.min_chars = min_chars
+        self.max_interval = max_interval_ms / 1000
+        self.started = time.perf_counter()
+        self.first_delta_at = None
+        self.first_frame_at = None
+        self.deltas = 0
+        self.frames = 0
+        self._buffer = []
+        self._buffered_chars = 0
+        self._last_frame = self.started
+        self._timer = None
+        self._send_lock = asyncio.Lock()
+
+    async def add(self, text: str):
+        """Buffer one partial event's text (which may be empty)."""
+        now = time.perf_counter()
+        if self.first_delta_at is None:
+            self.first_delta_at = now
+        if not text:
+            return
+        self.deltas += 1
+        self._buffer.append(text)
+        self._buffered_chars += len(text)
+        if self._buffered_chars >= self.min_chars or now - self._last_frame >= self.max_interval:
+            await self.flush()
+        elif self._timer is None:
+            delay = self.max_interval - (now - self._last_frame)
+            self._timer = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self.flush()
+
+    def cancel(self):
+        """Stop the pending timer without sending (e.g. when the turn failed)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self):
+        self.cancel()
+        # The timer and the event loop of the turn may both flush; frames must not interleave
+        async with self._send_lock:
+            if not self._buffer:
+                return
+            text = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered_chars = 0
+            await self.send(text)
+            self._last_frame = time.perf_counter()
+            self.frames += 1
+            if self.first_frame_at is None:
+                self.first_frame_at = self._last_frame
+
+    @property
+    def ttft_ms(self):
+        """Time from the start of the turn to the first partial event, if any."""
+        if self.first_delta_at is None:
+            return None
+        return (self.first_delta_at - self.started) * 1000
+
+    @property
+    def first_frame_ms(self):
+        """Time from the start of the turn to the first frame sent, coalescing delay included."""
+        if self.first_frame_at is None:
+            return None
+        return (self.first_frame_at - self.started) * 1000
+
+
+class StreamingStats:
+    """Time to first token and frame counts for streamed chat replies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "turns": 0, "streamed_turns": 0, "deltas": 0, "frames": 0,
+            "ttft_ms_total": 0.0, "ttft_ms_max": 0.0, "ttft_ms_last": None,
+        }
+
+    def record(self, coalescer: DeltaCoalescer):
+        with self._lock:
+            self._stats["turns"] += 1
+            self._stats["deltas"] += coalescer.deltas
+            self._stats["frames"] += coalescer.frames
+            ttft = coalescer.ttft_ms
+            if ttft is not None:
+                self._stats["streamed_turns"] += 1
+                self._stats["ttft_ms_total"] += ttft
+                self._stats["ttft_ms_max"] = max(self._stats["ttft_ms_max"], ttft)
+                self._stats["ttft_ms_last"] = round(ttft, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        streamed = stats["streamed_turns"]
+        ttft_total = stats.pop("ttft_ms_total")
+        return dict(
+            stats,
+            enabled=STREAMING_ENABLED,
+            min_chars=STREAM_MIN_CHARS,
+            max_interval_ms=STREAM_MAX_INTERVAL_MS,
+            ttft_ms_avg=round(ttft_total / streamed, 1) if streamed else None,
+            ttft_ms_max=round(stats["ttft_ms_max"], 1),
+            deltas_per_frame=round(stats["deltas"] / stats["frames"], 2) if stats["frames"] else None,
+        )
+
+
+streaming_stats = StreamingStats()
@@ -0,0 +1,143 @@
+"""
+Structured, level-controlled tracing for chat_server.py and main.py.
+
+Records are JSON lines on stdout. They go through a QueueHandler, and a
+QueueListener thread does the formatting and writing, so logging never
+blocks the event loop on console I/O. `LOG_LEVEL` (default INFO) sets the
+threshold.
+
+Session state snapshots replace the old per-turn state dumps. They are
+DEBUG records, taken for a `STATE_SNAPSHOT_SAMPLE_RATE` fraction of calls
+(default 0.1). A snapshot is a compact summary: ids, plan and the last
+`STATE_SNAPSHOT_HISTORY` history entries. At INFO and above, a snapshot
+costs nothing, not even a session read. The full state of one session is
+available on demand from the debug endpoints when `DEBUG_STATE_ENDPOINT=true`.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from config.tool_executor import run_blocking
+
+# Read before the servers' own load_dotenv, since this is imported first
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+STATE_SNAPSHOT_SAMPLE_RATE = float(os.getenv("STATE_SNAPSHOT_SAMPLE_RATE", 0.1))
+STATE_SNAPSHOT_HISTORY = int(os.getenv("STATE_SNAPSHOT_HISTORY", 3))
+DEBUG_STATE_ENDPOINT = os.getenv("DEBUG_STATE_ENDPOINT", "false").lower() == "true"
+
+SNAPSHOT_TEXT_CHARS = 120
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; keyword fields passed to `trace` become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(name: str = "nextel") -> logging.Logger:
+    """The app logger, writing JSON through a background queue listener (set up once per process)."""
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    # Drain what is still queued when the process exits
+    atexit.register(listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    return logger
+
+
+logger = setup_logging()
+
+
+def trace(event: str, level: int = logging.INFO, **fields):
+    """Log `event` with structured fields; the fields are not even collected when the level is off."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def _clip(value: Any) -> str:
+    text = str(value).replace("\n", " ")
+    return text if len(text) <= SNAPSHOT_TEXT_CHARS else text[: SNAPSHOT_TEXT_CHARS - 3] + "..."
+
+
+def state_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of session state: ids and plan, history size and its last few entries."""
+    customer_info = state.get("customer_info")
+    plan_details = state.get("plan_details")
+    history = state.get("interaction_history") or []
+    recent = []
+    for entry in history[-STATE_SNAPSHOT_HISTORY:] if STATE_SNAPSHOT_HISTORY else []:
+        if isinstance(entry, dict):
+            text = entry.get("query") or entry.get("response") or ""
+            recent.append({
+                "action": entry.get("action"),
+                "agent": entry.get("agent"),
+                "timestamp": entry.get("timestamp"),
+                "text": _clip(text),
+            })
+        else:
+            recent.append({"text": _clip(entry)})
+    return {
+        "customer_id": customer_info.get("customer_id") if isinstance(customer_info, dict) else state.get("customer_id"),
+        "plan_id": plan_details.get("plan_id") if isinstance(plan_details, dict) else state.get("plan_id"),
+        "plan_name": plan_details.get("plan_name") if isinstance(plan_details, dict) else state.get("plan_name"),
+        "history_entries": len(history),
+        "summary_chars": len(state.get("interaction_summary") or ""),
+        "recent_history": recent,
+    }
+
+
+async def snapshot_state(session_service, app_name: str, user_id: str, session_id: str, label: str):
+    """Sampled DEBUG snapshot of a session's state; the session is read on the worker pool."""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= STATE_SNAPSHOT_SAMPLE_RATE:
+        return
+    try:
+        session = await run_blocking(
+            session_service.get_session, app_name=app_name, user_id=user_id, session_id=session_id
+        )
+    except Exception as e:
+        trace("state_snapshot_failed", logging.WARNING, label=label, session_id=session_id, error=str(e))
+        return
+    if session is None:
+        return
+    trace("state_snapshot", logging.DEBUG, label=label, session_id=session_id, **state_summary(session.state))
+
+
+def session_state(session_service, app_name: str, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Full state of one session for the debug endpoints, or None if it does not exist."""
+    session = session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        return None
+    return {
+        "session_id": session_id,
+        "user_id": user_id,
+        "events": len(session.events),
+        "summary": state_summary(session.state),
+        "state": session.state,
+    }
@@ -2,6 +2,15 @@ from datetime import datetime
 
 from google.genai import types
 
+from history_store import history_store
+from tracing import snapshot_state
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty sequence of samples (latency reports and benchmarks)."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
 
 # ANSI color codes for terminal output
 class Colors:
@@ -30,7 +39,7 @@ class Colors:
     BG_WHITE = "\033[47m"
 
 
-def update_interaction_history(session_service, app_name, user_id, session_id, entry):
+def update_interaction_history(session_service, app_name, user_id, session_id, entry, session=None):
     """Add an entry to the interaction history in state.
 
     Args:
@@ -41,39 +50,20 @@ def update_interaction_history(session_service, app_name, user_id, session_id, e
         entry: A dictionary containing the interaction data
             - requires 'action' key (e.g., 'user_query', 'agent_response')
             - other keys are flexible depending on the action type
+        session: The Session object a runner is holding, if any
     """
-    try:
-        # Get current session
-        session = session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
+    # Add timestamp if not already present
+    if "timestamp" not in entry:
+        entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # Get current interaction history
-        interaction_history = session.state.get("interaction_history", [])
-
-        # Add timestamp if not already present
-        if "timestamp" not in entry:
-            entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # Add the entry to interaction history
-        interaction_history.append(entry)
-
-        # Create updated state
-        updated_state = session.state.copy()
-        updated_state["interaction_history"] = interaction_history
-
-        # Create a new session with updated state
-        session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
-        )
+    try:
+        # O(1) append to the session's ring buffer, published as a state delta
+        history_store.append(session_service, app_name, user_id, session_id, entry, session=session)
     except Exception as e:
         print(f"Error updating interaction history: {e}")
 
 
-def add_user_query_to_history(session_service, app_name, user_id, session_id, query):
+def add_user_query_to_history(session_service, app_name, user_id, session_id, query, session=None):
     """Add a user query to the interaction history."""
     update_interaction_history(
         session_service,
@@ -84,11 +74,12 @@ def add_user_query_to_history(session_service, app_name, user_id, session_id, qu
             "action": "user_query",
             "query": query,
         },
+        session=session,
     )
 
 
 def add_agent_response_to_history(
-    session_service, app_name, user_id, session_id, agent_name, response
+    session_service, app_name, user_id, session_id, agent_name, response, session=None
 ):
     """Add an agent response to the interaction history."""
     update_interaction_history(
@@ -101,120 +92,10 @@ def add_agent_response_to_history(
             "agent": agent_name,
             "response": response,
         },
+        session=session,
     )
 
 
-def display_state(
-    session_service, app_name, user_id, session_id, label="Current State"
-):
-    """Display the current session state in a formatted way."""
-    try:
-        session = session_service.get_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
-        )
-
-        # Format the output with clear sections
-        print(f"\n{'-' * 10} {label} {'-' * 10}")
-        """
-        # Handle the user name
-        user_name = session.state.get("user_name", "Unknown")
-        print(f"👤 User: {user_name}")
-
-        # Handle purchased courses
-        purchased_courses = session.state.get("purchased_courses", [])
-        if purchased_courses and any(purchased_courses):
-            print("📚 Courses:")
-            for course in purchased_courses:
-                if isinstance(course, dict):
-                    course_id = course.get("id", "Unknown")
-                    purchase_date = course.get("purchase_date", "Unknown date")
-                    print(f"  - {course_id} (purchased on {purchase_date})")
-                elif course:  # Handle string format for backward compatibility
-                    print(f"  - {course}")
-        else:
-            print("📚 Courses: None")
-        """
-        # Handle the customer ID
-        customer_id = session.state.get("customer_id", "Not identified")
-        print(f"👤 Customer ID: {customer_id}")
-
-        # Handle the customer info
-        customer_info = session.state.get("customer_info", "No customer info available")
-        if isinstance(customer_info, dict) and customer_info:
-            print("🧑‍💼 Customer Info:")
-            for key, value in customer_info.items():
-                print(f"  - {key}: {value}")
-        else:
-            print("🧑‍💼 Customer Info: Not available")
-
-        # Handle the plan ID
-        plan_id = session.state.get("plan_id", "No plan assigned")
-        print(f"💳 Plan ID: {plan_id}")
-
-        # Handle the plan name
-        plan_name = session.state.get("plan_name", "No plan name available")
-        print(f"📦 Plan Name: {plan_name}")
-
-        # Handle the plan details
-        plan_details = session.state.get("plan_details", "No details available")
-        if isinstance(plan_details, dict) and plan_details:
-            print("📃 Plan Details:")
-            for detail_key, detail_value in plan_details.items():
-                print(f"  - {detail_key}: {detail_value}")
-        else:
-            print("📃 Plan Details: Not available")
-
-        # Handle interaction history in a more readable way
-        interaction_history = session.state.get("interaction_history", [])
-        if interaction_history:
-            print("📝 Interaction History:")
-            for idx, interaction in enumerate(interaction_history, 1):
-                # Pretty format dict entries, or just show strings
-                if isinstance(interaction, dict):
-                    action = interaction.get("action", "interaction")
-                    timestamp = interaction.get("timestamp", "unknown time")
-
-                    if action == "user_query":
-                        query = interaction.get("query", "")
-                        print(f'  {idx}. User query at {timestamp}: "{query}"')
-                    elif action == "agent_response":
-                        agent = interaction.get("agent", "unknown")
-                        response = interaction.get("response", "")
-                        # Truncate very long responses for display
-                        if len(response) > 100:
-                            response = response[:97] + "..."
-                        print(f'  {idx}. {agent} response at {timestamp}: "{response}"')
-                    else:
-                        details = ", ".join(
-                            f"{k}: {v}"
-                            for k, v in interaction.items()
-                            if k not in ["action", "timestamp"]
-                        )
-                        print(
-                            f"  {idx}. {action} at {timestamp}"
-                            + (f" ({details})" if details else "")
-                        )
-                else:
-                    print(f"  {idx}. {interaction}")
-        else:
-            print("📝 Interaction History: None")
-
-        # Show any additional state keys that might exist
-        other_keys = [
-            k
-            for k in session.state.keys()
-            if k not in ["user_name", "purchased_courses", "interaction_history"]
-        ]
-        # if other_keys:
-        #     print("🔑 Additional State:")
-        #     for key in other_keys:
-        #         print(f"  {key}: {session.state[key]}")
-
-        print("-" * (22 + len(label)))
-    except Exception as e:
-        print(f"Error displaying state: {e}")
-
-
 async def process_agent_response(event):
     """Process and display agent response events."""
     print(f"Event ID: {event.id}, Author: {event.author}")
@@ -261,14 +142,8 @@ async def call_agent_async(runner, user_id, session_id, query):
     final_response_text = None
     agent_name = None
 
-    # Display state before processing the message
-    display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State BEFORE processing",
-    )
+    # Sampled, DEBUG-only state snapshot
+    await snapshot_state(runner.session_service, runner.app_name, user_id, session_id, "before_turn")
 
     try:
         async for event in runner.run_async(
@@ -295,14 +170,7 @@ async def call_agent_async(runner, user_id, session_id, query):
             final_response_text,
         )
 
-    # Display state after processing the message
-    display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State AFTER processing",
-    )
+    await snapshot_state(runner.session_service, runner.app_name, user_id, session_id, "after_turn")
 
     print(f"{Colors.YELLOW}{'-' * 30}{Colors.RESET}")
     return final_response_text